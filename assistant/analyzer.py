@@ -1,73 +1,245 @@
 import os
 import json
+import dataclasses
+import hashlib
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+import time
+import uuid
+from typing import Callable, Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
+from django.conf import settings
 from django.utils import timezone
+from django.utils.module_loading import import_string
 from django.db import transaction
+from django.db.models import DateTimeField, Value
+from django.db.models.functions import Coalesce
 from celery import shared_task
 from assistant.models import Conversation, UserPreference, VehicleInterest
 from assistant.tools import conversation_summary_schema, conversation_analysis_schema
+from assistant.ratelimit import openai_slot, record_rate_limit_headers
+from assistant.routers import mark_session_written
+from assistant.task_status import claim_inflight, release_inflight, take_inflight
+from assistant import metrics, novelty, session_cache, validation
 
 logger = logging.getLogger(__name__)
 MESSAGE_COOLDOWN_SECONDS = 5  
 ANALYSIS_MESSAGE_BATCH_SIZE = 3  
-load_dotenv()
+SUMMARY_INFLIGHT_KEY = "summary:inflight:{}"
 
-try:
-    from openai import OpenAI
-    OPENAI_CLIENT = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-except Exception:
-    OPENAI_CLIENT = None
+# The OpenAI SDK is slow to import, so the client is built on first use
+# rather than in every web/Celery process that merely imports this module.
+_openai_client = None
+_openai_client_lock = threading.Lock()
+_openai_client_failed = False
 
-def _call_openai(
+def get_openai_client():
+    global _openai_client, _openai_client_failed
+    if _openai_client is None and not _openai_client_failed:
+        with _openai_client_lock:
+            if _openai_client is None and not _openai_client_failed:
+                try:
+                    from openai import OpenAI
+                    # Bounded so a call never outlives its concurrency lease (OPENAI_SLOT_LEASE_SECONDS)
+                    _openai_client = OpenAI(
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        timeout=settings.OPENAI_REQUEST_TIMEOUT_SECONDS,
+                        max_retries=settings.OPENAI_MAX_RETRIES,
+                    )
+                except Exception as e:
+                    logger.error(f"Could not initialise OpenAI client: {e}")
+                    _openai_client_failed = True
+    return _openai_client
+
+def openai_backend(
     messages: List[Dict[str, str]],
-    functions: Optional[List[Dict[str, Any]]] = None,
-    function_name: Optional[str] = None,
-    model: str = "gpt-4o-mini",
-    temperature: float = 0.2
-) -> Optional[Dict[str, Any]]:
-    if not OPENAI_CLIENT:
-        logger.warning("OPENAI_CLIENT not available")
-        return None
+    functions: Optional[List[Dict[str, Any]]],
+    function_name: Optional[str],
+    model: str,
+    temperature: float,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, int]]:
+    # --- Default LLM backend: returns (parsed arguments or None, token usage) ---
+    client = get_openai_client()
+    if not client:
+        logger.warning("OpenAI client not available")
+        return None, {}
     try:
-        resp = OPENAI_CLIENT.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            functions=functions or [],
-            function_call={"name": function_name} if function_name else None,
-            response_format={"type": "json_object"},
-        )
+        with openai_slot():
+            raw = client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                functions=functions or [],
+                function_call={"name": function_name} if function_name else None,
+                response_format={"type": "json_object"},
+            )
+        record_rate_limit_headers(raw.headers)
+        resp = raw.parse()
+        usage = {
+            "prompt_tokens": getattr(resp.usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(resp.usage, "completion_tokens", 0) or 0,
+        }
         choice = resp.choices[0].message
         if getattr(choice, "function_call", None) and getattr(choice.function_call, "arguments", None):
-            return json.loads(choice.function_call.arguments)
+            return json.loads(choice.function_call.arguments), usage
         if getattr(choice, "content", None):
             try:
-                return json.loads(choice.content)
+                return json.loads(choice.content), usage
             except Exception:
-                return None
+                return None, usage
+        return None, usage
     except Exception as e:
+        response = getattr(e, "response", None)
+        if response is not None:
+            record_rate_limit_headers(response.headers, getattr(response, "status_code", None))
         logger.error(f"OpenAI API call failed: {e}")
+    return None, {}
+
+_llm_backends: Dict[str, Callable] = {}
+
+def get_llm_backend() -> Callable:
+    # ANALYZER_LLM_BACKEND swaps OpenAI for another callable, e.g. the replay harness's fake
+    path = getattr(settings, "ANALYZER_LLM_BACKEND", "") or ""
+    if not path:
+        return openai_backend
+    backend = _llm_backends.get(path)
+    if backend is None:
+        backend = _llm_backends[path] = import_string(path)
+    return backend
+
+def _call_openai(
+    messages: List[Dict[str, str]],
+    functions: Optional[List[Dict[str, Any]]] = None,
+    function_name: Optional[str] = None,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.2
+) -> Optional[Dict[str, Any]]:
+    backend = get_llm_backend()
+    validator = validation.get_validator(function_name)
+    attempts = 1 + (settings.LLM_OUTPUT_REPAIR_ATTEMPTS if validator else 0)
+    for attempt in range(attempts):
+        result, usage = backend(messages, functions, function_name, model, temperature)
+        metrics.incr("llm.calls")
+        metrics.incr("llm.prompt_tokens", usage.get("prompt_tokens", 0))
+        metrics.incr("llm.completion_tokens", usage.get("completion_tokens", 0))
+        # None means the call itself failed; that is not the model's output to repair
+        if validator is None or result is None:
+            return result
+
+        checked = validator.validate(result)
+        metrics.incr(f"validation.{function_name}.checked")
+        if checked.coerced:
+            metrics.incr(f"validation.{function_name}.coerced")
+        if checked.ok:
+            if attempt:
+                metrics.incr(f"validation.{function_name}.repaired")
+            return checked.value.as_dict()
+
+        metrics.incr(f"validation.{function_name}.invalid")
+        logger.warning(f"{function_name} output failed validation (attempt {attempt + 1}/{attempts}): {'; '.join(checked.errors)}")
+        # Show the model its own output and what was wrong with it
+        messages = messages + [
+            {"role": "assistant", "content": json.dumps(result, ensure_ascii=False)},
+            {"role": "user", "content": "That JSON does not match the schema: " + "; ".join(checked.errors)
+                                        + ". Return the corrected JSON object only."},
+        ]
+    metrics.incr(f"validation.{function_name}.failed")
     return None
 
 def _user_texts(conv: Conversation) -> List[str]:
     #------- Extract user messages from conversation --------
-    return [m.get("content") for m in (conv.messages_json or []) if m.get("role") == "user" and m.get("content")]
+    return _user_contents(conv.messages_json or [])
 
-@shared_task
-def generate_summary_task(session_id: str):
-    summary_data = generate_conversation_summary(session_id)
-    return summary_data
+def _user_contents(msgs: List[Dict[str, Any]]) -> List[str]:
+    return [m.get("content") for m in msgs if m.get("role") == "user" and m.get("content")]
 
-def analyze_conversation(session_id: str) -> Dict[str, Any]:
+def _analysis_gate(conv: "Conversation | session_cache.SessionState", msgs: List[Dict[str, Any]]) -> Optional[novelty.NoveltyDecision]:
+    # --- Decide whether the messages since the last analysis are worth an LLM call ---
+    # Returns None until a full batch is pending; otherwise consumes the batch either way.
+    seen = min(conv.analyzed_message_count, len(msgs))
+    if len(msgs) - seen < ANALYSIS_MESSAGE_BATCH_SIZE:
+        return None
+    decision = novelty.assess(_user_contents(msgs[seen:]), _user_contents(msgs[:seen]))
+    conv.analyzed_message_count = len(msgs)
+
+    metrics.incr("analysis.gate.run" if decision.run else "analysis.gate.skip")
+    metrics.incr(f"analysis.gate.{decision.reason}")
+    runs, skips = metrics.local_value("analysis.gate.run"), metrics.local_value("analysis.gate.skip")
+    logger.info(
+        f"Analysis gate for {conv.session_id}: {'run' if decision.run else 'skip'} ({decision.reason}, "
+        f"similarity={decision.similarity:.2f}); run/skip so far {runs:.0f}/{skips:.0f}"
+    )
+    return decision
+
+@shared_task(bind=True, ignore_result=False)
+def generate_summary_task(self, session_id: str, force: bool = False):
     try:
-        conv = Conversation.objects.get(session_id=session_id)
-    except Conversation.DoesNotExist:
+        summary_data = generate_conversation_summary(session_id, force=force)
+    finally:
+        release_inflight(SUMMARY_INFLIGHT_KEY.format(session_id), self.request.id)
+    # Compact result: the summary itself is read from /api/summary/<session_id>/
+    if summary_data.get("status") == "error":
+        return {"status": "error", "session_id": session_id, "message": summary_data.get("message")}
+    return {"status": "success", "session_id": session_id}
+
+def transcript_digest(msgs: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(msgs, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def _summary_is_current(state: session_cache.SessionState) -> bool:
+    # Count first so a grown transcript is detected without hashing it
+    return (
+        bool(state.summary_digest)
+        and state.summary_message_count == len(state.messages)
+        and state.summary_digest == transcript_digest(state.messages)
+    )
+
+def _stored_summary(state: session_cache.SessionState) -> Optional[Dict[str, Any]]:
+    # --- Stored summary row if nothing was said since it was generated, else None ---
+    if not _summary_is_current(state):
+        return None
+    stored = Conversation.objects.filter(pk=state.conversation_id).values("summary_data", "summary_generated_at").first()
+    if not stored or not stored["summary_data"]:
+        return None
+    metrics.incr("summary.reuse.hit")
+    return stored
+
+def current_summary(session_id: str) -> Optional[Dict[str, Any]]:
+    state = session_cache.load(session_id, verify=True)
+    stored = _stored_summary(state) if state is not None else None
+    if stored is None:
+        return None
+    return {**stored["summary_data"], "generated_at": stored["summary_generated_at"]}
+
+def enqueue_summary(session_id: str, force: bool = False) -> Tuple[str, bool]:
+    # --- Queue a summary unless one is already in flight; returns (task_id, deduplicated) ---
+    # `force` always queues: a task already in flight may be summarizing an older transcript
+    key = SUMMARY_INFLIGHT_KEY.format(session_id)
+    task_id = str(uuid.uuid4())
+    holder = None
+    if force:
+        take_inflight(key, task_id, settings.SUMMARY_INFLIGHT_TTL_SECONDS)
+    else:
+        holder = claim_inflight(key, task_id, settings.SUMMARY_INFLIGHT_TTL_SECONDS)
+    if holder:
+        metrics.incr("summary.deduplicated")
+        return holder, True
+    try:
+        generate_summary_task.apply_async(args=[session_id], kwargs={"force": force}, task_id=task_id)
+    except Exception:
+        release_inflight(key, task_id)
+        raise
+    return task_id, False
+
+@shared_task(ignore_result=True)
+def analyze_conversation_task(session_id: str):
+    return analyze_conversation(session_id)
+
+def analyze_conversation(session_id: str) -> Dict[str, Any]:
+    state = session_cache.load(session_id, verify=True)
+    if state is None:
         return {"status": "error", "message": "conversation not found"}
 
-    texts = _user_texts(conv)
+    texts = _user_contents(state.messages)
     if not texts:
         return {"status": "no_action", "message": "no user messages"}
 
@@ -88,39 +260,47 @@ def analyze_conversation(session_id: str) -> Dict[str, Any]:
                 val = extracted.get(key)
                 if val:
                     UserPreference.objects.update_or_create(
-                        conversation=conv,
+                        conversation_id=state.conversation_id,
                         data__type=key,
                         defaults={"data": {"type": key, "value": str(val), "confidence": 0.8},
-                                  "extracted_at": now}
+                                  "extracted_at": now, "conversation_started_at": state.started_at}
                     )
             # Priority features
             pf = extracted.get("priority_features")
             if pf:
                 UserPreference.objects.update_or_create(
-                    conversation=conv,
+                    conversation_id=state.conversation_id,
                     data__type="priority_features",
                     defaults={"data": {"type": "priority_features", "value": json.dumps(pf), "confidence": 0.7},
-                              "extracted_at": now}
+                              "extracted_at": now, "conversation_started_at": state.started_at}
                 )
             # Vehicle interests
             vehicles = [v for v in (extracted.get("vehicle_interest") or []) if v]
             if vehicles:
                 existing = set(
-                    VehicleInterest.objects.filter(conversation=conv, vehicle_name__in=vehicles)
+                    VehicleInterest.objects.filter(conversation_id=state.conversation_id, vehicle_name__in=vehicles)
                     .values_list("vehicle_name", flat=True)
                 )
                 to_create = [
-                    VehicleInterest(conversation=conv, vehicle_name=v, meta={"interest_level": 8}, timestamp=now)
+                    VehicleInterest(conversation_id=state.conversation_id, vehicle_name=v, meta={"interest_level": 8},
+                                    timestamp=now, conversation_started_at=state.started_at)
                     for v in vehicles if v not in existing
                 ]
                 if to_create:
                     VehicleInterest.objects.bulk_create(to_create)
-                VehicleInterest.objects.filter(conversation=conv, vehicle_name__in=vehicles).update(
+                VehicleInterest.objects.filter(conversation_id=state.conversation_id, vehicle_name__in=vehicles).update(
                     meta={"interest_level": 8}, timestamp=now
                 )
     except Exception as e:
         logger.error(f"Error persisting analysis: {e}")
         return {"status": "error", "message": str(e)}
+    mark_session_written(session_id)
+    # Preferences just written are what the summary reads back; refresh them in the cached state
+    updated = {k: str(extracted[k]) for k in ("budget", "usage") if extracted.get(k)}
+    if extracted.get("priority_features"):
+        updated["priority_features"] = json.dumps(extracted["priority_features"])
+    if updated:
+        session_cache.put(dataclasses.replace(state, preferences={**(state.preferences or {}), **updated}), written=True)
 
     return {"status": "success", "extracted": extracted}
 
@@ -152,17 +332,47 @@ def save_message(session_id: str, role: str, content: str, user_id: Optional[int
     msgs.append({"role": role, "content": content, "timestamp": now.isoformat()})
     conv.messages_json = msgs
     conv.total_messages = len(msgs)
-    conv.save(update_fields=["messages_json", "total_messages"])
+    decision = _analysis_gate(conv, msgs)
+    conv.save(update_fields=["messages_json", "total_messages", "analyzed_message_count"])
+    mark_session_written(session_id)
+    session_cache.invalidate(session_id)
 
-    # Only analyze at every 3th message
-    if conv.total_messages % ANALYSIS_MESSAGE_BATCH_SIZE == 0:
+    # Only analyze once a batch of messages has arrived and it says something new
+    if decision is None:
+        analysis = {"status": "skipped", "message": f"Analysis runs after every {ANALYSIS_MESSAGE_BATCH_SIZE} messages."}
+    elif not decision.run:
+        analysis = {"status": "skipped", "message": f"No new extractable information ({decision.reason})."}
+    else:
         logger.info(f"Analysis triggered for session {session_id}: {conv.total_messages} messages so far.")
         analysis = analyze_conversation(session_id)
-    else:
-        analysis = {"status": "skipped", "message": f"Analysis runs after every {ANALYSIS_MESSAGE_BATCH_SIZE} messages."}
 
     return {"status": "success", "message_count": conv.total_messages, "analysis": analysis}
 
+def _append_to_cached(session_id: str, new_msgs: List[Dict[str, Any]]) -> Optional[Tuple[int, Optional[novelty.NoveltyDecision]]]:
+    # --- Write-through append on a cached session; None means fall back to reading the row ---
+    state = session_cache.get(session_id)
+    if state is None:
+        return None
+    msgs = state.messages + new_msgs
+    draft = dataclasses.replace(state, messages=msgs, total_messages=len(msgs))
+    decision = _analysis_gate(draft, msgs)
+    # Guarded on the cached message count so a write from elsewhere is never overwritten
+    updated = Conversation.objects.filter(pk=state.conversation_id, total_messages=state.total_messages).update(
+        messages_json=msgs, total_messages=len(msgs), analyzed_message_count=draft.analyzed_message_count
+    )
+    if not updated:
+        metrics.incr("session_cache.conflict")
+        session_cache.invalidate(session_id)
+        return None
+    transaction.on_commit(lambda: session_cache.put(draft, written=True))
+    return len(msgs), decision
+
+def _enqueue_analysis(session_id: str) -> None:
+    try:
+        analyze_conversation_task.delay(session_id)
+    except Exception as e:
+        logger.error(f"Could not queue analysis for {session_id}: {e}")
+
 # -- Saving messages as batch to avoid recurring calls.
 def save_message_batch(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
     if not messages:
@@ -182,52 +392,57 @@ def save_message_batch(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
     total_saved = 0
     
     for session_id, session_messages in sessions.items():
+        new_msgs = []
+        for msg in session_messages:
+            role = msg.get("role")
+            content = msg.get("content")
+            timestamp = msg.get("timestamp", timezone.now().isoformat())
+            if role and content:
+                new_msgs.append({
+                    "role": role,
+                    "content": content,
+                    "timestamp": timestamp
+                })
         try:
             with transaction.atomic():
-                conv, _ = Conversation.objects.get_or_create(
-                    session_id=session_id,
-                    defaults={"user_id": None}
-                )
-                
-                msgs = list(conv.messages_json or [])
-                
-                # Add all messages from this batch
-                for msg in session_messages:
-                    role = msg.get("role")
-                    content = msg.get("content")
-                    timestamp = msg.get("timestamp", timezone.now().isoformat())
-                    
-                    if role and content:
-                        msgs.append({
-                            "role": role,
-                            "content": content,
-                            "timestamp": timestamp
-                        })
-                        total_saved += 1
-                
-                conv.messages_json = msgs
-                conv.total_messages = len(msgs)
-                conv.save(update_fields=["messages_json", "total_messages"])
-                
-                # Check if we should analyze
-                should_analyze = conv.total_messages % ANALYSIS_MESSAGE_BATCH_SIZE == 0
+                # Hot path: append to the cached transcript instead of re-reading and re-decoding it
+                cached = _append_to_cached(session_id, new_msgs)
+                if cached is not None:
+                    total_messages, decision = cached
+                else:
+                    conv, _ = Conversation.objects.get_or_create(
+                        session_id=session_id,
+                        defaults={"user_id": None}
+                    )
+                    msgs = list(conv.messages_json or []) + new_msgs
+                    conv.messages_json = msgs
+                    conv.total_messages = len(msgs)
+                    # Check if we should analyze
+                    decision = _analysis_gate(conv, msgs)
+                    conv.save(update_fields=["messages_json", "total_messages", "analyzed_message_count"])
+                    total_messages = conv.total_messages
+                    state = session_cache.state_from(conv)
+                    transaction.on_commit(lambda state=state: session_cache.put(state, written=True))
+                total_saved += len(new_msgs)
+                should_analyze = bool(decision and decision.run)
+                mark_session_written(session_id)
                 
                 results[session_id] = {
                     "saved": len(session_messages),
-                    "total_messages": conv.total_messages,
+                    "total_messages": total_messages,
                     "analyzed": should_analyze
                 }
+                if decision is not None:
+                    results[session_id]["analysis_gate"] = decision.reason
                 
-                # Run analysis if needed
+                # Run analysis on the background queue once the batch is committed
                 if should_analyze:
-                    logger.info(f"Analysis triggered for session {session_id} after batch: {conv.total_messages} messages")
-                    try:
-                        analyze_conversation(session_id)
-                    except Exception as e:
-                        logger.error(f"Analysis failed for {session_id}: {e}")
+                    logger.info(f"Analysis triggered for session {session_id} after batch: {total_messages} messages")
+                    transaction.on_commit(lambda sid=session_id: _enqueue_analysis(sid))
                         
         except Exception as e:
             logger.error(f"Failed to save batch for session {session_id}: {e}")
+            session_cache.invalidate(session_id)
             results[session_id] = {"error": str(e)}
     
     return {
@@ -236,16 +451,20 @@ def save_message_batch(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
         "sessions": results
     }
 
-def generate_conversation_summary(session_id: str) -> Dict[str, Any]:
-    try:
-        conv = Conversation.objects.get(session_id=session_id)
-    except Conversation.DoesNotExist:
+def generate_conversation_summary(session_id: str, force: bool = False) -> Dict[str, Any]:
+    state = session_cache.load(session_id, verify=True)
+    if state is None:
         return {"status": "error", "message": "conversation not found"}
 
-    msgs = conv.messages_json or []
+    msgs = state.messages
     if not msgs:
         return {"status": "error", "message": "No messages"}
 
+    # Same transcript as the stored summary: return it instead of summarizing again
+    stored = None if force else _stored_summary(state)
+    if stored is not None:
+        return stored["summary_data"]
+    metrics.incr("summary.reuse.forced" if force else "summary.reuse.miss")
     transcript = "\n".join(
         f"{'Customer' if m['role'] == 'user' else 'Ishmael'}: {m['content']}"
         for m in msgs
@@ -258,20 +477,34 @@ def generate_conversation_summary(session_id: str) -> Dict[str, Any]:
         {"role": "user", "content": transcript},
     ]
 
+    started = time.monotonic()
     summary_data = _call_openai(
         messages, functions=[conversation_summary_schema], function_name="summarize_sales_conversation"
     ) or {}
 
-    for pref in conv.preferences.all():
-        if pref.data.get("type") == "budget" and not summary_data.get("budget_range"):
-            summary_data["budget_range"] = pref.data.get("value")
-        if pref.data.get("type") == "usage" and not summary_data.get("use_case"):
-            summary_data["use_case"] = pref.data.get("value")
-
-    conv.summary_data = summary_data
-    conv.summary_generated_at = timezone.now()
-    if not conv.ended_at:
-        conv.ended_at = timezone.now()
-    conv.save(update_fields=["summary_data", "summary_generated_at", "ended_at"])
+    # Per prompt version, so prompt bundles can be compared on latency and outcome
+    prompt = state.prompt_version or "unknown"
+    metrics.observe(f"summary.latency_seconds.{prompt}", time.monotonic() - started)
+    if isinstance(summary_data.get("engagement_score"), (int, float)):
+        metrics.observe(f"summary.engagement_score.{prompt}", summary_data["engagement_score"])
+
+    preferences = state.preferences or {}
+    if preferences.get("budget") and not summary_data.get("budget_range"):
+        summary_data["budget_range"] = preferences["budget"]
+    if preferences.get("usage") and not summary_data.get("use_case"):
+        summary_data["use_case"] = preferences["usage"]
+
+    # An empty (failed) summary records no digest, so the next request tries again
+    digest = transcript_digest(msgs) if summary_data else ""
+    now = timezone.now()
+    Conversation.objects.filter(pk=state.conversation_id).update(
+        summary_data=summary_data,
+        summary_generated_at=now,
+        summary_transcript_digest=digest,
+        summary_message_count=len(msgs),
+        ended_at=Coalesce("ended_at", Value(now, output_field=DateTimeField())),
+    )
+    mark_session_written(session_id)
+    session_cache.put(dataclasses.replace(state, summary_digest=digest, summary_message_count=len(msgs)), written=True)
 
     return summary_data
@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(settings.BASE_DIR) / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_FILE = DIST_DIR / "manifest.json"
+ASSET_URL_PREFIX = "/assets/"
+# Files copied into dist/ by `manage.py build_static_assets` (HTML pages are served by views)
+ASSET_EXTENSIONS = (".js", ".css", ".svg", ".png", ".jpg", ".ico", ".woff2")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Pages keep a stable URL: always revalidate, which costs one conditional request
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only precompression without it
+    brotli = None
+
+@dataclass(frozen=True)
+class CachedFile:
+    body: bytes
+    gzip_body: Optional[bytes]
+    br_body: Optional[bytes]
+    content_type: str
+    etag: str
+    last_modified: float
+    immutable: bool
+
+    def pick(self, accept_encoding: str):
+        # Returns (body, content-encoding or None): the highest q-value coding we have, br on ties
+        accepted = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding, body in (("br", self.br_body), ("gzip", self.gzip_body)):
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if body is not None and q > best_q:
+                best, best_q = encoding, q
+        # identity is always acceptable, but only preferred when the client ranks it higher
+        if best is None or accepted.get("identity", accepted.get("*", 0.0)) > best_q:
+            return self.body, None
+        return (self.br_body if best == "br" else self.gzip_body), best
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # Strong validators must differ per representation: "<hash>", "<hash>-gzip", "<hash>-br"
+        return f'{self.etag[:-1]}-{encoding}"' if encoding else self.etag
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    # --- "gzip, br;q=0.8, *;q=0" -> {"gzip": 1.0, "br": 0.8, "*": 0.0} ---
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def compress(data: bytes):
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    br = brotli.compress(data, quality=11) if brotli else None
+    return gz, br
+
+def _content_type(path: Path) -> str:
+    content_type, _ = mimetypes.guess_type(str(path))
+    if content_type and (content_type.startswith("text/") or content_type == "application/javascript"):
+        content_type += "; charset=utf-8"
+    return content_type or "application/octet-stream"
+
+_lock = threading.Lock()
+_manifest: Optional[Dict[str, str]] = None
+_manifest_mtime: Optional[float] = None
+_files: Dict[str, CachedFile] = {}
+
+def load_manifest() -> Dict[str, str]:
+    # --- {"js/app.js": "js/app.<hash>.js"}; empty until build_static_assets has run ---
+    # Re-read whenever the file changes (one stat per call): a new build changes the hashed
+    # URLs in pages and which assets are immutable, so every cached file is dropped too.
+    global _manifest, _manifest_mtime
+    try:
+        mtime = MANIFEST_FILE.stat().st_mtime
+    except FileNotFoundError:
+        mtime = 0.0
+    if _manifest is not None and mtime == _manifest_mtime:
+        return _manifest
+    with _lock:
+        try:
+            manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            manifest = {}
+        _files.clear()
+        _manifest, _manifest_mtime = manifest, mtime
+    return manifest
+
+def reset() -> None:
+    global _manifest, _manifest_mtime
+    with _lock:
+        _manifest = _manifest_mtime = None
+        _files.clear()
+
+def _render_page(name: str) -> bytes:
+    body = (STATIC_DIR / name).read_text(encoding="utf-8")
+    # Point the page at the hashed, long-cached copies when a build exists
+    for source, hashed in load_manifest().items():
+        body = body.replace(f"/static/{source}", f"{ASSET_URL_PREFIX}{hashed}")
+    return body.encode("utf-8")
+
+def get_page(name: str) -> Optional[CachedFile]:
+    # --- HTML page rendered once and held in memory with validators and compressed copies ---
+    key = f"page:{name}"
+    load_manifest()
+    cached = _files.get(key)
+    if cached is not None and not settings.DEBUG:
+        return cached
+    path = STATIC_DIR / name
+    try:
+        mtime = max(path.stat().st_mtime, MANIFEST_FILE.stat().st_mtime if MANIFEST_FILE.exists() else 0)
+    except FileNotFoundError:
+        return None
+    if cached is not None and cached.last_modified == mtime:
+        return cached
+    with _lock:
+        body = _render_page(name)
+        gz, br = compress(body)
+        cached = CachedFile(body, gz, br, "text/html; charset=utf-8", f'"{content_hash(body)}"', mtime, False)
+        _files[key] = cached
+    return cached
+
+def get_asset(name: str) -> Optional[CachedFile]:
+    # --- Built asset from static/dist, with its precompressed siblings ---
+    load_manifest()
+    cached = _files.get(name)
+    if cached is not None:
+        return cached
+    path = (DIST_DIR / name).resolve()
+    if DIST_DIR.resolve() not in path.parents or not path.is_file() or path.suffix in (".gz", ".br"):
+        return None
+    body = path.read_bytes()
+    gz_path, br_path = Path(f"{path}.gz"), Path(f"{path}.br")
+    cached = CachedFile(
+        body=body,
+        gzip_body=gz_path.read_bytes() if gz_path.exists() else None,
+        br_body=br_path.read_bytes() if br_path.exists() else None,
+        content_type=_content_type(path),
+        etag=f'"{content_hash(body)}"',
+        last_modified=path.stat().st_mtime,
+        # Only content-hashed names may be cached forever
+        immutable=name in load_manifest().values(),
+    )
+    with _lock:
+        _files[name] = cached
+    return cached
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
@@ -0,0 +1,189 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from django.conf import settings
+
+from assistant import metrics
+from assistant.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_KEY = "sessions:active"          # zset: session_id -> lease expiry (ms)
+STARTED_KEY = "sessions:started"        # hash: session_id -> admitted at (ms)
+QUEUE_KEY = "sessions:queue"            # zset: session_id -> enqueued at (ms)
+QUEUE_SEEN_KEY = "sessions:queue:seen"  # zset: session_id -> last poll (ms)
+AVG_DURATION_KEY = "sessions:avg_duration_ms"
+
+# Admit if a slot is free for this caller's place in line, otherwise (re)queue it.
+# Returns {admitted, waited_ms_or_position, expired_leases}.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local lease_ms = tonumber(ARGV[3])
+local queue_ttl_ms = tonumber(ARGV[4])
+local sid = ARGV[5]
+
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now)
+for _, s in ipairs(expired) do
+    redis.call('HDEL', KEYS[2], s)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local abandoned = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', now - queue_ttl_ms)
+for _, s in ipairs(abandoned) do
+    redis.call('ZREM', KEYS[3], s)
+    redis.call('ZREM', KEYS[4], s)
+end
+
+if redis.call('ZSCORE', KEYS[1], sid) then
+    redis.call('ZADD', KEYS[1], now + lease_ms, sid)
+    return {1, 0, #expired}
+end
+
+local rank = redis.call('ZRANK', KEYS[3], sid)
+local position = rank or redis.call('ZCARD', KEYS[3])
+local free = capacity - redis.call('ZCARD', KEYS[1])
+if free > position then
+    local waited = 0
+    local enqueued = redis.call('ZSCORE', KEYS[3], sid)
+    if enqueued then
+        waited = now - tonumber(enqueued)
+    end
+    redis.call('ZREM', KEYS[3], sid)
+    redis.call('ZREM', KEYS[4], sid)
+    redis.call('ZADD', KEYS[1], now + lease_ms, sid)
+    redis.call('HSET', KEYS[2], sid, now)
+    return {1, waited, #expired}
+end
+
+if not rank then
+    redis.call('ZADD', KEYS[3], now, sid)
+end
+redis.call('ZADD', KEYS[4], now, sid)
+return {0, position + 1, #expired}
+"""
+
+# Drop the lease and fold the session's duration into the moving average.
+_RELEASE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local sid = ARGV[2]
+local removed = redis.call('ZREM', KEYS[1], sid)
+redis.call('ZREM', KEYS[3], sid)
+redis.call('ZREM', KEYS[4], sid)
+local started = redis.call('HGET', KEYS[2], sid)
+redis.call('HDEL', KEYS[2], sid)
+if removed == 1 and started then
+    local duration = now - tonumber(started)
+    local avg = tonumber(redis.call('GET', KEYS[5]) or ARGV[3])
+    redis.call('SET', KEYS[5], math.floor(avg * 0.9 + duration * 0.1))
+end
+return removed
+"""
+
+# Renew a live lease only. An expired one is purged instead, so its owner has to go through
+# acquire() and the queue rather than reclaim a slot ahead of queued callers.
+_HEARTBEAT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local sid = ARGV[3]
+local expiry = tonumber(redis.call('ZSCORE', KEYS[1], sid))
+if expiry and expiry > now then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), sid)
+    return 1
+end
+if expiry then
+    redis.call('ZREM', KEYS[1], sid)
+    redis.call('HDEL', KEYS[2], sid)
+end
+return 0
+"""
+
+@dataclass(frozen=True)
+class Admission:
+    admitted: bool
+    position: int = 0
+    estimated_wait_seconds: int = 0
+    retry_after_seconds: int = 0
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def _keys():
+    return [ACTIVE_KEY, STARTED_KEY, QUEUE_KEY, QUEUE_SEEN_KEY]
+
+def _avg_duration_seconds(client) -> float:
+    raw = client.get(AVG_DURATION_KEY)
+    return int(raw) / 1000.0 if raw else float(settings.REALTIME_DEFAULT_SESSION_SECONDS)
+
+def acquire(session_id: str) -> Admission:
+    # --- Lease a realtime session slot, or queue the caller with an estimated wait ---
+    capacity = settings.REALTIME_SESSION_CAPACITY
+    try:
+        client = get_redis()
+        admitted, value, expired = client.eval(
+            _ACQUIRE_SCRIPT, 4, *_keys(), _now_ms(), capacity,
+            int(settings.REALTIME_SESSION_LEASE_SECONDS * 1000),
+            int(settings.REALTIME_QUEUE_TTL_SECONDS * 1000), session_id,
+        )
+    except Exception as e:
+        # Fail open: without Redis we cannot count sessions, so do not block customers
+        logger.warning(f"Session capacity check unavailable, admitting {session_id}: {e}")
+        metrics.incr("capacity.unchecked")
+        return Admission(True)
+
+    if expired:
+        metrics.incr("capacity.lease_expired", int(expired))
+    if admitted:
+        metrics.incr("capacity.admitted")
+        metrics.observe("capacity.queue_wait_seconds", int(value) / 1000.0)
+        return Admission(True)
+
+    position = int(value)
+    # `position` sessions must finish first, `capacity` of them run in parallel
+    estimate = math.ceil(position * _avg_duration_seconds(client) / max(capacity, 1))
+    metrics.incr("capacity.queued")
+    logger.info(f"Session {session_id} queued at position {position} (~{estimate}s)")
+    return Admission(
+        False,
+        position=position,
+        estimated_wait_seconds=estimate,
+        retry_after_seconds=max(1, min(estimate, settings.REALTIME_QUEUE_POLL_SECONDS)),
+    )
+
+def heartbeat(session_id: str) -> bool:
+    # Extends the lease; False means it already timed out
+    try:
+        return bool(get_redis().eval(
+            _HEARTBEAT_SCRIPT, 2, ACTIVE_KEY, STARTED_KEY,
+            _now_ms(), int(settings.REALTIME_SESSION_LEASE_SECONDS * 1000), session_id,
+        ))
+    except Exception as e:
+        logger.warning(f"Session heartbeat failed for {session_id}: {e}")
+        return True
+
+def release(session_id: str) -> bool:
+    try:
+        removed = get_redis().eval(
+            _RELEASE_SCRIPT, 5, *_keys(), AVG_DURATION_KEY,
+            _now_ms(), session_id, int(settings.REALTIME_DEFAULT_SESSION_SECONDS * 1000),
+        )
+    except Exception as e:
+        logger.warning(f"Session release failed for {session_id}: {e}")
+        return False
+    if removed:
+        metrics.incr("capacity.released")
+    return bool(removed)
+
+def status() -> Dict[str, Any]:
+    try:
+        client = get_redis()
+        now = _now_ms()
+        return {
+            "capacity": settings.REALTIME_SESSION_CAPACITY,
+            "active": client.zcount(ACTIVE_KEY, now, "+inf"),
+            "queued": client.zcard(QUEUE_KEY),
+            "avg_session_seconds": round(_avg_duration_seconds(client), 1),
+        }
+    except Exception as e:
+        return {"capacity": settings.REALTIME_SESSION_CAPACITY, "error": str(e)}
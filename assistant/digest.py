@@ -0,0 +1,157 @@
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Prefetch, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from assistant import metrics
+from assistant.export import conversation_record, render_csv
+from assistant.models import REPLAY_PREFIX, Conversation, UserPreference, VehicleInterest
+from assistant.task_status import claim_inflight, release_inflight
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TEMPLATE = "assistant/summary_digest.html"
+INTENT_RANK = {"high": 0, "medium": 1, "low": 2}
+# One digest run at a time across beat and manual runs; expires if a run dies mid-send
+DIGEST_LOCK_KEY = "digest:lock"
+DIGEST_LOCK_SECONDS = 600
+
+def pending_conversations(limit: int) -> List[Conversation]:
+    # --- Summarized, not yet emailed; oldest summaries first so a capped digest drains the backlog ---
+    qs = Conversation.objects.filter(summary_emailed_at__isnull=True)
+    if settings.SUMMARY_EMAIL_LOOKBACK_DAYS is not None:
+        qs = qs.filter(started_at__gte=timezone.now() - timedelta(days=settings.SUMMARY_EMAIL_LOOKBACK_DAYS))
+    qs = (
+        qs.exclude(Q(summary_data__isnull=True) | Q(summary_data={}) | Q(session_id__startswith=REPLAY_PREFIX))
+        .defer("messages_json")
+        .prefetch_related(
+            Prefetch("preferences", queryset=UserPreference.objects.order_by("extracted_at")),
+            Prefetch("vehicle_interests", queryset=VehicleInterest.objects.order_by("timestamp")),
+        )
+        .order_by("summary_generated_at", "id")
+    )
+    return list(qs[:limit])
+
+def _score(summary: Dict[str, Any]) -> int:
+    try:
+        return int(summary.get("engagement_score") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def digest_row(conv: Conversation) -> Dict[str, Any]:
+    summary = conv.summary_data or {}
+    vehicles = summary.get("recommended_vehicles") or [v.vehicle_name for v in conv.vehicle_interests.all()]
+    return {
+        "session_id": conv.session_id,
+        "started_at": conv.started_at,
+        "customer_name": summary.get("customer_name") or "Unknown",
+        "contact_info": summary.get("contact_info") or "",
+        "purchase_intent": summary.get("purchase_intent") or "unknown",
+        "engagement_score": _score(summary),
+        "budget_range": summary.get("budget_range") or "",
+        "use_case": summary.get("use_case") or "",
+        "vehicles": ", ".join(vehicles),
+        "summary": summary.get("summary") or "",
+        "next_actions": summary.get("next_actions") or [],
+    }
+
+def sort_key(row: Dict[str, Any]):
+    # Hottest leads first: purchase intent, then engagement, then most recent
+    return INTENT_RANK.get(row["purchase_intent"], len(INTENT_RANK)), -row["engagement_score"], -row["started_at"].timestamp()
+
+def _plain_text(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{len(rows)} new conversation summaries (details in the attached CSV):", ""]
+    for row in rows:
+        lines.append(
+            f"- [{row['purchase_intent']}, {row['engagement_score']}/10] {row['customer_name']}: {row['summary']}"
+        )
+    return "\n".join(lines)
+
+def build_digest(conversations: List[Conversation]) -> Dict[str, Any]:
+    rows = sorted((digest_row(conv) for conv in conversations), key=sort_key)
+    high = sum(1 for row in rows if row["purchase_intent"] == "high")
+    by_session = {conv.session_id: conv for conv in conversations}
+    return {
+        "subject": f"Conversation digest: {len(rows)} new summaries ({high} high intent)",
+        "text": _plain_text(rows),
+        "html": render_to_string(DIGEST_TEMPLATE, {"rows": rows, "high_intent": high, "generated_at": timezone.now()}),
+        "csv": render_csv(conversation_record(by_session[row["session_id"]]) for row in rows),
+    }
+
+def send_digest(recipients: List[str], limit: int) -> int:
+    # --- One digest per recipient over a single SMTP connection; returns conversations delivered ---
+    if not recipients:
+        logger.warning("Summary digest skipped: SUMMARY_EMAIL_RECIPIENTS is empty")
+        return 0
+    token = uuid.uuid4().hex
+    holder = claim_inflight(DIGEST_LOCK_KEY, token, DIGEST_LOCK_SECONDS)
+    if holder:
+        logger.info(f"Summary digest skipped: run {holder} is still sending")
+        return 0
+    try:
+        return _send_locked(recipients, limit)
+    finally:
+        release_inflight(DIGEST_LOCK_KEY, token)
+
+def _digest_message(digest: Dict[str, Any], recipient: str, stamp: str, connection) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        digest["subject"], digest["text"], settings.DEFAULT_FROM_EMAIL, [recipient], connection=connection
+    )
+    message.attach_alternative(digest["html"], "text/html")
+    message.attach(f"conversation_digest_{stamp}.csv", digest["csv"], "text/csv")
+    return message
+
+def _send_locked(recipients: List[str], limit: int) -> int:
+    conversations = pending_conversations(limit)
+    if not conversations:
+        return 0
+
+    # Delivery is tracked per recipient: a failed send is retried next window for that
+    # recipient only, and nobody gets a conversation twice
+    stamp = timezone.now().strftime("%Y%m%d-%H%M")
+    delivered = set()
+    with get_connection() as connection:
+        for recipient in recipients:
+            batch = [conv for conv in conversations if recipient not in (conv.digest_sent_to or [])]
+            if not batch:
+                continue
+            try:
+                _digest_message(build_digest(batch), recipient, stamp, connection).send()
+            except Exception as e:
+                metrics.incr("digest.recipient_failed")
+                logger.error(f"Summary digest to {recipient} failed: {e}")
+                continue
+            for conv in batch:
+                conv.digest_sent_to = [*(conv.digest_sent_to or []), recipient]
+                delivered.add(conv.id)
+            # Recorded straight away, so a crash before the next recipient does not re-send this one
+            Conversation.objects.bulk_update(batch, ["digest_sent_to"])
+
+    now = timezone.now()
+    give_up_before = now - timedelta(hours=settings.SUMMARY_DIGEST_RETRY_HOURS)
+    done, undelivered = [], 0
+    for conv in conversations:
+        missing = [r for r in recipients if r not in conv.digest_sent_to]
+        if missing and conv.summary_generated_at and conv.summary_generated_at < give_up_before:
+            undelivered += 1
+            logger.error(f"Summary digest for {conv.session_id} never reached {', '.join(missing)}; giving up")
+            missing = []
+        if not missing:
+            conv.summary_emailed_at = now
+            done.append(conv)
+    if done:
+        Conversation.objects.bulk_update(done, ["summary_emailed_at"])
+    if undelivered:
+        metrics.incr("digest.undelivered", undelivered)
+
+    logger.info(
+        f"Summary digest: {len(delivered)}/{len(conversations)} conversations delivered this run, "
+        f"{len(done)} complete for all {len(recipients)} recipients"
+    )
+    return len(delivered)
@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from assistant.models import REPLAY_PREFIX, Conversation, UserPreference, VehicleInterest
+from assistant.routers import read_replica_alias
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CHUNK_SIZE = 500
+# Flush the CSV buffer once it grows past this many characters
+CSV_FLUSH_SIZE = 64 * 1024
+
+CSV_FIELDS = [
+    "session_id",
+    "user_id",
+    "started_at",
+    "ended_at",
+    "total_messages",
+    "summary_generated_at",
+    "summary_emailed_at",
+    "summary",
+    "customer_name",
+    "contact_info",
+    "budget_range",
+    "vehicle_type",
+    "use_case",
+    "sentiment",
+    "engagement_score",
+    "purchase_intent",
+    "recommended_vehicles",
+    "preferences",
+    "vehicle_interests",
+]
+
+def parse_since(value: str) -> Optional[datetime]:
+    # --- Parse an ISO watermark into the timezone mode the DB expects ---
+    # None for anything unparseable, including well-formed but impossible dates (2024-13-45)
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        return None
+    if since is None:
+        return None
+    if settings.USE_TZ and timezone.is_naive(since):
+        return timezone.make_aware(since)
+    if not settings.USE_TZ and timezone.is_aware(since):
+        return timezone.make_naive(since)
+    return since
+
+def export_queryset(since: Optional[datetime] = None, include_messages: bool = False) -> QuerySet:
+    # --- Conversations plus their child rows, prefetched per iterator chunk (no N+1) ---
+    preferences = UserPreference.objects.only("conversation_id", "data", "extracted_at").order_by("extracted_at")
+    interests = VehicleInterest.objects.only("conversation_id", "vehicle_name", "meta", "timestamp").order_by("timestamp")
+    # Replay harness rows are not real customers
+    qs = (
+        Conversation.objects.using(read_replica_alias())
+        .exclude(session_id__startswith=REPLAY_PREFIX)
+        .order_by("id")
+        .prefetch_related(
+            Prefetch("preferences", queryset=preferences),
+            Prefetch("vehicle_interests", queryset=interests),
+        )
+    )
+    if not include_messages:
+        qs = qs.defer("messages_json")
+    if since:
+        # Incremental export: anything started, summarized or re-analyzed after the watermark
+        qs = qs.filter(
+            Q(started_at__gt=since)
+            | Q(summary_generated_at__gt=since)
+            | Exists(UserPreference.objects.filter(conversation=OuterRef("pk"), extracted_at__gt=since))
+            | Exists(VehicleInterest.objects.filter(conversation=OuterRef("pk"), timestamp__gt=since))
+        )
+    return qs
+
+def conversation_record(conv: Conversation, include_messages: bool = False) -> Dict[str, Any]:
+    record = {
+        "session_id": conv.session_id,
+        "user_id": conv.user_id,
+        "started_at": conv.started_at,
+        "ended_at": conv.ended_at,
+        "total_messages": conv.total_messages,
+        "summary_generated_at": conv.summary_generated_at,
+        "summary_emailed_at": conv.summary_emailed_at,
+        "summary": conv.summary_data or {},
+        "preferences": [
+            {**(p.data or {}), "extracted_at": p.extracted_at} for p in conv.preferences.all()
+        ],
+        "vehicle_interests": [
+            {"vehicle_name": v.vehicle_name, "timestamp": v.timestamp, **(v.meta or {})}
+            for v in conv.vehicle_interests.all()
+        ],
+    }
+    if include_messages:
+        record["messages"] = conv.messages_json or []
+    return record
+
+def _csv_row(record: Dict[str, Any]) -> List[Any]:
+    summary = record["summary"]
+    row = {key: record.get(key) for key in CSV_FIELDS}
+    for key in ("summary", "customer_name", "contact_info", "budget_range", "vehicle_type",
+                "use_case", "sentiment", "engagement_score", "purchase_intent"):
+        row[key] = summary.get(key)
+    row["recommended_vehicles"] = "; ".join(summary.get("recommended_vehicles") or [])
+    row["preferences"] = json.dumps(record["preferences"], cls=DjangoJSONEncoder, ensure_ascii=False)
+    row["vehicle_interests"] = "; ".join(v["vehicle_name"] for v in record["vehicle_interests"])
+    return ["" if row[key] is None else row[key] for key in CSV_FIELDS]
+
+def iter_ndjson(qs: QuerySet, include_messages: bool = False, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    # The transaction keeps the server-side cursor valid behind pgbouncer transaction pooling
+    with transaction.atomic(using=qs.db):
+        for conv in qs.iterator(chunk_size=chunk_size):
+            yield (encoder.encode(conversation_record(conv, include_messages)) + "\n").encode("utf-8")
+
+def iter_csv(qs: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    with transaction.atomic(using=qs.db):
+        for conv in qs.iterator(chunk_size=chunk_size):
+            writer.writerow(_csv_row(conversation_record(conv)))
+            if buffer.tell() >= CSV_FLUSH_SIZE:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def render_csv(records: Iterable[Dict[str, Any]]) -> bytes:
+    # Small in-memory CSV in the export layout (e.g. an email attachment)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for record in records:
+        writer.writerow(_csv_row(record))
+    return buffer.getvalue().encode("utf-8")
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    # wbits=31 -> gzip container, so the output is a regular .gz file
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def iter_export(
+    fmt: str = "ndjson",
+    since: Optional[datetime] = None,
+    include_messages: bool = False,
+    compress: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "csv":
+        # Transcripts do not fit a flat CSV row
+        chunks = iter_csv(export_queryset(since, include_messages=False), chunk_size)
+    else:
+        chunks = iter_ndjson(export_queryset(since, include_messages), include_messages, chunk_size)
+    return gzip_stream(chunks) if compress else chunks
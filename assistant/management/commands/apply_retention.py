@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from assistant import retention
+from assistant.export import parse_since
+
+class Command(BaseCommand):
+    help = "Delete or anonymize conversations past the retention window in small, paused chunks (safe to rerun)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=retention.RETENTION_MODES, default=settings.CONVERSATION_RETENTION_MODE)
+        parser.add_argument("--days", type=int, default=settings.CONVERSATION_RETENTION_DAYS,
+                            help="Process conversations started more than this many days ago.")
+        parser.add_argument("--before", help="Explicit cutoff (ISO date/time) instead of --days.")
+        parser.add_argument("--chunk-size", type=int, default=settings.RETENTION_CHUNK_SIZE)
+        parser.add_argument("--pause", type=float, default=settings.RETENTION_PAUSE_SECONDS,
+                            help="Seconds to sleep between chunks.")
+        parser.add_argument("--max-seconds", type=float, help="Stop after this long; the next run resumes.")
+        parser.add_argument("--keep-partitions", action="store_true",
+                            help="delete: use chunked deletes even where whole partitions could be dropped.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the conversations that would be processed.")
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            cutoff = parse_since(options["before"])
+            if cutoff is None:
+                raise CommandError(f"Invalid --before: {options['before']}")
+        elif options["days"] > 0:
+            cutoff = timezone.now() - timedelta(days=options["days"])
+        else:
+            raise CommandError("Pass --days N or --before DATE (CONVERSATION_RETENTION_DAYS is not set).")
+
+        if options["dry_run"]:
+            count = retention.pending_queryset(options["mode"], cutoff).count()
+            self.stdout.write(f"{count} conversations started before {cutoff.isoformat()} would be {options['mode']}d.")
+            return
+
+        report = retention.apply_retention(
+            options["mode"],
+            cutoff,
+            chunk_size=max(1, options["chunk_size"]),
+            pause_seconds=options["pause"],
+            max_seconds=options["max_seconds"],
+            drop_partitions=not options["keep_partitions"],
+        )
+        self.stdout.write(str(report))
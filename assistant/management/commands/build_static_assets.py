@@ -0,0 +1,45 @@
+import json
+import shutil
+
+from django.core.management.base import BaseCommand
+
+from assistant import assets
+
+class Command(BaseCommand):
+    help = "Build content-hashed, gzip/brotli-precompressed copies of static/ assets into static/dist."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clean", action="store_true",
+                            help="Remove static/dist first (by default older hashed files are kept for clients mid-deploy).")
+
+    def handle(self, *args, **options):
+        if options["clean"] and assets.DIST_DIR.exists():
+            shutil.rmtree(assets.DIST_DIR)
+        assets.DIST_DIR.mkdir(parents=True, exist_ok=True)
+
+        manifest = {}
+        for path in sorted(assets.STATIC_DIR.rglob("*")):
+            if not path.is_file() or assets.DIST_DIR in path.parents or path.suffix not in assets.ASSET_EXTENSIONS:
+                continue
+            source = path.relative_to(assets.STATIC_DIR).as_posix()
+            data = path.read_bytes()
+            hashed = path.relative_to(assets.STATIC_DIR).with_name(f"{path.stem}.{assets.content_hash(data)}{path.suffix}")
+            target = assets.DIST_DIR / hashed
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+
+            gz, br = assets.compress(data)
+            target.with_name(target.name + ".gz").write_bytes(gz)
+            sizes = f"{len(data)} B, gzip {len(gz)} B"
+            if br is not None:
+                target.with_name(target.name + ".br").write_bytes(br)
+                sizes += f", brotli {len(br)} B"
+            manifest[source] = hashed.as_posix()
+            self.stdout.write(f"{source} -> {hashed.as_posix()} ({sizes})")
+
+        assets.MANIFEST_FILE.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+        # Running servers notice the new manifest's mtime; this covers the current process
+        assets.reset()
+        if assets.brotli is None:
+            self.stdout.write("brotli is not installed; only gzip copies were written (pip install brotli).")
+        self.stdout.write(f"Wrote {len(manifest)} assets and {assets.MANIFEST_FILE}")
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from assistant import partitioning
+from assistant.export import parse_since
+
+class Command(BaseCommand):
+    help = "Manage monthly RANGE partitions for conversations and their preferences/vehicle interests (PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["enable", "ensure", "detach", "list"])
+        parser.add_argument("--ahead", type=int, default=settings.CONVERSATION_PARTITIONS_AHEAD,
+                            help="Months of partitions to create ahead of the current one.")
+        parser.add_argument("--before", help="detach: partitions ending on or before this date (YYYY-MM-DD).")
+        parser.add_argument("--drop", action="store_true", help="detach: drop the detached tables as well.")
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        if action == "enable":
+            converted = partitioning.enable_partitioning(options["ahead"])
+            self.stdout.write(f"Partitioned: {', '.join(converted) or 'nothing to do'}")
+        elif action == "ensure":
+            created = partitioning.ensure_partitions(options["ahead"])
+            self.stdout.write(f"Created: {', '.join(created) or 'all partitions already exist'}")
+        elif action == "detach":
+            cutoff = parse_since(options["before"] or "")
+            if cutoff is None:
+                raise CommandError("detach requires --before YYYY-MM-DD")
+            detached = partitioning.detach_partitions_before(cutoff, drop=options["drop"])
+            self.stdout.write(f"Detached: {', '.join(detached) or 'none'}")
+        else:
+            for table in partitioning.partitioned_tables():
+                if not partitioning.is_partitioned(table):
+                    self.stdout.write(f"{table}: not partitioned")
+                    continue
+                names = [name for name, _ in partitioning.list_partitions(table)]
+                self.stdout.write(f"{table}: {len(names)} partitions ({names[0] if names else '-'} .. {names[-1] if names else '-'})")
@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from assistant.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export, parse_since
+
+class Command(BaseCommand):
+    help = "Stream conversations with their summaries, preferences and vehicle interests as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--output", "-o", help="Output file (defaults to stdout).")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output.")
+        parser.add_argument("--since", help="Only export conversations changed after this ISO timestamp.")
+        parser.add_argument(
+            "--watermark-file",
+            help="Read --since from this file and write the new watermark to it after a successful export.",
+        )
+        parser.add_argument("--include-messages", action="store_true", help="Include transcripts (NDJSON only).")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        watermark_file = Path(options["watermark_file"]) if options["watermark_file"] else None
+        raw_since = options["since"]
+        if not raw_since and watermark_file and watermark_file.exists():
+            raw_since = watermark_file.read_text(encoding="utf-8").strip()
+
+        since = None
+        if raw_since:
+            since = parse_since(raw_since)
+            if since is None:
+                raise CommandError(f"Invalid --since timestamp: {raw_since}")
+
+        # Taken before the query runs, so rows changed mid-export are picked up next time
+        export_started = timezone.now()
+        chunks = iter_export(
+            options["format"],
+            since=since,
+            include_messages=options["include_messages"],
+            compress=options["gzip"],
+            chunk_size=options["chunk_size"],
+        )
+
+        total_bytes = 0
+        if options["output"]:
+            with open(options["output"], "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+                    total_bytes += len(chunk)
+        else:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+                total_bytes += len(chunk)
+            out.flush()
+
+        if watermark_file:
+            watermark_file.write_text(export_started.isoformat(), encoding="utf-8")
+        self.stderr.write(f"Exported {total_bytes} bytes (since={since.isoformat() if since else 'beginning'}).")
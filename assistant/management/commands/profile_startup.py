@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a web process and a Celery worker import on top of django.setup()
+DEFAULT_TARGETS = ["voice_assistant.wsgi", settings.ROOT_URLCONF, "assistant.tasks", "assistant.analyzer"]
+
+class Command(BaseCommand):
+    help = "Report import time per module for a cold web/Celery process (uses python -X importtime)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", help="Modules to import after django.setup() (default: web + worker entry points).")
+        parser.add_argument("--top", type=int, default=20, help="Number of modules to list.")
+        parser.add_argument("--self-time", action="store_true", help="Sort by self time instead of cumulative time.")
+
+    def handle(self, *args, **options):
+        targets = options["modules"] or DEFAULT_TARGETS
+        script = "import django; django.setup()\n" + "".join(f"import {m}\n" for m in targets)
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "voice_assistant.settings")}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            capture_output=True, text=True, env=env, cwd=str(settings.BASE_DIR),
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Import failed:\n{proc.stderr[-2000:]}")
+
+        rows = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.strip(), int(self_us), int(cumulative_us), len(name) - len(name.lstrip())))
+
+        total_us = sum(r[1] for r in rows)
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in rows:
+            by_package[name.split(".")[0]] += self_us
+
+        self.stdout.write(f"Total import time: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+        self.stdout.write("By top-level package (self time):")
+        for package, us in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:options["top"]]:
+            self.stdout.write(f"  {us / 1000:9.1f} ms  {package}")
+
+        key = 1 if options["self_time"] else 2
+        label = "self" if options["self_time"] else "cumulative"
+        # Only top-level imports are meaningful for cumulative ordering
+        candidates = rows if options["self_time"] else [r for r in rows if r[3] <= 3]
+        self.stdout.write(f"\nSlowest modules ({label}):")
+        for row in sorted(candidates, key=lambda r: r[key], reverse=True)[:options["top"]]:
+            self.stdout.write(f"  {row[key] / 1000:9.1f} ms  {row[0]}")
@@ -0,0 +1,115 @@
+import json
+import multiprocessing
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from assistant import replay
+
+class Command(BaseCommand):
+    help = (
+        "Replay recorded transcripts message by message through save_message_batch -> analyze_conversation -> "
+        "generate_conversation_summary and report throughput, LLM usage, DB queries and extraction diffs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", help="NDJSON fixture (export_conversations --include-messages); default: the database.")
+        parser.add_argument("--session", action="append", dest="sessions", help="Replay only these session IDs (database input).")
+        parser.add_argument("--limit", type=int, help="Replay at most this many conversations.")
+        parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+        parser.add_argument("--llm", default="assistant.replay.fake_llm",
+                            help="Dotted path to the LLM backend (assistant.analyzer.openai_backend calls OpenAI).")
+        parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated latency per fake LLM call.")
+        parser.add_argument("--analysis-batch-size", type=int, help="Override ANALYSIS_MESSAGE_BATCH_SIZE for this run.")
+        parser.add_argument("--messages-per-batch", type=int, default=1,
+                            help="Messages per save_message_batch call (the page flushes a few at a time).")
+        parser.add_argument("--baseline", help="Compare extractions with this file from an earlier --save-baseline.")
+        parser.add_argument("--save-baseline", help="Write this run's extractions to a file.")
+        parser.add_argument("--report", help="Write per-conversation results as JSON.")
+        parser.add_argument("--keep", action="store_true", help="Keep the replayed conversations in the database.")
+        parser.add_argument("--cleanup", action="store_true", help="Only delete conversations left by earlier replays.")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            self.stdout.write(f"Deleted {replay.cleanup()} replayed rows.")
+            return
+
+        if options["input"]:
+            transcripts = list(replay.transcripts_from_ndjson(options["input"], options["limit"]))
+        else:
+            transcripts = list(replay.transcripts_from_db(options["limit"], options["sessions"]))
+        if not transcripts:
+            raise CommandError("No transcripts to replay.")
+
+        run_id = replay.new_run_id()
+        worker_options = {
+            "llm_backend": options["llm"],
+            "analysis_batch_size": options["analysis_batch_size"],
+            "llm_latency_ms": options["llm_latency_ms"],
+        }
+        jobs = [
+            ((source, messages, run_id, max(1, options["messages_per_batch"]), options["keep"]), worker_options)
+            for source, messages in transcripts
+        ]
+        workers = max(1, min(options["workers"], len(jobs)))
+        self.stderr.write(f"Replaying {len(jobs)} conversations with {workers} worker(s), run {run_id}, LLM {options['llm']}")
+
+        started = time.perf_counter()
+        if workers == 1:
+            results = [replay.replay_task(job) for job in jobs]
+        else:
+            # Children open their own connections
+            connections.close_all()
+            with multiprocessing.Pool(workers, initializer=replay.init_worker) as pool:
+                results = list(pool.imap_unordered(replay.replay_task, jobs))
+        wall = time.perf_counter() - started
+
+        self._report(results, wall)
+        extractions = {r["source"]: r["extraction"] for r in results if "extraction" in r}
+        if options["save_baseline"]:
+            Path(options["save_baseline"]).write_text(json.dumps(extractions, indent=2, ensure_ascii=False), encoding="utf-8")
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+        if options["baseline"]:
+            baseline = json.loads(Path(options["baseline"]).read_text(encoding="utf-8"))
+            diffs = replay.diff_extractions(baseline, extractions)
+            self.stdout.write(f"Extraction diffs vs baseline: {len(diffs)}/{len(extractions)} conversations changed")
+            for source, changes in sorted(diffs.items()):
+                self.stdout.write(f"  {source}")
+                for change in changes:
+                    self.stdout.write(f"    {change}")
+        if options["report"]:
+            Path(options["report"]).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def _report(self, results, wall):
+        ok = [r for r in results if "error" not in r]
+        for failed in (r for r in results if "error" in r):
+            self.stderr.write(f"  {failed['source']}: {failed['error']}")
+        for r in ok:
+            for error in r["pipeline_errors"]:
+                self.stderr.write(f"  {r['source']}: {error}")
+        if not ok:
+            raise CommandError("Every replay failed.")
+        n = len(ok)
+        messages = sum(r["messages"] for r in ok)
+        latencies = sorted(r["seconds"] for r in ok)
+        p95 = latencies[min(n - 1, int(n * 0.95))]
+
+        def per_conv(key):
+            return sum(r[key] for r in ok) / n
+
+        self.stdout.write(
+            f"Replayed {n} conversations ({messages} messages, {len(results) - n} failed) in {wall:.2f}s: "
+            f"{n / wall:.1f} conv/s, {messages / wall:.1f} msg/s"
+        )
+        degraded = sum(1 for r in ok if r["pipeline_errors"])
+        if degraded:
+            self.stdout.write(f"{degraded} conversation(s) hit pipeline errors; their extractions are incomplete")
+        self.stdout.write(f"Per conversation: median {statistics.median(latencies) * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms")
+        self.stdout.write(
+            f"Per conversation: {per_conv('calls'):.2f} LLM calls, {per_conv('prompt_tokens'):.0f} prompt + "
+            f"{per_conv('completion_tokens'):.0f} completion tokens, {per_conv('db_queries'):.1f} DB queries"
+        )
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict
+
+from assistant.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = "metrics:counters"
+# Counters are buffered in-process and pushed to Redis at most this often,
+# so recording a metric on the hot path never waits on the network.
+FLUSH_INTERVAL_SECONDS = 5.0
+
+# Off in processes whose counts must not reach the cluster-wide counters (replay workers)
+FLUSH_ENABLED = True
+
+_lock = threading.Lock()
+_pending: Dict[str, float] = defaultdict(float)
+_totals: Dict[str, float] = defaultdict(float)
+_last_flush = time.monotonic()
+
+def incr(name: str, amount: float = 1) -> None:
+    with _lock:
+        _pending[name] += amount
+        _totals[name] += amount
+    _maybe_flush()
+
+def observe(name: str, value: float) -> None:
+    # Timings/sizes: keep a sum and a count so averages can be derived
+    with _lock:
+        for key, amount in ((f"{name}.sum", value), (f"{name}.count", 1)):
+            _pending[key] += amount
+            _totals[key] += amount
+    _maybe_flush()
+
+def local_value(name: str) -> float:
+    # Totals recorded by this process since start-up
+    return _totals.get(name, 0.0)
+
+def _maybe_flush() -> None:
+    global _last_flush
+    if time.monotonic() - _last_flush < FLUSH_INTERVAL_SECONDS:
+        return
+    from django.db import connection, transaction  # local import keeps module import light
+
+    if connection.in_atomic_block:
+        # Never wait on Redis while holding row locks; flush once the transaction commits
+        # (after a rollback the counters stay pending for the next flush)
+        _last_flush = time.monotonic()
+        transaction.on_commit(flush)
+        return
+    flush()
+
+def flush() -> None:
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending or not FLUSH_ENABLED:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for name, amount in pending.items():
+            pipe.hincrbyfloat(COUNTERS_KEY, name, amount)
+        pipe.execute()
+    except Exception as e:
+        # Put them back; they will be retried with the next flush
+        with _lock:
+            for name, amount in pending.items():
+                _pending[name] += amount
+        logger.debug(f"Metrics flush failed: {e}")
+
+def snapshot() -> Dict[str, float]:
+    # --- Cluster-wide counters (falls back to this process when Redis is down) ---
+    flush()
+    try:
+        raw = get_redis().hgetall(COUNTERS_KEY)
+        return {name: float(value) for name, value in sorted(raw.items())}
+    except Exception as e:
+        logger.warning(f"Metrics unavailable from Redis, returning local counters: {e}")
+        with _lock:
+            return dict(sorted(_totals.items()))
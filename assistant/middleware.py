@@ -1,6 +1,9 @@
 import time
+import random
 import logging
 
+from django.conf import settings
+
 logger = logging.getLogger(__name__)
 
 class RequestLoggingMiddleware:
@@ -9,6 +12,10 @@ class RequestLoggingMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
+        # Opt-in: QUERY_PROFILING=True profiles QUERY_PROFILE_SAMPLE_RATE of requests
+        if settings.QUERY_PROFILING and random.random() < settings.QUERY_PROFILE_SAMPLE_RATE:
+            return self._profiled(request)
+
         start_time = time.time()
 
         response = self.get_response(request)
@@ -16,4 +23,30 @@ class RequestLoggingMiddleware:
         elapsed_time = time.time() - start_time
         logger.info(f"Request to {request.path} took {elapsed_time:.3f} seconds.")
 
-        return response
\ No newline at end of file
+        return response
+
+    def _profiled(self, request):
+        from assistant.queryprofile import profile_queries  # local import keeps module import light
+
+        start_time = time.time()
+        # Streaming responses (exports) run most of their queries after this returns
+        with profile_queries() as profile:
+            response = self.get_response(request)
+        elapsed_time = time.time() - start_time
+
+        logger.info(
+            f"Request to {request.path} took {elapsed_time:.3f} seconds "
+            f"({profile.count} queries, {profile.total_ms:.1f}ms DB)."
+        )
+        response["X-DB-Queries"] = str(profile.count)
+        response["X-DB-Time-Ms"] = f"{profile.total_ms:.1f}"
+
+        for shape in profile.repeated(settings.QUERY_REPEAT_THRESHOLD):
+            logger.warning(
+                f"Possible N+1 on {request.method} {request.path}: same query {shape.count}x "
+                f"({shape.total_ms:.1f}ms): {shape.sql[:300]}"
+            )
+        if elapsed_time * 1000 >= settings.SLOW_REQUEST_MS and random.random() < settings.SLOW_REQUEST_REPORT_RATE:
+            logger.warning(f"Slow request {request.method} {request.path} ({elapsed_time:.3f}s): {profile.report()}")
+
+        return response
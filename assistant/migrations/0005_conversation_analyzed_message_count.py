@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0004_conversation_summary_emailed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='analyzed_message_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
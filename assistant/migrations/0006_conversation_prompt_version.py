@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0005_conversation_analyzed_message_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='prompt_version',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0006_conversation_prompt_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='anonymized_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:11
+
+# Schema divergence: `python manage.py conversation_partitions enable` (assistant/partitioning.py)
+# rewrites the three tables outside the migration framework on PostgreSQL. Django's migration state
+# still describes plain tables, but the real schema then has:
+#   - conversations, preferences and vehicle interests as RANGE-partitioned parents, with
+#     PRIMARY KEY (id, <partition column>) and ids from a plain sequence instead of an identity;
+#   - no database-level foreign keys from preferences/vehicle interests to conversations
+#     (Django's on_delete=CASCADE emulation still applies to ORM deletes);
+#   - no unique constraint on Conversation.session_id; uniqueness is enforced by the
+#     trigger-maintained assistant_conversation_session_ids table instead;
+#   - conversation_started_at NOT NULL, since it is part of the child primary keys.
+# Later migrations that touch these tables (constraints, indexes, FKs, the id column) must check
+# partitioning.is_partitioned() and use RunSQL / SeparateDatabaseAndState on partitioned databases.
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_conversation_started_at(apps, schema_editor):
+    Conversation = apps.get_model("assistant", "Conversation")
+    started_at = Subquery(Conversation.objects.filter(pk=OuterRef("conversation_id")).values("started_at")[:1])
+    for name in ("UserPreference", "VehicleInterest"):
+        apps.get_model("assistant", name).objects.filter(conversation_started_at__isnull=True).update(
+            conversation_started_at=started_at
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0008_conversation_summary_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpreference',
+            name='conversation_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicleinterest',
+            name='conversation_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_conversation_started_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0009_child_conversation_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='digest_sent_to',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
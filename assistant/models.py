@@ -1,6 +1,10 @@
 from django.db import models
 from django.utils import timezone
 
+# Session id prefix of rows written by the offline replay harness (assistant/replay.py);
+# emails, digests, exports and listings leave them out
+REPLAY_PREFIX = "replay_"
+
 class Conversation(models.Model): 
     session_id = models.CharField(max_length=255, unique=True, db_index=True)
     user_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
@@ -12,6 +16,17 @@ class Conversation(models.Model):
     summary_data = models.JSONField(default=dict, blank=True)
     summary_generated_at = models.DateTimeField(null=True, blank=True)
     summary_emailed_at = models.DateTimeField(null=True, blank=True)
+    # Digest mode: recipients that already have this conversation; summary_emailed_at is set once all do
+    digest_sent_to = models.JSONField(default=list, blank=True)
+    # Transcript the stored summary was generated from; unchanged transcript -> summary is reused
+    summary_transcript_digest = models.CharField(max_length=64, blank=True, default="")
+    summary_message_count = models.IntegerField(default=0)
+    # Messages already seen by the analysis novelty gate
+    analyzed_message_count = models.IntegerField(default=0)
+    # Prompt bundle (name@version) the realtime session was created with
+    prompt_version = models.CharField(max_length=100, blank=True, default="", db_index=True)
+    # Set once the retention job has redacted PII from the transcript and summary
+    anonymized_at = models.DateTimeField(null=True, blank=True, db_index=True)
     
     class Meta:
         ordering = ['-started_at']
@@ -23,6 +38,8 @@ class UserPreference(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='preferences')
     data = models.JSONField(default=dict)
     extracted_at = models.DateTimeField(default=timezone.now)
+    # Copy of conversation.started_at: the partition key, so a month retires with its conversations
+    conversation_started_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-extracted_at']
@@ -35,6 +52,8 @@ class VehicleInterest(models.Model):
     vehicle_name = models.CharField(max_length=100, db_index=True)
     meta = models.JSONField(default=dict)
     timestamp = models.DateTimeField(default=timezone.now)
+    # Copy of conversation.started_at: the partition key, so a month retires with its conversations
+    conversation_started_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-timestamp']
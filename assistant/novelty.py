@@ -0,0 +1,119 @@
+import hashlib
+import random
+import re
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, List, Sequence, Tuple
+
+# --- Novelty gate: decide whether new user turns can change the extracted preferences ---
+
+NUM_PERM = 32
+SHINGLE_SIZE = 3
+# Near-duplicate of something the customer already said
+DUPLICATE_SIMILARITY = 0.8
+# Signal-free text shorter than this (in content words) is not worth an LLM call
+MIN_NOVEL_WORDS = 4
+
+FILLER_WORDS: FrozenSet[str] = frozenset({
+    "ok", "okay", "k", "yes", "yeah", "yep", "ya", "yup", "hmm", "hm", "mm", "mmm",
+    "uh", "um", "ah", "oh", "huh", "sure", "right", "fine", "cool", "great", "nice", "good", "alright",
+    "thanks", "thank", "you", "please", "so", "and", "well", "i", "see", "got", "it", "that", "is",
+    "hello", "hi", "hey", "bye", "namaste", "haan", "achha", "accha", "ji", "the", "a", "an", "to", "go",
+})
+
+# Words that feed the analysis schema (budget, usage, features, vehicle interest, contact details)
+_SIGNAL_WORDS = (
+    # money / budget
+    "lakh", "lakhs", "lac", "lacs", "crore", "crores", "rupee", "rupees", "rs", "inr", "budget", "price",
+    "cost", "emi", "loan", "finance", "financing", "afford", "downpayment", "exchange", "discount",
+    # vehicles
+    "mahindra", "scorpio", "xuv", "xuv700", "xuv400", "xuv300", "xuv3xo", "thar", "bolero", "marazzo",
+    "be6", "xev", "suv", "ev", "electric", "diesel", "petrol", "cng", "hybrid",
+    # usage
+    "family", "city", "highway", "offroad", "off-road", "commute", "commercial", "business", "travel",
+    "trips", "village", "rural", "office", "kids", "parents",
+    # features
+    "mileage", "safety", "airbags", "sunroof", "automatic", "manual", "seater", "seats", "boot", "space",
+    "comfort", "power", "torque", "4x4", "awd", "adas", "range", "charging", "touchscreen", "warranty",
+    # contact / next steps
+    "name", "phone", "number", "email", "call", "whatsapp", "test", "drive", "dealer", "showroom", "book",
+)
+_SIGNAL_RE = re.compile(
+    r"\d|₹|@|\b(?:" + "|".join(re.escape(w) for w in _SIGNAL_WORDS) + r")\b",
+    re.IGNORECASE,
+)
+_TOKEN_RE = re.compile(r"[a-z0-9₹@.\-]+")
+
+# A negation answers whatever the assistant just asked ("need a diesel?" -> "no"), so it is
+# never filler, and never a duplicate of an earlier "no" to a different question
+_NEGATION_RE = re.compile(r"\b(?:no|nope|nah|not|never|nahi|don'?t|doesn'?t|didn'?t)\b", re.IGNORECASE)
+
+@dataclass(frozen=True)
+class NoveltyDecision:
+    run: bool
+    reason: str
+    similarity: float = 0.0
+
+def normalize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+def shingles(tokens: Sequence[str], size: int = SHINGLE_SIZE) -> FrozenSet[str]:
+    if len(tokens) < size:
+        return frozenset([" ".join(tokens)]) if tokens else frozenset()
+    return frozenset(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+# Universal hash family (a*h + b) mod p over one 64-bit base hash per shingle.
+# Fixed seed: signatures must match across processes and restarts.
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+def _base_hash(item: str) -> int:
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little")
+
+def minhash(items: Iterable[str], num_perm: int = NUM_PERM) -> Tuple[int, ...]:
+    hashes = [_base_hash(item) for item in items]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS[:num_perm])
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    if not a or not b:
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+def has_signal(text: str) -> bool:
+    return bool(_SIGNAL_RE.search(text or ""))
+
+def is_negation(text: str) -> bool:
+    return bool(_NEGATION_RE.search(text or ""))
+
+def assess(new_texts: Sequence[str], previous_texts: Sequence[str]) -> NoveltyDecision:
+    # --- Run analysis only if the new user turns could change the extracted state ---
+    if not new_texts:
+        return NoveltyDecision(False, "no_user_text")
+
+    content = [t for t in new_texts if any(tok not in FILLER_WORDS for tok in normalize(t))]
+    if not content:
+        return NoveltyDecision(False, "filler")
+
+    previous_signatures = [minhash(shingles(normalize(t))) for t in previous_texts]
+    best = 0.0
+    novel = []
+    for text in content:
+        signature = minhash(shingles(normalize(text)))
+        closest = max((similarity(signature, prev) for prev in previous_signatures), default=0.0)
+        best = max(best, closest)
+        if closest < DUPLICATE_SIMILARITY or is_negation(text):
+            novel.append(text)
+    if not novel:
+        return NoveltyDecision(False, "duplicate", best)
+
+    if any(has_signal(t) for t in novel):
+        return NoveltyDecision(True, "signal", best)
+    if any(is_negation(t) for t in novel):
+        return NoveltyDecision(True, "negation", best)
+
+    words = sum(1 for t in novel for tok in normalize(t) if tok not in FILLER_WORDS)
+    if words < MIN_NOVEL_WORDS:
+        return NoveltyDecision(False, "too_short", best)
+    return NoveltyDecision(True, "novel_text", best)
@@ -0,0 +1,269 @@
+import logging
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from assistant.models import Conversation, UserPreference, VehicleInterest
+
+logger = logging.getLogger(__name__)
+
+# Monthly RANGE partitions. Child rows are partitioned on conversation_started_at, a copy of
+# their conversation's started_at, so the same month of all three tables holds one complete
+# set of conversations and is detached or dropped as a unit. Rows outside every month land
+# in a DEFAULT partition until ensure_partitions creates their month.
+PARTITION_SPECS: List[Tuple[type, str, List[str]]] = [
+    # model, partition column, indexed columns
+    (Conversation, "started_at", ["session_id", "user_id", "started_at"]),
+    (UserPreference, "conversation_started_at", ["conversation_id"]),
+    (VehicleInterest, "conversation_started_at", ["conversation_id", "vehicle_name", "timestamp"]),
+]
+
+# A partitioned table can only enforce uniqueness together with its partition key, so
+# session_id uniqueness lives in this lookup table, maintained by triggers on conversations.
+SESSION_IDS_TABLE = "assistant_conversation_session_ids"
+_SESSION_IDS_FUNCTION = "assistant_conversation_session_ids_sync"
+_SESSION_IDS_SQL = f"""
+CREATE OR REPLACE FUNCTION "{_SESSION_IDS_FUNCTION}"() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO "{SESSION_IDS_TABLE}" (session_id, started_at) VALUES (NEW.session_id, NEW.started_at);
+        RETURN NEW;
+    END IF;
+    DELETE FROM "{SESSION_IDS_TABLE}" WHERE session_id = OLD.session_id;
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql
+"""
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+def partitioned_tables() -> Dict[str, str]:
+    return {model._meta.db_table: column for model, column, _ in PARTITION_SPECS}
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+def is_partitioned(table: Optional[str] = None) -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    table = table or Conversation._meta.db_table
+    with connection.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE relname = %s AND relkind IN ('r', 'p')", [table])
+        row = cur.fetchone()
+    return bool(row and row[0] == "p")
+
+def list_partitions(table: str) -> List[Tuple[str, date]]:
+    # --- Partitions created by this module, oldest first ---
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+            [table],
+        )
+        names = [row[0] for row in cur.fetchall()]
+    partitions = []
+    for name in names:
+        match = _PARTITION_SUFFIX.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+def _table_exists(cur, name: str) -> bool:
+    cur.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+    return cur.fetchone() is not None
+
+def _create_default_partition(cur, table: str) -> bool:
+    name = default_partition_name(table)
+    if _table_exists(cur, name):
+        return False
+    cur.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" DEFAULT')
+    logger.info(f"Created partition {name}")
+    return True
+
+def _create_partition(cur, table: str, column: str, month: date) -> bool:
+    name = partition_name(table, month)
+    if _table_exists(cur, name):
+        return False
+    bounds = [month.isoformat(), _add_months(month, 1).isoformat()]
+    default = default_partition_name(table)
+    has_strays = False
+    if _table_exists(cur, default):
+        cur.execute(f'SELECT 1 FROM "{default}" WHERE "{column}" >= %s AND "{column}" < %s LIMIT 1', bounds)
+        has_strays = cur.fetchone() is not None
+    if not has_strays:
+        cur.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)', bounds)
+    else:
+        # Postgres refuses a new month while the DEFAULT partition holds rows for it: move them first
+        cur.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)')
+        cur.execute(
+            f'WITH moved AS (DELETE FROM "{default}" WHERE "{column}" >= %s AND "{column}" < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            bounds,
+        )
+        cur.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', bounds)
+        if table == Conversation._meta.db_table and _table_exists(cur, SESSION_IDS_TABLE):
+            # The DELETE above fired the session-id trigger; the moved rows are still live
+            cur.execute(
+                f'INSERT INTO "{SESSION_IDS_TABLE}" (session_id, started_at) SELECT session_id, started_at '
+                f'FROM "{name}" ON CONFLICT (session_id) DO NOTHING'
+            )
+    logger.info(f"Created partition {name}")
+    return True
+
+def ensure_partitions(months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+    # --- Pre-create this month's and the next `months_ahead` partitions (and a DEFAULT) ---
+    start = _month_start(today or timezone.now().date())
+    created = []
+    with transaction.atomic(), connection.cursor() as cur:
+        for table, column in partitioned_tables().items():
+            if not is_partitioned(table):
+                continue
+            if _create_default_partition(cur, table):
+                created.append(default_partition_name(table))
+            for offset in range(months_ahead + 1):
+                month = _add_months(start, offset)
+                if _create_partition(cur, table, column, month):
+                    created.append(partition_name(table, month))
+    return created
+
+def retired_before(cutoff: datetime) -> date:
+    # Conversations started before this date live in the months detach_partitions_before(cutoff) retires
+    cutoff_day = cutoff.date() if isinstance(cutoff, datetime) else cutoff
+    return cutoff_day if cutoff_day.day == 1 else _month_start(cutoff_day)
+
+def partitions_to_detach(partitions: List[Tuple[str, date]], cutoff: datetime) -> List[str]:
+    # Months that end on or before the cutoff day
+    cutoff_day = cutoff.date() if isinstance(cutoff, datetime) else cutoff
+    return [name for name, month in partitions if _add_months(month, 1) <= cutoff_day]
+
+def detach_partitions_before(cutoff: datetime, drop: bool = False) -> List[str]:
+    # --- Detach (and optionally drop) whole months that end on or before `cutoff` ---
+    # Detaching is a catalog change, so retention does not have to delete row by row. All three
+    # tables share the conversation's month, so children go with their conversations; Django's
+    # CASCADE emulation plays no part here. Children are detached before their conversations.
+    # Postgres refuses DETACH ... CONCURRENTLY while a DEFAULT partition exists, so this takes
+    # a short ACCESS EXCLUSIVE lock on each parent instead.
+    conversations = Conversation._meta.db_table
+    detached = []
+    for table in sorted(partitioned_tables(), key=lambda t: t == conversations):
+        if not is_partitioned(table):
+            continue
+        partitions = list_partitions(table)
+        months = dict(partitions)
+        for name in partitions_to_detach(partitions, cutoff):
+            month = months[name]
+            with connection.cursor() as cur:
+                cur.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+                if table == conversations:
+                    # Their session ids are free again; the triggers do not see a detach
+                    cur.execute(
+                        f'DELETE FROM "{SESSION_IDS_TABLE}" WHERE started_at >= %s AND started_at < %s',
+                        [month.isoformat(), _add_months(month, 1).isoformat()],
+                    )
+                if drop:
+                    cur.execute(f'DROP TABLE "{name}"')
+            logger.info(f"{'Dropped' if drop else 'Detached'} partition {name}")
+            detached.append(name)
+    return detached
+
+def _convert_table(cur, table: str, column: str, indexed: List[str], months_ahead: int) -> None:
+    legacy = f"{table}_legacy"
+    sequence = f"{table}_part_id_seq"
+    cur.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    cur.execute(f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE ("{column}")')
+
+    # Identity columns cannot live on a partitioned parent on older Postgres; use a plain sequence
+    cur.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}"."id"')
+    cur.execute(f'SELECT setval(%s, COALESCE((SELECT MAX(id) FROM "{legacy}"), 0) + 1, false)', [sequence])
+    cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "id" SET DEFAULT nextval(%s::regclass)', [sequence])
+
+    # Unique constraints on a partitioned table must include the partition key
+    cur.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_part_pkey" PRIMARY KEY ("id", "{column}")')
+    for col in indexed:
+        cur.execute(f'CREATE INDEX "{table}_{col}_part_idx" ON "{table}" ("{col}")')
+
+    cur.execute(f'SELECT MIN("{column}") FROM "{legacy}"')
+    oldest = cur.fetchone()[0]
+    month = _month_start(oldest.date() if oldest else timezone.now().date())
+    last = _add_months(_month_start(timezone.now().date()), months_ahead)
+    while month <= last:
+        _create_partition(cur, table, column, month)
+        month = _add_months(month, 1)
+    _create_default_partition(cur, table)
+
+    cur.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+    cur.execute(f'DROP TABLE "{legacy}"')
+    logger.info(f"Converted {table} to monthly partitions on {column}")
+
+def _enforce_unique_session_ids(cur) -> None:
+    table = Conversation._meta.db_table
+    cur.execute(
+        f'CREATE TABLE IF NOT EXISTS "{SESSION_IDS_TABLE}" '
+        f'(session_id varchar(255) PRIMARY KEY, started_at timestamp with time zone NOT NULL)'
+    )
+    cur.execute(f'CREATE INDEX IF NOT EXISTS "{SESSION_IDS_TABLE}_started_at_idx" ON "{SESSION_IDS_TABLE}" (started_at)')
+    cur.execute(
+        f'INSERT INTO "{SESSION_IDS_TABLE}" (session_id, started_at) SELECT session_id, started_at FROM "{table}" '
+        f'ON CONFLICT (session_id) DO NOTHING'
+    )
+    cur.execute(_SESSION_IDS_SQL)
+    # A duplicate session_id fails the insert with a unique violation (IntegrityError), which
+    # get_or_create/update_or_create already handle. session_id and started_at are never updated.
+    for event in ("INSERT", "DELETE"):
+        trigger = f"{table}_session_ids_{event.lower()}"
+        cur.execute(f'DROP TRIGGER IF EXISTS "{trigger}" ON "{table}"')
+        cur.execute(
+            f'CREATE TRIGGER "{trigger}" AFTER {event} ON "{table}" '
+            f'FOR EACH ROW EXECUTE FUNCTION "{_SESSION_IDS_FUNCTION}"()'
+        )
+
+def enable_partitioning(months_ahead: int = 3) -> List[str]:
+    # --- One-off conversion of the existing tables to RANGE partitioning ---
+    # Foreign keys cannot reference a partitioned table by `id` alone, so the DB-level
+    # constraints are dropped. Django still cascades ORM deletes; partition detach/drop keeps
+    # children consistent because they share the conversation's month.
+    if connection.vendor != "postgresql":
+        raise RuntimeError("Partitioning requires PostgreSQL")
+    converted = []
+    with transaction.atomic(), connection.cursor() as cur:
+        conversations = Conversation._meta.db_table
+        for model, own_timestamp in ((UserPreference, "extracted_at"), (VehicleInterest, "timestamp")):
+            table = model._meta.db_table
+            cur.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [table]
+            )
+            for (name,) in cur.fetchall():
+                cur.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{name}"')
+            if not is_partitioned(table):
+                # The partition key is part of the primary key, so it cannot stay NULL: rows written
+                # before migration 0009's backfill get it from their conversation, orphans their own time
+                cur.execute(
+                    f'UPDATE "{table}" t SET conversation_started_at = c.started_at FROM "{conversations}" c '
+                    f'WHERE c.id = t.conversation_id AND t.conversation_started_at IS NULL'
+                )
+                cur.execute(
+                    f'UPDATE "{table}" SET conversation_started_at = "{own_timestamp}" WHERE conversation_started_at IS NULL'
+                )
+        for model, column, indexed in PARTITION_SPECS:
+            table = model._meta.db_table
+            if is_partitioned(table):
+                continue
+            cur.execute(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE')
+            _convert_table(cur, table, column, indexed, months_ahead)
+            converted.append(table)
+        _enforce_unique_session_ids(cur)
+    return converted
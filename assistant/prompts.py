@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+import constants as C
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MODEL = os.getenv("OPENAI_REALTIME_MODEL", C.DEFAULT_REALTIME_MODEL)
+OPENAI_VOICE = os.getenv("OPENAI_REALTIME_VOICE", C.DEFAULT_VOICE)
+OPENAI_TRANSCRIBE = os.getenv("TRANSCRIBE_MODEL", C.DEFAULT_TRANSCRIBE_MODEL)
+
+# Used when prompt_bundles.json is missing: today's single prompt at 100%
+DEFAULT_MANIFEST = {
+    "bundles": [
+        {"name": "default", "version": "v1", "instructions": "system_instructions.md", "weight": 100},
+    ]
+}
+
+@dataclass(frozen=True)
+class PromptBundle:
+    name: str
+    version: str
+    weight: int
+    payload: Dict[str, Any]
+    # Request body for /v1/realtime/sessions, serialized once per (re)load
+    payload_bytes: bytes
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}@{self.version}"
+
+def _tools_by_name(names: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if names is None:
+        return C.TOOL_DEFINITIONS
+    known = {tool["name"]: tool for tool in C.TOOL_DEFINITIONS}
+    missing = [n for n in names if n not in known]
+    if missing:
+        raise ValueError(f"Unknown tools in prompt bundle: {', '.join(missing)}")
+    return [known[n] for n in names]
+
+def _build_bundle(spec: Dict[str, Any], base_dir: Path) -> Tuple[PromptBundle, Path]:
+    path = base_dir / spec.get("instructions", "system_instructions.md")
+    instructions = path.read_text(encoding="utf-8")
+    payload = C.get_session_payload(
+        model=spec.get("model", OPENAI_MODEL),
+        voice=spec.get("voice", OPENAI_VOICE),
+        transcribe_model=spec.get("transcribe_model", OPENAI_TRANSCRIBE),
+        temperature=spec.get("temperature"),
+        instructions=instructions,
+        tools=_tools_by_name(spec.get("tools")),
+    )
+    payload_bytes = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # Content hash in the version, so an edit without a version bump is still distinguishable
+    digest = hashlib.sha256(payload_bytes).hexdigest()[:8]
+    bundle = PromptBundle(
+        name=spec["name"],
+        version=f"{spec.get('version', 'v1')}+{digest}",
+        weight=int(spec.get("weight", 0)),
+        payload=payload,
+        payload_bytes=payload_bytes,
+    )
+    return bundle, path
+
+class PromptRegistry:
+    # --- Named, versioned prompt/tool bundles, reloaded when their files change ---
+
+    def __init__(self, manifest_path: Path, reload_interval: float = 2.0):
+        self.manifest_path = Path(manifest_path)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._bundles: List[PromptBundle] = []
+        self._mtimes: Dict[Path, Optional[float]] = {}
+        self._checked_at = 0.0
+
+    @staticmethod
+    def _mtime(path: Path) -> Optional[float]:
+        try:
+            return path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> None:
+        manifest_mtime = self._mtime(self.manifest_path)
+        if manifest_mtime is None:
+            manifest = DEFAULT_MANIFEST
+        else:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        base_dir = self.manifest_path.parent
+        bundles, mtimes = [], {self.manifest_path: manifest_mtime}
+        for spec in manifest.get("bundles", []):
+            bundle, path = _build_bundle(spec, base_dir)
+            bundles.append(bundle)
+            mtimes[path] = self._mtime(path)
+        if not bundles or sum(b.weight for b in bundles) <= 0:
+            raise ValueError("Prompt manifest needs at least one bundle with a positive weight")
+        self._bundles, self._mtimes = bundles, mtimes
+        logger.info(f"Loaded prompt bundles: {', '.join(f'{b.label} ({b.weight}%)' for b in bundles)}")
+
+    def _changed(self) -> bool:
+        return any(self._mtime(path) != mtime for path, mtime in self._mtimes.items())
+
+    def bundles(self) -> List[PromptBundle]:
+        now = time.monotonic()
+        if self._bundles and now - self._checked_at < self.reload_interval:
+            return self._bundles
+        with self._lock:
+            if not self._bundles or (now - self._checked_at >= self.reload_interval and self._changed()):
+                try:
+                    self._load()
+                except Exception:
+                    if not self._bundles:
+                        raise
+                    # Keep serving the last good bundles while a file is mid-edit; retry on the next change
+                    logger.exception("Prompt bundle reload failed; keeping previous bundles")
+                    self._mtimes = {path: self._mtime(path) for path in self._mtimes}
+            self._checked_at = now
+        return self._bundles
+
+    def select(self, session_id: Optional[str] = None) -> PromptBundle:
+        # Sticky, weight-proportional assignment: the same session always gets the same bundle
+        bundles = self.bundles()
+        total = sum(b.weight for b in bundles)
+        if session_id:
+            point = zlib.crc32(session_id.encode("utf-8")) % total
+        else:
+            point = random.randrange(total)
+        for bundle in bundles:
+            if point < bundle.weight:
+                return bundle
+            point -= bundle.weight
+        return bundles[-1]
+
+    def get(self, label: str) -> Optional[PromptBundle]:
+        return next((b for b in self.bundles() if b.label == label or b.name == label), None)
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> PromptRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry(settings.PROMPT_BUNDLES_FILE, settings.PROMPT_RELOAD_INTERVAL_SECONDS)
+    return _registry
@@ -0,0 +1,73 @@
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+from django.db import connections
+
+# --- Per-request query counting and N+1 detection through connection.execute_wrapper ---
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    # Same statement with different parameters or IN-list lengths -> same shape
+    shape = _STRING_RE.sub("?", sql)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _IN_LIST_RE.sub("IN (...)", shape.replace("%s", "?"))
+    return _SPACE_RE.sub(" ", shape).strip()
+
+@dataclass
+class QueryShape:
+    sql: str
+    count: int = 0
+    total_ms: float = 0.0
+
+class QueryProfile:
+    # Callable as a Django execute wrapper; records every query run through it
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Dict[str, QueryShape] = defaultdict(lambda: QueryShape(""))
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.total_ms += elapsed
+            shape = self.shapes[normalize_sql(sql)]
+            if not shape.sql:
+                shape.sql = sql
+            shape.count += 1
+            shape.total_ms += elapsed
+
+    def repeated(self, threshold: int) -> List[QueryShape]:
+        # Same shape `threshold`+ times in one request: almost always a per-row lookup (N+1)
+        return sorted((s for s in self.shapes.values() if s.count >= threshold), key=lambda s: -s.count)
+
+    def top(self, n: int = 5) -> List[QueryShape]:
+        return sorted(self.shapes.values(), key=lambda s: -s.total_ms)[:n]
+
+    def report(self, limit: int = 5, sql_chars: int = 300) -> str:
+        lines = [f"{self.count} queries, {self.total_ms:.1f}ms in the database; top by time:"]
+        for shape in self.top(limit):
+            lines.append(f"  {shape.count}x {shape.total_ms:.1f}ms  {shape.sql[:sql_chars]}")
+        return "\n".join(lines)
+
+@contextmanager
+def profile_queries(aliases: Optional[List[str]] = None) -> Iterator[QueryProfile]:
+    # Covers the primary and the replica alike
+    profile = QueryProfile()
+    with ExitStack() as stack:
+        for alias in aliases or list(connections):
+            stack.enter_context(connections[alias].execute_wrapper(profile))
+        yield profile
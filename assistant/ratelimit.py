@@ -0,0 +1,129 @@
+import logging
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Mapping, Optional
+
+from django.conf import settings
+
+from assistant.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SLOTS_KEY = "openai:slots"
+PAUSE_KEY = "openai:pause_until_ms"
+
+# Atomically drop expired leases and take a slot if one is free.
+# Returns 0 when admitted, otherwise the number of ms the caller should wait.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local pause_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if pause_until > now then
+    return pause_until - now
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[4])
+    return 0
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return math.max(tonumber(oldest[2]) - now, 1)
+"""
+
+# Only ever push the shared pause deadline further out.
+_PAUSE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local target = tonumber(ARGV[1])
+if target > current then
+    redis.call('SET', KEYS[1], target, 'PX', tonumber(ARGV[2]))
+end
+return target
+"""
+
+class OpenAIBudgetExhausted(RuntimeError):
+    pass
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_MS = {"ms": 1, "s": 1000, "m": 60_000, "h": 3_600_000}
+
+def parse_reset_ms(value: Optional[str]) -> Optional[int]:
+    # --- OpenAI reset headers look like "1s", "6m0s" or "120ms" ---
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value.strip())
+    if not parts:
+        try:
+            return int(float(value) * 1000)
+        except ValueError:
+            return None
+    return int(sum(float(num) * _UNIT_MS[unit] for num, unit in parts))
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def pause_openai(ms: int) -> None:
+    if ms <= 0:
+        return
+    try:
+        get_redis().eval(_PAUSE_SCRIPT, 1, PAUSE_KEY, _now_ms() + ms, ms)
+        logger.warning(f"OpenAI budget paused for {ms} ms across all workers")
+    except Exception as e:
+        logger.warning(f"Could not record OpenAI pause in Redis: {e}")
+
+def record_rate_limit_headers(headers: Optional[Mapping[str, str]], status_code: Optional[int] = None) -> None:
+    # --- Back off globally when upstream says we are out of requests/tokens ---
+    if not headers:
+        return
+    wait_ms = 0
+    retry_after_ms = headers.get("retry-after-ms")
+    retry_after = headers.get("retry-after")
+    if status_code == 429:
+        if retry_after_ms:
+            wait_ms = int(float(retry_after_ms))
+        elif retry_after:
+            wait_ms = parse_reset_ms(retry_after) or 0
+    for kind in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+        if remaining is not None and remaining.isdigit() and int(remaining) == 0:
+            wait_ms = max(wait_ms, parse_reset_ms(headers.get(f"x-ratelimit-reset-{kind}")) or 1000)
+    if status_code == 429 and not wait_ms:
+        wait_ms = 1000
+    if wait_ms:
+        pause_openai(wait_ms)
+
+@contextmanager
+def openai_slot(timeout: Optional[float] = None) -> Iterator[None]:
+    # --- Distributed semaphore: at most OPENAI_MAX_CONCURRENCY calls in flight across workers ---
+    limit = settings.OPENAI_MAX_CONCURRENCY
+    lease_ms = int(settings.OPENAI_SLOT_LEASE_SECONDS * 1000)
+    deadline = time.monotonic() + (settings.OPENAI_SLOT_TIMEOUT_SECONDS if timeout is None else timeout)
+    token = uuid.uuid4().hex
+    client = get_redis()
+
+    acquired = False
+    while True:
+        try:
+            wait_ms = int(client.eval(_ACQUIRE_SCRIPT, 2, SLOTS_KEY, PAUSE_KEY, _now_ms(), limit, lease_ms, token))
+        except Exception as e:
+            # Fail open: a Redis outage should not take OpenAI features down with it
+            logger.warning(f"OpenAI concurrency budget unavailable, calling unthrottled: {e}")
+            break
+        if wait_ms == 0:
+            acquired = True
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise OpenAIBudgetExhausted("Timed out waiting for an OpenAI concurrency slot")
+        # Jitter so waiting workers do not retry in lockstep
+        time.sleep(min(wait_ms / 1000.0, remaining, 1.0) * random.uniform(0.5, 1.0))
+
+    try:
+        yield
+    finally:
+        if acquired:
+            try:
+                client.zrem(SLOTS_KEY, token)
+            except Exception as e:
+                logger.warning(f"Failed to release OpenAI slot {token}: {e}")
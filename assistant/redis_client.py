@@ -0,0 +1,21 @@
+import threading
+
+from django.conf import settings
+
+_client = None
+_lock = threading.Lock()
+
+def get_redis():
+    # --- Shared Redis connection pool, created on first use ---
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import redis
+                _client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=True,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                )
+    return _client
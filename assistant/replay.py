@@ -0,0 +1,279 @@
+import json
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from assistant import metrics
+from assistant.models import REPLAY_PREFIX, Conversation
+
+# --- Offline replay of recorded conversations through the analyzer pipeline ---
+
+REPLAY_INVALIDATION_CHANNEL = "replay:sessions:invalidate"
+# Summary fields compared between runs (free-text `summary` and `next_actions` change too easily)
+SUMMARY_DIFF_FIELDS = (
+    "customer_name", "contact_info", "budget_range", "vehicle_type", "use_case",
+    "recommended_vehicles", "sentiment", "engagement_score", "purchase_intent",
+)
+# Added to every fake call; set by `replay_conversations --llm-latency-ms`
+FAKE_LLM_LATENCY_SECONDS = 0.0
+
+# --- Fake LLM: deterministic keyword extraction, shaped like the tool schemas ---
+
+_BUDGET_RE = re.compile(
+    r"(?:₹|rs\.?|inr)?\s*\d+(?:\.\d+)?(?:\s*(?:-|to)\s*\d+(?:\.\d+)?)?\s*(?:lakh|lakhs|lac|lacs|crore|crores|l)\b",
+    re.IGNORECASE,
+)
+_VEHICLES = ("XUV700", "XUV400", "XUV 3XO", "XUV300", "Scorpio-N", "Scorpio", "Thar", "Bolero", "Marazzo", "BE 6", "XEV 9e")
+_VEHICLE_RE = re.compile(
+    r"\b(" + "|".join(re.escape(v).replace(r"\ ", r"\s*").replace(r"\-", r"[\s-]*") for v in _VEHICLES) + r")\b",
+    re.IGNORECASE,
+)
+_USAGE_WORDS = {
+    "family": "family", "kids": "family", "city": "city", "office": "city", "commute": "city",
+    "highway": "highway", "travel": "highway", "offroad": "adventure", "off-road": "adventure",
+    "adventure": "adventure", "business": "commercial", "commercial": "commercial",
+}
+_FEATURE_WORDS = (
+    "mileage", "safety", "sunroof", "automatic", "space", "comfort", "power", "4x4", "adas", "range",
+    "charging", "touchscreen", "airbags",
+)
+_NAME_RE = re.compile(r"\b(?i:my name is|i am|i'm|this is)\s+([A-Z][a-z]+)")
+_CONTACT_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|(?:\+91[\s-]?)?\b\d{10}\b")
+_INTENT_RE = re.compile(r"\b(test drive|book|booking|visit|dealer|showroom)\b", re.IGNORECASE)
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for comparing runs
+    return max(1, len(text) // 4)
+
+def _canonical_vehicle(match: str) -> str:
+    squashed = re.sub(r"[\s-]", "", match).lower()
+    return next(v for v in _VEHICLES if re.sub(r"[\s-]", "", v).lower() == squashed)
+
+def _extract(text: str) -> Dict[str, Any]:
+    lowered = text.lower()
+    budget = _BUDGET_RE.search(text)
+    usage = next((label for word, label in _USAGE_WORDS.items() if re.search(rf"\b{re.escape(word)}\b", lowered)), None)
+    vehicles = list(dict.fromkeys(_canonical_vehicle(m) for m in _VEHICLE_RE.findall(text)))
+    features = [f for f in _FEATURE_WORDS if re.search(rf"\b{re.escape(f)}\b", lowered)]
+    return {
+        "budget": budget.group(0).strip() if budget else None,
+        "usage": usage,
+        "priority_features": features,
+        "vehicle_interest": vehicles,
+    }
+
+def fake_llm(
+    messages: List[Dict[str, str]],
+    functions: Optional[List[Dict[str, Any]]],
+    function_name: Optional[str],
+    model: str,
+    temperature: float,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, int]]:
+    # Same contract as analyzer.openai_backend; select with ANALYZER_LLM_BACKEND=assistant.replay.fake_llm
+    if FAKE_LLM_LATENCY_SECONDS:
+        time.sleep(FAKE_LLM_LATENCY_SECONDS)
+    text = messages[-1]["content"] if messages else ""
+    customer = "\n".join(line for line in text.splitlines() if line.startswith("Customer:"))
+    found = _extract(customer)
+
+    if function_name == "analyze_customer_preferences":
+        result = {**found, "other_insights": None}
+    elif function_name == "summarize_sales_conversation":
+        name = _NAME_RE.search(customer)
+        contact = _CONTACT_RE.search(customer)
+        turns = customer.count("Customer:")
+        result = {
+            "summary": f"Customer discussed {', '.join(found['vehicle_interest']) or 'Mahindra vehicles'}.",
+            "customer_name": name.group(1) if name else None,
+            "contact_info": contact.group(0) if contact else None,
+            "budget_range": found["budget"],
+            "vehicle_type": "SUV" if found["vehicle_interest"] else None,
+            "use_case": found["usage"],
+            "priority_features": found["priority_features"],
+            "recommended_vehicles": found["vehicle_interest"][:2],
+            "next_actions": ["Schedule a test drive"] if _INTENT_RE.search(customer) else [],
+            "sentiment": "neutral",
+            "engagement_score": max(1, min(10, 1 + turns // 2)),
+            "purchase_intent": "high" if _INTENT_RE.search(customer) else ("medium" if found["budget"] else "low"),
+        }
+    else:
+        result = {}
+
+    prompt = "".join(m.get("content", "") for m in messages) + json.dumps(functions or [])
+    usage = {"prompt_tokens": _estimate_tokens(prompt), "completion_tokens": _estimate_tokens(json.dumps(result))}
+    return result, usage
+
+# --- Loading recorded transcripts ---
+
+def transcripts_from_db(limit: Optional[int] = None, session_ids: Optional[List[str]] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    qs = (
+        Conversation.objects.exclude(session_id__startswith=REPLAY_PREFIX)
+        .filter(total_messages__gt=0)
+        .order_by("id")
+        .values_list("session_id", "messages_json")
+    )
+    if session_ids:
+        qs = qs.filter(session_id__in=session_ids)
+    if limit:
+        qs = qs[:limit]
+    for session_id, messages in qs.iterator(chunk_size=200):
+        yield session_id, messages or []
+
+def transcripts_from_ndjson(path: str, limit: Optional[int] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    # Accepts `export_conversations --include-messages` output or {"session_id", "messages"} lines
+    with open(path, encoding="utf-8") as fh:
+        count = 0
+        for line_no, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            messages = record.get("messages") or record.get("messages_json") or []
+            if not messages:
+                continue
+            yield record.get("session_id") or f"line{line_no}", messages
+            count += 1
+            if limit and count >= limit:
+                return
+
+# --- Replaying one conversation (runs inside a worker process) ---
+
+def extraction_snapshot(conv: Conversation) -> Dict[str, Any]:
+    preferences = {p.data.get("type"): p.data.get("value") for p in conv.preferences.all()}
+    summary = conv.summary_data or {}
+    return {
+        "preferences": dict(sorted(preferences.items())),
+        "vehicle_interests": sorted(v.vehicle_name for v in conv.vehicle_interests.all()),
+        "summary": {key: summary.get(key) for key in SUMMARY_DIFF_FIELDS},
+    }
+
+def replay_conversation(
+    source_id: str,
+    messages: List[Dict[str, Any]],
+    run_id: str,
+    messages_per_batch: int = 1,
+    keep: bool = False,
+) -> Dict[str, Any]:
+    # local import keeps module import light
+    from assistant.analyzer import generate_conversation_summary, save_message_batch
+
+    session_id = f"{REPLAY_PREFIX}{run_id}_{source_id}"[:255]
+    turns = [
+        {"session_id": session_id, "role": m.get("role"), "content": m.get("content"), "timestamp": m.get("timestamp")}
+        for m in messages if m.get("role") and m.get("content")
+    ]
+    for turn in turns:
+        if not turn["timestamp"]:
+            del turn["timestamp"]
+
+    before = {name: metrics.local_value(name) for name in ("llm.calls", "llm.prompt_tokens", "llm.completion_tokens")}
+    errors = []
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        for i in range(0, len(turns), messages_per_batch):
+            saved = save_message_batch(turns[i:i + messages_per_batch])
+            error = saved.get("sessions", {}).get(session_id, {}).get("error")
+            if error:
+                errors.append(f"save_message_batch: {error}")
+        summary = generate_conversation_summary(session_id)
+        if summary.get("status") == "error":
+            errors.append(f"generate_conversation_summary: {summary.get('message')}")
+    elapsed = time.perf_counter() - started
+
+    conv = Conversation.objects.prefetch_related("preferences", "vehicle_interests").get(session_id=session_id)
+    result = {
+        "source": source_id,
+        "messages": len(turns),
+        "seconds": elapsed,
+        "db_queries": len(queries),
+        **{name.split(".", 1)[1]: metrics.local_value(name) - value for name, value in before.items()},
+        "extraction": extraction_snapshot(conv),
+        "pipeline_errors": errors,
+    }
+    if not keep:
+        with transaction.atomic():
+            conv.delete()
+    return result
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+def cleanup(run_id: Optional[str] = None) -> int:
+    # Removes replayed conversations (and their preferences/interests) left by --keep or a crash
+    prefix = f"{REPLAY_PREFIX}{run_id}_" if run_id else REPLAY_PREFIX
+    deleted, _ = Conversation.objects.filter(session_id__startswith=prefix).delete()
+    return deleted
+
+# --- Worker processes ---
+
+@contextmanager
+def replay_environment(llm_backend: str, analysis_batch_size: Optional[int] = None, llm_latency_ms: float = 0) -> Iterator[None]:
+    # --- Point the pipeline at the replay LLM and keep it out of production state, then restore ---
+    global FAKE_LLM_LATENCY_SECONDS
+    # local import keeps module import light
+    from assistant import analyzer, session_cache
+    from voice_assistant.celery import app
+
+    saved = (
+        metrics.FLUSH_ENABLED, session_cache.INVALIDATION_CHANNEL, app.conf.task_always_eager,
+        analyzer.ANALYSIS_MESSAGE_BATCH_SIZE, FAKE_LLM_LATENCY_SECONDS,
+    )
+    try:
+        with override_settings(ANALYZER_LLM_BACKEND=llm_backend):
+            # Counts stay in this process (local_value still feeds the report) and cache
+            # invalidations go to a channel only replay workers hear
+            metrics.FLUSH_ENABLED = False
+            session_cache.INVALIDATION_CHANNEL = REPLAY_INVALIDATION_CHANNEL
+            # Queued analysis runs inline, so each replay measures the whole pipeline
+            app.conf.task_always_eager = True
+            if analysis_batch_size:
+                analyzer.ANALYSIS_MESSAGE_BATCH_SIZE = analysis_batch_size
+            FAKE_LLM_LATENCY_SECONDS = llm_latency_ms / 1000.0
+            yield
+    finally:
+        (
+            metrics.FLUSH_ENABLED, session_cache.INVALIDATION_CHANNEL, app.conf.task_always_eager,
+            analyzer.ANALYSIS_MESSAGE_BATCH_SIZE, FAKE_LLM_LATENCY_SECONDS,
+        ) = saved
+
+def init_worker() -> None:
+    import django
+
+    django.setup()
+    # Never share a DB socket inherited from the parent across a fork
+    connections.close_all()
+
+def replay_task(job: Tuple[Tuple[str, List[Dict[str, Any]], str, int, bool], Dict[str, Any]]) -> Dict[str, Any]:
+    args, options = job
+    try:
+        with replay_environment(**options):
+            return replay_conversation(*args)
+    except Exception as e:
+        return {"source": args[0], "error": str(e)}
+
+# --- Baseline comparison ---
+
+def diff_extractions(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, List[str]]:
+    # {source: ["field: old -> new", ...]} for every conversation whose extraction changed
+    diffs: Dict[str, List[str]] = {}
+    for source, now in current.items():
+        before = baseline.get(source)
+        if before is None:
+            diffs[source] = ["not in baseline"]
+            continue
+        changes = []
+        for section in ("preferences", "summary"):
+            keys = sorted(set(before.get(section, {})) | set(now.get(section, {})))
+            for key in keys:
+                old, new = before.get(section, {}).get(key), now.get(section, {}).get(key)
+                if old != new:
+                    changes.append(f"{section}.{key}: {old!r} -> {new!r}")
+        if before.get("vehicle_interests") != now.get("vehicle_interests"):
+            changes.append(f"vehicle_interests: {before.get('vehicle_interests')} -> {now.get('vehicle_interests')}")
+        if changes:
+            diffs[source] = changes
+    return diffs
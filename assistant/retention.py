@@ -0,0 +1,209 @@
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from assistant import partitioning, session_cache
+from assistant.models import Conversation, UserPreference, VehicleInterest
+
+logger = logging.getLogger(__name__)
+
+RETENTION_MODES = ("delete", "anonymize")
+REDACTED = "[redacted]"
+
+# --- PII patterns: what `contact_info` / `customer_name` in the summary schema pick up ---
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Free-standing digit runs with separators; only redacted when they hold 10+ digits (a mobile
+# number, or landline/international with its prefix). Keeps "10-15 lakh", year ranges, prices
+# and IDs glued to letters ("ORD-12345678").
+PHONE_RE = re.compile(r"(?<![\w#/-])[(+]{0,2}\d[\d\s().-]{6,}\d(?![\w/])")
+# Dates are skipped before phone matching, with or without a time after them
+DATE_RE = re.compile(r"\b(?:\d{4}([-/.])\d{1,2}\1\d{1,2}|\d{1,2}([-/.])\d{1,2}\2\d{4})\b")
+NAME_INTRO_RE = re.compile(r"\b((?i:my name is|name's|i am|i'm|this is)\s+)([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)")
+MIN_PHONE_DIGITS = 10
+
+@dataclass
+class RetentionReport:
+    mode: str
+    cutoff: datetime
+    conversations: int = 0
+    # Child rows (preferences, vehicle interests) deleted or rewritten alongside
+    related_rows: int = 0
+    chunks: int = 0
+    partitions_dropped: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    finished: bool = False
+
+    @property
+    def rows_per_second(self) -> float:
+        return (self.conversations + self.related_rows) / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        state = "done" if self.finished else "stopped early, rerun to resume"
+        dropped = f", {len(self.partitions_dropped)} partitions dropped" if self.partitions_dropped else ""
+        return (
+            f"{self.mode}: {self.conversations} conversations + {self.related_rows} related rows "
+            f"in {self.chunks} chunks{dropped}, {self.seconds:.1f}s ({self.rows_per_second:.0f} rows/s, {state})"
+        )
+
+def _redact_phone(match: re.Match) -> str:
+    text = match.group(0)
+    return REDACTED if sum(ch.isdigit() for ch in text) >= MIN_PHONE_DIGITS else text
+
+def _redact_phones(text: str) -> str:
+    parts, pos = [], 0
+    for date in DATE_RE.finditer(text):
+        parts += [PHONE_RE.sub(_redact_phone, text[pos:date.start()]), date.group(0)]
+        pos = date.end()
+    parts.append(PHONE_RE.sub(_redact_phone, text[pos:]))
+    return "".join(parts)
+
+def redact_text(text: str, names: Iterable[str] = ()) -> str:
+    if not text:
+        return text
+    text = EMAIL_RE.sub(REDACTED, text)
+    text = _redact_phones(text)
+    text = NAME_INTRO_RE.sub(lambda m: m.group(1) + REDACTED, text)
+    for name in names:
+        text = re.sub(rf"\b{re.escape(name)}\b", REDACTED, text, flags=re.IGNORECASE)
+    return text
+
+def _redact_value(value: Any, names: List[str]) -> Any:
+    if isinstance(value, str):
+        return redact_text(value, names)
+    if isinstance(value, list):
+        return [_redact_value(v, names) for v in value]
+    if isinstance(value, dict):
+        return {k: _redact_value(v, names) for k, v in value.items()}
+    return value
+
+def _known_names(conv: Conversation) -> List[str]:
+    # The extracted customer name, and its parts, are redacted wherever they appear
+    name = ((conv.summary_data or {}).get("customer_name") or "").strip()
+    if not name:
+        return []
+    parts = [p for p in name.split() if len(p) > 2]
+    return [name] + [p for p in parts if p != name]
+
+def anonymize_conversation(conv: Conversation) -> None:
+    names = _known_names(conv)
+    conv.messages_json = [
+        {**m, "content": redact_text(m.get("content") or "", names)} if isinstance(m, dict) else m
+        for m in (conv.messages_json or [])
+    ]
+    summary = _redact_value(dict(conv.summary_data or {}), names)
+    for key in ("customer_name", "contact_info"):
+        if summary.get(key):
+            summary[key] = None
+    conv.summary_data = summary
+    conv.user_id = None
+    conv.anonymized_at = timezone.now()
+
+def pending_queryset(mode: str, cutoff: datetime) -> QuerySet:
+    # Everything still to do; rows finished by an interrupted run drop out of this filter
+    qs = Conversation.objects.filter(started_at__lt=cutoff)
+    if mode == "anonymize":
+        qs = qs.filter(anonymized_at__isnull=True)
+    return qs
+
+def _delete_chunk(ids: List[int]) -> int:
+    # Children have no signals or cascades of their own, so Django removes them with one
+    # DELETE ... WHERE conversation_id IN (...) per table instead of loading them
+    _, counts = Conversation.objects.filter(id__in=ids).delete()
+    return sum(n for label, n in counts.items() if label != Conversation._meta.label)
+
+def _anonymize_chunk(ids: List[int]) -> int:
+    convs = list(
+        Conversation.objects.filter(id__in=ids)
+        .only("id", "messages_json", "summary_data", "user_id", "anonymized_at")
+        .select_for_update()
+    )
+    names_by_conv = {}
+    for conv in convs:
+        names_by_conv[conv.id] = _known_names(conv)
+        anonymize_conversation(conv)
+    Conversation.objects.bulk_update(convs, ["messages_json", "summary_data", "user_id", "anonymized_at"])
+
+    prefs = list(UserPreference.objects.filter(conversation_id__in=ids).only("id", "conversation_id", "data"))
+    changed = []
+    for pref in prefs:
+        data = _redact_value(pref.data, names_by_conv.get(pref.conversation_id, []))
+        if data != pref.data:
+            pref.data = data
+            changed.append(pref)
+    if changed:
+        UserPreference.objects.bulk_update(changed, ["data"])
+    return len(changed)
+
+def _delete_stray_children(boundary: datetime, chunk_size: int) -> int:
+    # Children of conversations in the months about to be dropped, but stored in a later
+    # partition, would outlive the DROP; remove them first
+    deleted = 0
+    for model in (UserPreference, VehicleInterest):
+        stray = model.objects.filter(conversation__started_at__lt=boundary, conversation_started_at__gte=boundary)
+        while True:
+            ids = list(stray.order_by("id").values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                deleted += model.objects.filter(id__in=ids).delete()[0]
+    return deleted
+
+def apply_retention(
+    mode: str,
+    cutoff: datetime,
+    chunk_size: int = 500,
+    pause_seconds: float = 0.5,
+    max_seconds: Optional[float] = None,
+    drop_partitions: bool = True,
+) -> RetentionReport:
+    # --- Delete or anonymize conversations started before `cutoff`, one short transaction per chunk ---
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"Unknown retention mode: {mode}")
+    report = RetentionReport(mode=mode, cutoff=cutoff)
+    started = time.monotonic()
+
+    if mode == "delete" and drop_partitions and partitioning.is_partitioned():
+        # Whole months go with a catalog change; the chunked loop below only handles the partial month
+        # (and anything in the DEFAULT partition). Children share their conversation's month, so
+        # the drop takes them along; any stored elsewhere are deleted before it.
+        boundary = datetime.combine(partitioning.retired_before(cutoff), datetime.min.time())
+        if settings.USE_TZ:
+            boundary = timezone.make_aware(boundary)
+        report.related_rows += _delete_stray_children(boundary, chunk_size)
+        report.partitions_dropped = partitioning.detach_partitions_before(cutoff, drop=True)
+
+    process = _delete_chunk if mode == "delete" else _anonymize_chunk
+    qs = pending_queryset(mode, cutoff)
+    last_id = 0
+    while True:
+        rows = list(qs.filter(id__gt=last_id).order_by("id").values_list("id", "session_id")[:chunk_size])
+        if not rows:
+            report.finished = True
+            break
+        ids = [row[0] for row in rows]
+        with transaction.atomic():
+            report.related_rows += process(ids)
+        # Live caches must not keep serving the deleted or un-redacted transcripts
+        session_cache.invalidate_many(row[1] for row in rows)
+        last_id = ids[-1]
+        report.conversations += len(ids)
+        report.chunks += 1
+        report.seconds = time.monotonic() - started
+        logger.info(
+            f"Retention {mode}: {report.conversations} conversations so far ({report.rows_per_second:.0f} rows/s)"
+        )
+        if max_seconds and report.seconds >= max_seconds:
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    report.seconds = time.monotonic() - started
+    return report
@@ -0,0 +1,78 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+from assistant.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = "replica"
+STICKY_KEY = "db:sticky:{session_id}"
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+def read_replica_alias() -> str:
+    # Alias for bulk read jobs (exports) that never need read-your-writes
+    return REPLICA_ALIAS if replica_configured() else "default"
+
+def mark_session_written(session_id: Optional[str]) -> None:
+    # --- Pin this session's reads to the primary until the replica has caught up ---
+    if not session_id or not replica_configured():
+        return
+    try:
+        get_redis().set(STICKY_KEY.format(session_id=session_id), 1, ex=settings.DB_REPLICA_STICKY_SECONDS)
+    except Exception as e:
+        logger.warning(f"Could not mark session {session_id} as sticky: {e}")
+
+def _session_is_sticky(session_id: str) -> bool:
+    try:
+        return bool(get_redis().exists(STICKY_KEY.format(session_id=session_id)))
+    except Exception:
+        # Unknown replication state: stay on the primary
+        return True
+
+@contextmanager
+def read_replica(session_id: Optional[str] = None) -> Iterator[None]:
+    # --- Route ORM reads inside the block to the replica (unless the session was just written) ---
+    enabled = replica_configured() and not (session_id and _session_is_sticky(session_id))
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+def replica_reads(view):
+    # View decorator for pure-read endpoints
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        session_id = kwargs.get("session_id") or request.GET.get("session_id")
+        with read_replica(session_id):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # Related lookups follow the object they were loaded from
+            return instance._state.db
+        if _use_replica.get():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica and primary hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
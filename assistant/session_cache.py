@@ -0,0 +1,226 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from assistant import metrics
+from assistant.models import Conversation, UserPreference
+from assistant.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# --- In-process cache of live sessions, kept coherent across processes via Redis pub/sub ---
+# Each process caches the decoded transcript and analysis state of sessions it has touched.
+# Writers publish the session id after every write and other processes drop their copy.
+# The cache only serves while this process is subscribed: a process that might have missed
+# an invalidation reads from the database instead.
+
+INVALIDATION_CHANNEL = "sessions:invalidate"
+_STATE_FIELDS = (
+    "id", "session_id", "started_at", "messages_json", "total_messages", "analyzed_message_count", "prompt_version",
+    "summary_transcript_digest", "summary_message_count",
+)
+
+@dataclass
+class SessionState:
+    conversation_id: int
+    session_id: str
+    messages: List[Dict[str, Any]]
+    total_messages: int
+    analyzed_message_count: int
+    prompt_version: str
+    started_at: Optional[datetime] = None
+    summary_digest: str = ""
+    summary_message_count: int = 0
+    # {type: value} of extracted preferences; None until loaded
+    preferences: Optional[Dict[str, Any]] = None
+    expires_at: float = 0.0
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, SessionState]" = OrderedDict()
+_subscribed = threading.Event()
+_listener_pid: Optional[int] = None
+_origin = ""
+
+def state_from(conv: Conversation, preferences: Optional[Dict[str, Any]] = None) -> SessionState:
+    return SessionState(
+        conversation_id=conv.pk,
+        session_id=conv.session_id,
+        messages=list(conv.messages_json or []),
+        total_messages=conv.total_messages,
+        analyzed_message_count=conv.analyzed_message_count,
+        prompt_version=conv.prompt_version,
+        started_at=conv.started_at,
+        summary_digest=conv.summary_transcript_digest,
+        summary_message_count=conv.summary_message_count,
+        preferences=preferences,
+    )
+
+def _enabled() -> bool:
+    if not settings.SESSION_CACHE_ENABLED:
+        return False
+    _ensure_listener()
+    return _subscribed.is_set()
+
+def get(session_id: str) -> Optional[SessionState]:
+    if not _enabled():
+        return None
+    with _lock:
+        state = _entries.get(session_id)
+        if state is None:
+            metrics.incr("session_cache.miss")
+            return None
+        if state.expires_at <= time.monotonic():
+            del _entries[session_id]
+            metrics.incr("session_cache.expired")
+            return None
+        _entries.move_to_end(session_id)
+    metrics.incr("session_cache.hit")
+    return state
+
+def put(state: SessionState, written: bool = False) -> None:
+    # `written`: this process just changed the row, so other processes must drop their copy
+    if written:
+        _publish(state.session_id)
+    if not _enabled():
+        return
+    state = replace(state, expires_at=time.monotonic() + settings.SESSION_CACHE_TTL_SECONDS)
+    with _lock:
+        _entries[state.session_id] = state
+        _entries.move_to_end(state.session_id)
+        while len(_entries) > settings.SESSION_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+def invalidate(session_id: str) -> None:
+    # Local drop plus a broadcast; call after any write that bypasses put()
+    with _lock:
+        _entries.pop(session_id, None)
+    _publish(session_id)
+
+def invalidate_many(session_ids: Iterable[str]) -> None:
+    # Bulk writers (retention): one pipelined round trip instead of a publish per session
+    session_ids = list(session_ids)
+    with _lock:
+        for session_id in session_ids:
+            _entries.pop(session_id, None)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.publish(INVALIDATION_CHANNEL, f"{_origin}:{session_id}")
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Session cache invalidations not published for {len(session_ids)} sessions: {e}")
+
+def _verified(state: SessionState) -> Optional[SessionState]:
+    # Invalidations arrive asynchronously, so another process may have just written this row.
+    # One read of the small columns (no transcript) settles it: messages are only ever appended,
+    # so an equal total_messages means the cached transcript is current. Preferences are re-read.
+    row = (
+        Conversation.objects.filter(pk=state.conversation_id)
+        .values("total_messages", "analyzed_message_count", "prompt_version",
+                "summary_transcript_digest", "summary_message_count")
+        .first()
+    )
+    if row is None or row["total_messages"] != state.total_messages:
+        metrics.incr("session_cache.stale")
+        return None
+    return replace(
+        state,
+        analyzed_message_count=row["analyzed_message_count"],
+        prompt_version=row["prompt_version"],
+        summary_digest=row["summary_transcript_digest"],
+        summary_message_count=row["summary_message_count"],
+        preferences=None,
+    )
+
+def load(session_id: str, verify: bool = False) -> Optional[SessionState]:
+    # --- Cached state, or one narrow read of the row (+ preferences) that then gets cached ---
+    # `verify`: for callers that act on the state (analysis, summaries); see _verified
+    state = get(session_id)
+    if state is not None and verify:
+        state = _verified(state)
+    if state is None:
+        conv = Conversation.objects.filter(session_id=session_id).only(*_STATE_FIELDS).first()
+        if conv is None:
+            return None
+        state = state_from(conv)
+    if state.preferences is None:
+        prefs = UserPreference.objects.filter(conversation_id=state.conversation_id).only("data")
+        state = replace(state, preferences={p.data.get("type"): p.data.get("value") for p in prefs})
+        put(state)
+    return state
+
+# --- Cross-process invalidation ---
+
+def _publish(session_id: str) -> None:
+    try:
+        get_redis().publish(INVALIDATION_CHANNEL, f"{_origin}:{session_id}")
+    except Exception as e:
+        logger.debug(f"Session cache invalidation not published for {session_id}: {e}")
+
+def _after_fork_in_child() -> None:
+    # Another thread may have held the lock at fork time; the child starts with fresh ones
+    global _lock, _subscribed, _listener_pid
+    _lock = threading.Lock()
+    _subscribed = threading.Event()
+    _listener_pid = None
+    _entries.clear()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def _ensure_listener() -> None:
+    # One daemon thread per process; started again in forked (prefork/multiprocessing) children
+    global _listener_pid, _origin
+    pid = os.getpid()
+    if _listener_pid == pid:
+        return
+    with _lock:
+        if _listener_pid == pid:
+            return
+        _listener_pid = pid
+        _origin = f"{pid}-{uuid.uuid4().hex[:8]}"
+        _entries.clear()
+        _subscribed.clear()
+    threading.Thread(target=_listen, name="session-cache-invalidation", daemon=True).start()
+
+def _on_invalidation(data: Any) -> None:
+    # "<origin>:<session_id>"; this process's own writes already updated its cache
+    origin, _, session_id = str(data).partition(":")
+    if origin != _origin:
+        with _lock:
+            _entries.pop(session_id, None)
+
+def _listen() -> None:
+    backoff = 1.0
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            _subscribed.set()
+            backoff = 1.0
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message:
+                    _on_invalidation(message["data"])
+        except Exception as e:
+            # Invalidations may have been missed: stop serving and start clean once resubscribed
+            _subscribed.clear()
+            with _lock:
+                _entries.clear()
+            logger.debug(f"Session cache listener disconnected, retrying in {backoff:.0f}s: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
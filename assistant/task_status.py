@@ -0,0 +1,139 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
+from django.conf import settings
+from django.utils import timezone
+
+from assistant.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# --- Compact per-task status records (state, timings, error) kept in Redis with a TTL ---
+# The Celery result backend is not used for this: tasks opt out of stored results one by one,
+# and the few that keep them expire after CELERY_RESULT_EXPIRES.
+
+STATUS_KEY = "task:status:{}"
+# Only the tasks a client polls through /api/tasks/<id> get a record; beat and email
+# tasks would otherwise write one every few seconds that nobody reads
+TRACKED_TASKS = frozenset({
+    "assistant.analyzer.generate_summary_task",
+    "assistant.analyzer.analyze_conversation_task",
+})
+# Task return values larger than this are not copied into the status record
+MAX_RESULT_BYTES = 1024
+MAX_ERROR_CHARS = 500
+
+_started: Dict[str, float] = {}
+_started_lock = threading.Lock()
+
+def _now() -> str:
+    return timezone.now().isoformat()
+
+def _write(task_id: Optional[str], fields: Dict[str, Any]) -> None:
+    if not task_id:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        key = STATUS_KEY.format(task_id)
+        pipe.hset(key, mapping={k: v for k, v in fields.items() if v is not None})
+        pipe.expire(key, settings.TASK_STATUS_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Task status not recorded for {task_id}: {e}")
+
+def get_status(task_id: str) -> Optional[Dict[str, Any]]:
+    raw = get_redis().hgetall(STATUS_KEY.format(task_id))
+    if not raw:
+        return None
+    status: Dict[str, Any] = dict(raw)
+    if "runtime_ms" in status:
+        status["runtime_ms"] = int(float(status["runtime_ms"]))
+    if "result" in status:
+        status["result"] = json.loads(status["result"])
+    return status
+
+@before_task_publish.connect
+def _on_publish(sender=None, headers=None, **kwargs):
+    if sender not in TRACKED_TASKS:
+        return
+    headers = headers or {}
+    _write(headers.get("id"), {"name": sender, "state": "queued", "queued_at": _now(), "args": headers.get("argsrepr")})
+
+@task_prerun.connect
+def _on_prerun(task_id=None, task=None, **kwargs):
+    if getattr(task, "name", None) not in TRACKED_TASKS:
+        return
+    with _started_lock:
+        _started[task_id] = time.monotonic()
+    _write(task_id, {"name": getattr(task, "name", None), "state": "running", "started_at": _now()})
+
+@task_postrun.connect
+def _on_postrun(task_id=None, task=None, retval=None, state=None, **kwargs):
+    if getattr(task, "name", None) not in TRACKED_TASKS:
+        return
+    with _started_lock:
+        started = _started.pop(task_id, None)
+    fields = {
+        "state": (state or "SUCCESS").lower(),
+        "finished_at": _now(),
+        "runtime_ms": int((time.monotonic() - started) * 1000) if started else None,
+    }
+    if state == "SUCCESS" and retval is not None:
+        try:
+            encoded = json.dumps(retval, default=str)
+            if len(encoded) <= MAX_RESULT_BYTES:
+                fields["result"] = encoded
+        except (TypeError, ValueError):
+            pass
+    _write(task_id, fields)
+
+@task_failure.connect
+def _on_failure(sender=None, task_id=None, exception=None, **kwargs):
+    if getattr(sender, "name", None) not in TRACKED_TASKS:
+        return
+    _write(task_id, {"error": f"{type(exception).__name__}: {exception}"[:MAX_ERROR_CHARS]})
+
+# --- At most one in-flight task per key (e.g. one summary per session) ---
+
+# Take the key or return its holder, in one step (a separate GET could see it expire: None)
+_CLAIM_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder then
+    return holder
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[2]))
+return false
+"""
+
+# Delete the key only while `task_id` still holds it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def claim_inflight(key: str, task_id: str, ttl_seconds: int) -> Optional[str]:
+    # Returns the task already holding `key`, or None if `task_id` now holds it
+    try:
+        return get_redis().eval(_CLAIM_SCRIPT, 1, key, task_id, ttl_seconds)
+    except Exception as e:
+        logger.warning(f"In-flight check unavailable for {key}: {e}")
+        return None
+
+def take_inflight(key: str, task_id: str, ttl_seconds: int) -> None:
+    # Unconditional hand-over; the previous holder's release_inflight then leaves the key alone
+    try:
+        get_redis().set(key, task_id, ex=ttl_seconds)
+    except Exception as e:
+        logger.warning(f"In-flight hand-over unavailable for {key}: {e}")
+
+def release_inflight(key: str, task_id: str) -> None:
+    try:
+        get_redis().eval(_RELEASE_SCRIPT, 1, key, task_id)
+    except Exception as e:
+        logger.debug(f"In-flight release failed for {key}: {e}")
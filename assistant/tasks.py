@@ -1,16 +1,17 @@
 import os
 import json
 import logging
+from datetime import timedelta
 from celery import shared_task
 from django.core.mail import EmailMessage
 from django.conf import settings
-from assistant.models import Conversation
+from assistant.models import REPLAY_PREFIX, Conversation
 from django.db.models import Q
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
-@shared_task
+@shared_task(ignore_result=True)
 def email_conversation_summary(session_id):
     logger.info("[CELERY TASK] send_conversation_summary called for session_id=%s", session_id)
     recipient = os.environ.get('MAIN_EMAIL')
@@ -33,15 +34,52 @@ def email_conversation_summary(session_id):
     except Conversation.DoesNotExist:
         logger.error("Conversation %s not found.", session_id)
 
-@shared_task
+@shared_task(ignore_result=True)
 def schedule_email():
-    conv = Conversation.objects.exclude(
+    if settings.SUMMARY_EMAIL_MODE == "digest":
+        # send_summary_digest picks these up in batches instead
+        return
+    pending = Conversation.objects.exclude(
         Q(summary_data__isnull=True) | Q(summary_data={}) | Q(summary_emailed_at__isnull=False)
-    ).order_by('-started_at').first()
+        | Q(session_id__startswith=REPLAY_PREFIX)
+    )
+    if settings.SUMMARY_EMAIL_LOOKBACK_DAYS is not None:
+        pending = pending.filter(started_at__gte=timezone.now() - timedelta(days=settings.SUMMARY_EMAIL_LOOKBACK_DAYS))
+    conv = pending.order_by('-started_at').first()
     if not conv:
         logger.info("[CELERY BEAT] No conversations with completed summary to mail.")
         return
 
     logger.info(f"[CELERY BEAT] Mailing summary for conversation {conv.session_id}")
     # Only pass session_id!
-    email_conversation_summary.apply_async(args=[conv.session_id], countdown=5)
\ No newline at end of file
+    email_conversation_summary.apply_async(args=[conv.session_id], countdown=5)
+
+@shared_task(ignore_result=True)
+def send_summary_digest():
+    if settings.SUMMARY_EMAIL_MODE != "digest":
+        return
+    from assistant.digest import send_digest
+    included = send_digest(settings.SUMMARY_EMAIL_RECIPIENTS, settings.SUMMARY_DIGEST_MAX_CONVERSATIONS)
+    logger.info("[CELERY BEAT] Summary digest: %s conversations", included or "no new")
+
+@shared_task(ignore_result=True)
+def maintain_conversation_partitions():
+    if not settings.CONVERSATION_PARTITIONING:
+        return
+    from assistant.partitioning import ensure_partitions
+    created = ensure_partitions(settings.CONVERSATION_PARTITIONS_AHEAD)
+    logger.info("[CELERY BEAT] Conversation partitions created: %s", created or "none needed")
+
+@shared_task(ignore_result=True)
+def apply_conversation_retention():
+    if settings.CONVERSATION_RETENTION_DAYS <= 0:
+        return
+    from assistant.retention import apply_retention
+    report = apply_retention(
+        settings.CONVERSATION_RETENTION_MODE,
+        timezone.now() - timedelta(days=settings.CONVERSATION_RETENTION_DAYS),
+        chunk_size=settings.RETENTION_CHUNK_SIZE,
+        pause_seconds=settings.RETENTION_PAUSE_SECONDS,
+        max_seconds=settings.RETENTION_MAX_SECONDS,
+    )
+    logger.info("[CELERY BEAT] Retention %s", report)
@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+from assistant.queryprofile import QueryProfile, profile_queries
+
+# --- Query budget assertions for endpoint tests ---
+
+@contextmanager
+def assert_query_budget(max_queries: int, max_repeats: Optional[int] = None) -> Iterator[QueryProfile]:
+    # with assert_query_budget(3): client.get("/api/vehicle-interests/")
+    if max_repeats is None:
+        max_repeats = settings.QUERY_REPEAT_THRESHOLD - 1
+    with profile_queries() as profile:
+        yield profile
+
+    problems = []
+    if profile.count > max_queries:
+        problems.append(f"{profile.count} queries, budget is {max_queries}")
+    for shape in profile.repeated(max_repeats + 1):
+        problems.append(f"query repeated {shape.count}x (N+1?): {shape.sql[:300]}")
+    if problems:
+        raise AssertionError("; ".join(problems) + "\n" + profile.report(limit=10))
+
+def assert_endpoint_query_budget(client, path: str, max_queries: int, method: str = "get", **kwargs):
+    # Returns the response so the caller can check it as well
+    with assert_query_budget(max_queries):
+        response = getattr(client, method.lower())(path, **kwargs)
+        if getattr(response, "streaming", False):
+            # Streamed bodies run their queries while being consumed
+            response.streaming_content = list(response.streaming_content)
+    return response
@@ -0,0 +1,23 @@
+import unittest
+
+from assistant import redis_client
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - listed in requirements-dev.txt
+    fakeredis = None
+
+# --- In-memory Redis (with Lua scripting) swapped in for the shared client ---
+
+@unittest.skipIf(fakeredis is None, "fakeredis[lua] is not installed")
+class FakeRedisMixin:
+    def setUp(self):
+        super().setUp()
+        self._real_client = redis_client._client
+        # A fresh server per test: FakeRedis instances otherwise share one
+        self.redis = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+        redis_client._client = self.redis
+
+    def tearDown(self):
+        redis_client._client = self._real_client
+        super().tearDown()
@@ -0,0 +1,110 @@
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from assistant import assets
+from assistant.assets import CachedFile, parse_accept_encoding
+
+class AcceptEncodingTests(SimpleTestCase):
+    file = CachedFile(b"plain", b"gz", b"br", "text/plain", '"abc"', 0.0, False)
+
+    def _encoding(self, header):
+        return self.file.pick(header)[1]
+
+    def test_parses_q_values(self):
+        self.assertEqual(parse_accept_encoding("gzip, br;q=0.8, *;q=0"), {"gzip": 1.0, "br": 0.8, "*": 0.0})
+        self.assertEqual(parse_accept_encoding("gzip;q=bogus"), {"gzip": 0.0})
+
+    def test_prefers_brotli_on_ties(self):
+        self.assertEqual(self._encoding("gzip, deflate, br"), "br")
+        self.assertEqual(self._encoding("*"), "br")
+
+    def test_q_zero_excludes_a_coding(self):
+        self.assertEqual(self._encoding("br;q=0, gzip"), "gzip")
+        self.assertIsNone(self._encoding("br;q=0, gzip;q=0"))
+        self.assertIsNone(self._encoding("*;q=0"))
+
+    def test_highest_q_wins(self):
+        self.assertEqual(self._encoding("gzip;q=0.5, br;q=0.4"), "gzip")
+        self.assertIsNone(self._encoding("br;q=0.5, identity;q=0.9"))
+
+    def test_no_substring_matches(self):
+        self.assertIsNone(self._encoding("x-brotli, sbr"))
+        self.assertIsNone(self._encoding(""))
+
+    def test_falls_back_when_a_copy_is_missing(self):
+        gzip_only = CachedFile(b"plain", b"gz", None, "text/plain", '"abc"', 0.0, False)
+        self.assertEqual(gzip_only.pick("br, gzip"), (b"gz", "gzip"))
+        self.assertEqual(gzip_only.pick("br"), (b"plain", None))
+
+@override_settings(DEBUG=False)
+class AssetViewTests(SimpleTestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        static = Path(self._dir.name)
+        dist = static / "dist"
+        (dist / "js").mkdir(parents=True)
+        (static / "index_new.html").write_text('<script src="/static/js/app.js"></script>', encoding="utf-8")
+        self.manifest = dist / "manifest.json"
+        for name, body in (("js/app.aaa.js", b"console.log(1);"), ("js/app.bbb.js", b"console.log(2);")):
+            (dist / name).write_bytes(body)
+            Path(f"{dist / name}.gz").write_bytes(gzip.compress(body))
+        self._build("js/app.aaa.js")
+
+        for attr, value in (("STATIC_DIR", static), ("DIST_DIR", dist), ("MANIFEST_FILE", self.manifest)):
+            patcher = mock.patch.object(assets, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        assets.reset()
+        self.addCleanup(assets.reset)
+
+    def _build(self, hashed, bump=0):
+        self.manifest.write_text(json.dumps({"js/app.js": hashed}), encoding="utf-8")
+        if bump:
+            mtime = os.path.getmtime(self.manifest) + bump
+            os.utime(self.manifest, (mtime, mtime))
+
+    def test_etag_differs_per_encoding(self):
+        plain = self.client.get("/assets/js/app.aaa.js")
+        gzipped = self.client.get("/assets/js/app.aaa.js", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+        self.assertNotEqual(plain["ETag"], gzipped["ETag"])
+        self.assertEqual(gzipped["ETag"], plain["ETag"][:-1] + '-gzip"')
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+    def test_if_none_match_returns_304_for_the_same_representation(self):
+        first = self.client.get("/assets/js/app.aaa.js", HTTP_ACCEPT_ENCODING="gzip")
+        again = self.client.get("/assets/js/app.aaa.js", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertIn("Accept-Encoding", again["Vary"])
+        self.assertEqual(again["Cache-Control"], assets.IMMUTABLE_CACHE_CONTROL)
+
+        other = self.client.get("/assets/js/app.aaa.js", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(other.status_code, 200)
+        self.assertNotIn("Content-Encoding", other)
+
+    def test_pages_point_at_hashed_assets_and_revalidate(self):
+        page = self.client.get("/")
+        self.assertIn(b"/assets/js/app.aaa.js", page.content)
+        self.assertEqual(page["Cache-Control"], assets.REVALIDATE_CACHE_CONTROL)
+
+    def test_manifest_reload_after_a_build(self):
+        self.assertIn(b"/assets/js/app.aaa.js", self.client.get("/").content)
+        self.assertEqual(self.client.get("/assets/js/app.aaa.js")["Cache-Control"], assets.IMMUTABLE_CACHE_CONTROL)
+
+        self._build("js/app.bbb.js", bump=10)
+        self.assertIn(b"/assets/js/app.bbb.js", self.client.get("/").content)
+        self.assertEqual(self.client.get("/assets/js/app.bbb.js")["Cache-Control"], assets.IMMUTABLE_CACHE_CONTROL)
+        # The previous build's file is no longer content-addressed by the manifest
+        self.assertEqual(self.client.get("/assets/js/app.aaa.js")["Cache-Control"], assets.REVALIDATE_CACHE_CONTROL)
+
+    def test_paths_outside_dist_are_refused(self):
+        self.assertEqual(self.client.get("/assets/../index_new.html").status_code, 404)
+        self.assertEqual(self.client.get("/assets/js/app.aaa.js.gz").status_code, 404)
@@ -0,0 +1,89 @@
+from django.test import SimpleTestCase, override_settings
+
+from assistant import capacity, redis_client
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+@override_settings(
+    REALTIME_SESSION_CAPACITY=1,
+    REALTIME_SESSION_LEASE_SECONDS=60,
+    REALTIME_QUEUE_TTL_SECONDS=30,
+    REALTIME_QUEUE_POLL_SECONDS=5,
+    REALTIME_DEFAULT_SESSION_SECONDS=120,
+)
+class CapacityTests(FakeRedisMixin, SimpleTestCase):
+    def test_admits_until_full_then_queues(self):
+        self.assertTrue(capacity.acquire("a").admitted)
+        queued = capacity.acquire("b")
+        self.assertFalse(queued.admitted)
+        self.assertEqual(queued.position, 1)
+        self.assertEqual(queued.estimated_wait_seconds, 120)
+        self.assertEqual(queued.retry_after_seconds, 5)
+
+    def test_reacquire_renews_the_existing_lease(self):
+        self.assertTrue(capacity.acquire("a").admitted)
+        self.assertTrue(capacity.acquire("a").admitted)
+        self.assertEqual(self.redis.zcard(capacity.ACTIVE_KEY), 1)
+
+    def test_freed_slot_goes_to_the_head_of_the_queue(self):
+        capacity.acquire("a")
+        capacity.acquire("b")
+        capacity.acquire("c")
+        self.assertTrue(capacity.release("a"))
+
+        later = capacity.acquire("c")
+        self.assertFalse(later.admitted)
+        self.assertEqual(later.position, 2)
+        self.assertTrue(capacity.acquire("b").admitted)
+        self.assertEqual(self.redis.zrange(capacity.QUEUE_KEY, 0, -1), ["c"])
+
+    def test_expired_lease_frees_its_slot(self):
+        capacity.acquire("a")
+        self.redis.zadd(capacity.ACTIVE_KEY, {"a": 0})
+        self.assertTrue(capacity.acquire("b").admitted)
+        self.assertIsNone(self.redis.hget(capacity.STARTED_KEY, "a"))
+        self.assertFalse(capacity.heartbeat("a"))
+
+    def test_abandoned_queue_entries_are_dropped(self):
+        capacity.acquire("a")
+        capacity.acquire("b")
+        self.redis.zadd(capacity.QUEUE_SEEN_KEY, {"b": 0})
+        self.assertEqual(capacity.acquire("c").position, 1)
+        self.assertIsNone(self.redis.zscore(capacity.QUEUE_KEY, "b"))
+
+    def test_heartbeat_extends_only_live_leases(self):
+        capacity.acquire("a")
+        self.assertTrue(capacity.heartbeat("a"))
+        capacity.release("a")
+        self.assertFalse(capacity.heartbeat("a"))
+
+    def test_release_updates_average_duration(self):
+        capacity.acquire("a")
+        self.redis.hset(capacity.STARTED_KEY, "a", capacity._now_ms() - 20_000)
+        self.assertTrue(capacity.release("a"))
+        # 0.9 * 120s default + 0.1 * ~20s
+        self.assertAlmostEqual(int(self.redis.get(capacity.AVG_DURATION_KEY)) / 1000.0, 110.0, delta=0.5)
+        self.assertFalse(capacity.release("a"))
+
+    def test_release_of_a_queued_session_leaves_the_queue(self):
+        capacity.acquire("a")
+        capacity.acquire("b")
+        self.assertFalse(capacity.release("b"))
+        self.assertEqual(self.redis.zcard(capacity.QUEUE_KEY), 0)
+
+    def test_fails_open_without_redis(self):
+        class Broken:
+            def eval(self, *args):
+                raise ConnectionError("down")
+
+        redis_client._client = Broken()
+        self.assertTrue(capacity.acquire("a").admitted)
+
+    def test_expired_lease_cannot_be_renewed_ahead_of_the_queue(self):
+        capacity.acquire("stale")
+        capacity.acquire("next")
+        # "stale" expired but no acquire() has purged it yet
+        self.redis.zadd(capacity.ACTIVE_KEY, {"stale": capacity._now_ms() - 1})
+        self.assertFalse(capacity.heartbeat("stale"))
+        self.assertIsNone(self.redis.zscore(capacity.ACTIVE_KEY, "stale"))
+        self.assertFalse(capacity.acquire("stale").admitted)
+        self.assertTrue(capacity.acquire("next").admitted)
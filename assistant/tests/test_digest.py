@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from assistant import digest
+from assistant.models import Conversation
+from assistant.task_status import claim_inflight
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+def _row(intent, score, started_at):
+    return {"purchase_intent": intent, "engagement_score": score, "started_at": started_at}
+
+class SortKeyTests(SimpleTestCase):
+    def test_intent_then_engagement_then_recency(self):
+        rows = {
+            "low-9": _row("low", 9, datetime(2024, 5, 1)),
+            "high-3": _row("high", 3, datetime(2024, 5, 1)),
+            "high-8-old": _row("high", 8, datetime(2024, 4, 1)),
+            "high-8-new": _row("high", 8, datetime(2024, 5, 1)),
+            "unknown-10": _row("unknown", 10, datetime(2024, 5, 1)),
+            "medium-5": _row("medium", 5, datetime(2024, 5, 1)),
+        }
+        ranked = sorted(rows, key=lambda name: digest.sort_key(rows[name]))
+        self.assertEqual(ranked, ["high-8-new", "high-8-old", "high-3", "medium-5", "low-9", "unknown-10"])
+
+    def test_unparseable_scores_count_as_zero(self):
+        self.assertEqual(digest._score({"engagement_score": "n/a"}), 0)
+        self.assertEqual(digest._score({"engagement_score": "7"}), 7)
+
+def _conversation(session_id, **fields):
+    defaults = {
+        "summary_data": {"summary": f"{session_id} summary", "purchase_intent": "high", "engagement_score": 5},
+        "summary_generated_at": timezone.now(),
+    }
+    return Conversation.objects.create(session_id=session_id, **{**defaults, **fields})
+
+@override_settings(SUMMARY_EMAIL_LOOKBACK_DAYS=None)
+class PendingConversationTests(TestCase):
+    def test_filters(self):
+        _conversation("pending")
+        _conversation("emailed", summary_emailed_at=timezone.now())
+        _conversation("unsummarized", summary_data={})
+        _conversation("replay_run_x")
+        _conversation("old", started_at=timezone.now() - timedelta(days=30))
+        self.assertEqual({c.session_id for c in digest.pending_conversations(10)}, {"pending", "old"})
+        with override_settings(SUMMARY_EMAIL_LOOKBACK_DAYS=7):
+            self.assertEqual([c.session_id for c in digest.pending_conversations(10)], ["pending"])
+
+    def test_oldest_summaries_first_up_to_the_limit(self):
+        _conversation("newer")
+        _conversation("older", summary_generated_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual([c.session_id for c in digest.pending_conversations(1)], ["older"])
+
+@override_settings(SUMMARY_EMAIL_LOOKBACK_DAYS=None, SUMMARY_DIGEST_RETRY_HOURS=24)
+class SendDigestTests(FakeRedisMixin, TestCase):
+    recipients = ["a@example.com", "b@example.com"]
+
+    def setUp(self):
+        super().setUp()
+        _conversation("s1")
+        _conversation("s2")
+
+    def _failing_for(self, address):
+        real_send = digest.EmailMultiAlternatives.send
+
+        def send(message, *args, **kwargs):
+            if address in message.to:
+                raise ConnectionError("mailbox unavailable")
+            return real_send(message, *args, **kwargs)
+        return mock.patch.object(digest.EmailMultiAlternatives, "send", send)
+
+    def test_everyone_gets_one_digest(self):
+        self.assertEqual(digest.send_digest(self.recipients, 10), 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), self.recipients)
+        self.assertFalse(Conversation.objects.filter(summary_emailed_at__isnull=True).exists())
+        self.assertEqual(digest.send_digest(self.recipients, 10), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_recipient_is_retried_alone(self):
+        with self._failing_for("b@example.com"):
+            digest.send_digest(self.recipients, 10)
+        self.assertEqual([m.to for m in mail.outbox], [["a@example.com"]])
+        self.assertEqual(Conversation.objects.filter(summary_emailed_at__isnull=True).count(), 2)
+        self.assertEqual(Conversation.objects.get(session_id="s1").digest_sent_to, ["a@example.com"])
+
+        self.assertEqual(digest.send_digest(self.recipients, 10), 2)
+        self.assertEqual([m.to for m in mail.outbox], [["a@example.com"], ["b@example.com"]])
+        self.assertFalse(Conversation.objects.filter(summary_emailed_at__isnull=True).exists())
+
+    def test_gives_up_after_the_retry_window(self):
+        Conversation.objects.update(summary_generated_at=timezone.now() - timedelta(hours=25))
+        with self._failing_for("b@example.com"), self.assertLogs("assistant.digest", "ERROR"):
+            digest.send_digest(self.recipients, 10)
+        self.assertFalse(Conversation.objects.filter(summary_emailed_at__isnull=True).exists())
+
+    def test_overlapping_run_is_skipped(self):
+        claim_inflight(digest.DIGEST_LOCK_KEY, "other-run", 60)
+        self.assertEqual(digest.send_digest(self.recipients, 10), 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_digest_lists_hot_leads_first(self):
+        _conversation("cold", summary_data={"summary": "cold", "purchase_intent": "low", "engagement_score": 9})
+        digest.send_digest(["a@example.com"], 10)
+        text = mail.outbox[0].body
+        self.assertLess(text.index("s1 summary"), text.index("cold"))
+        self.assertEqual(mail.outbox[0].attachments[0][2], "text/csv")
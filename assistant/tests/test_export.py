@@ -0,0 +1,95 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from assistant.export import gzip_stream, iter_export, parse_since
+from assistant.models import Conversation, UserPreference, VehicleInterest
+
+class ParseSinceTests(SimpleTestCase):
+    @override_settings(USE_TZ=False)
+    def test_naive_timestamp(self):
+        self.assertEqual(parse_since("2024-05-01T10:30:00"), datetime(2024, 5, 1, 10, 30))
+
+    @override_settings(USE_TZ=False, TIME_ZONE="UTC")
+    def test_aware_timestamp_is_made_naive_without_tz_support(self):
+        self.assertEqual(parse_since("2024-05-01T10:30:00+02:00"), datetime(2024, 5, 1, 8, 30))
+
+    @override_settings(USE_TZ=True, TIME_ZONE="UTC")
+    def test_naive_timestamp_is_made_aware_with_tz_support(self):
+        self.assertEqual(parse_since("2024-05-01T10:30:00"), datetime(2024, 5, 1, 10, 30, tzinfo=dt_timezone.utc))
+
+    def test_unparseable_values(self):
+        for value in ("yesterday", "2024-13-45T00:00:00", "2024-02-30", ""):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_since(value))
+
+class ExportStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.old = Conversation.objects.create(
+            session_id="old", started_at=datetime(2024, 1, 1, 9, 0),
+            summary_data={"summary": 'Said "maybe",\nthen left', "customer_name": "Ravi, K"},
+        )
+        UserPreference.objects.create(
+            conversation=cls.old, data={"notes": 'wants "7 seats", sunroof'}, extracted_at=datetime(2024, 1, 1, 9, 5),
+        )
+        VehicleInterest.objects.create(conversation=cls.old, vehicle_name="XUV700", timestamp=datetime(2024, 1, 1, 9, 5))
+        cls.new = Conversation.objects.create(session_id="new", started_at=datetime(2024, 3, 1, 9, 0))
+
+    def _ndjson(self, **kwargs):
+        return [json.loads(line) for line in b"".join(iter_export("ndjson", **kwargs)).splitlines()]
+
+    def test_gzip_stream_is_one_valid_gzip_file(self):
+        plain = b"".join(iter_export("ndjson"))
+        compressed = b"".join(iter_export("ndjson", compress=True))
+        self.assertEqual(compressed[:2], b"\x1f\x8b")
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_gzip_of_an_empty_stream(self):
+        self.assertEqual(gzip.decompress(b"".join(gzip_stream(iter(())))), b"")
+
+    def test_csv_quotes_nested_fields(self):
+        text = b"".join(iter_export("csv")).decode("utf-8")
+        rows = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual([row["session_id"] for row in rows], ["old", "new"])
+        self.assertEqual(rows[0]["summary"], 'Said "maybe",\nthen left')
+        self.assertEqual(rows[0]["customer_name"], "Ravi, K")
+        self.assertEqual(json.loads(rows[0]["preferences"])[0]["notes"], 'wants "7 seats", sunroof')
+        self.assertEqual(rows[0]["vehicle_interests"], "XUV700")
+
+    def test_since_is_exclusive(self):
+        self.assertEqual([r["session_id"] for r in self._ndjson(since=datetime(2024, 3, 1, 9, 0))], [])
+        self.assertEqual([r["session_id"] for r in self._ndjson(since=datetime(2024, 3, 1, 8, 59))], ["new"])
+
+    def test_since_includes_conversations_with_newer_children(self):
+        VehicleInterest.objects.create(conversation=self.old, vehicle_name="Thar", timestamp=datetime(2024, 4, 1))
+        records = self._ndjson(since=datetime(2024, 3, 15))
+        self.assertEqual([r["session_id"] for r in records], ["old"])
+        self.assertEqual([v["vehicle_name"] for v in records[0]["vehicle_interests"]], ["XUV700", "Thar"])
+
+    def test_messages_only_on_request(self):
+        self.assertNotIn("messages", self._ndjson()[0])
+        self.assertEqual(self._ndjson(include_messages=True)[0]["messages"], [])
+
+@override_settings(EXPORT_API_TOKEN="")
+class ExportEndpointAuthTests(TestCase):
+    def test_disabled_without_a_token(self):
+        self.assertEqual(self.client.get("/api/export/conversations").status_code, 403)
+
+    @override_settings(EXPORT_API_TOKEN="secret")
+    def test_requires_the_token(self):
+        self.assertEqual(self.client.get("/api/export/conversations").status_code, 401)
+        response = self.client.get("/api/export/conversations", HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get("/api/export/conversations", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+    @override_settings(EXPORT_API_TOKEN="secret")
+    def test_rejects_impossible_since(self):
+        response = self.client.get("/api/export/conversations?since=2024-13-45T00:00:00", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from assistant import analyzer, novelty
+
+class AssessTests(SimpleTestCase):
+    previous = ["I am looking for a family SUV under 15 lakh with good mileage"]
+
+    def test_filler_is_skipped(self):
+        decision = novelty.assess(["okay", "hmm thanks"], self.previous)
+        self.assertEqual((decision.run, decision.reason), (False, "filler"))
+
+    def test_no_user_text(self):
+        self.assertEqual(novelty.assess([], self.previous).reason, "no_user_text")
+
+    def test_near_duplicate_is_skipped(self):
+        decision = novelty.assess(["I am looking for a family SUV under 15 lakh with good mileage please"], self.previous)
+        self.assertEqual((decision.run, decision.reason), (False, "duplicate"))
+        self.assertGreaterEqual(decision.similarity, novelty.DUPLICATE_SIMILARITY)
+
+    def test_new_signal_runs(self):
+        decision = novelty.assess(["Actually I would prefer a diesel with a sunroof"], self.previous)
+        self.assertEqual((decision.run, decision.reason), (True, "signal"))
+
+    def test_long_novel_text_runs(self):
+        decision = novelty.assess(["my wife mostly drives it to her school every morning"], self.previous)
+        self.assertEqual((decision.run, decision.reason), (True, "novel_text"))
+
+    def test_short_text_without_signal_is_skipped(self):
+        self.assertEqual(novelty.assess(["maybe later"], self.previous).reason, "too_short")
+
+    def test_negations_answer_the_last_question(self):
+        for text in ("no", "Nope.", "nah, don't want that"):
+            with self.subTest(text=text):
+                decision = novelty.assess([text], self.previous)
+                self.assertEqual((decision.run, decision.reason), (True, "negation"))
+
+    def test_repeated_negation_is_not_a_duplicate(self):
+        self.assertTrue(novelty.assess(["no"], self.previous + ["no"]).run)
+
+    def test_minhash_tracks_jaccard_similarity(self):
+        a = novelty.minhash(novelty.shingles(novelty.normalize("the quick brown fox jumps over the lazy dog")))
+        b = novelty.minhash(novelty.shingles(novelty.normalize("the quick brown fox jumps over the lazy cat")))
+        c = novelty.minhash(novelty.shingles(novelty.normalize("completely unrelated words about diesel engines")))
+        self.assertEqual(novelty.similarity(a, a), 1.0)
+        self.assertGreater(novelty.similarity(a, b), novelty.similarity(a, c))
+        self.assertEqual(novelty.minhash([]), ())
+
+class AnalysisGateTests(SimpleTestCase):
+    def _conv(self, analyzed=0):
+        return SimpleNamespace(session_id="gate", analyzed_message_count=analyzed)
+
+    def _msgs(self, *user_texts):
+        msgs = []
+        for text in user_texts:
+            msgs += [{"role": "assistant", "content": "Anything else?"}, {"role": "user", "content": text}]
+        return msgs
+
+    def test_waits_for_a_full_batch(self):
+        conv = self._conv()
+        msgs = self._msgs("I want an SUV")[: analyzer.ANALYSIS_MESSAGE_BATCH_SIZE - 1]
+        self.assertIsNone(analyzer._analysis_gate(conv, msgs))
+        self.assertEqual(conv.analyzed_message_count, 0)
+
+    def test_consumes_the_batch_when_skipping(self):
+        msgs = self._msgs("I want a family SUV under 15 lakh", "okay", "thanks")
+        conv = self._conv(analyzed=2)
+        decision = analyzer._analysis_gate(conv, msgs)
+        self.assertFalse(decision.run)
+        self.assertEqual(conv.analyzed_message_count, len(msgs))
+
+    def test_runs_on_new_signal(self):
+        msgs = self._msgs("hello", "I need a 7 seater diesel")
+        decision = analyzer._analysis_gate(self._conv(), msgs)
+        self.assertEqual((decision.run, decision.reason), (True, "signal"))
+
+    def test_runs_on_a_negative_answer(self):
+        msgs = self._msgs("I want a family SUV under 15 lakh", "okay", "no")
+        decision = analyzer._analysis_gate(self._conv(analyzed=3), msgs)
+        self.assertEqual((decision.run, decision.reason), (True, "negation"))
@@ -0,0 +1,70 @@
+from datetime import date, datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from assistant import partitioning
+from assistant.models import Conversation, VehicleInterest
+from assistant.partitioning import (
+    _add_months, _month_start, default_partition_name, partition_name, partitions_to_detach, retired_before,
+)
+
+class MonthMathTests(SimpleTestCase):
+    def test_month_start(self):
+        self.assertEqual(_month_start(date(2024, 2, 29)), date(2024, 2, 1))
+
+    def test_add_months_across_years(self):
+        self.assertEqual(_add_months(date(2024, 11, 1), 1), date(2024, 12, 1))
+        self.assertEqual(_add_months(date(2024, 12, 1), 1), date(2025, 1, 1))
+        self.assertEqual(_add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(_add_months(date(2024, 1, 1), 25), date(2026, 2, 1))
+
+    def test_partition_names(self):
+        self.assertEqual(partition_name("assistant_conversation", date(2024, 3, 1)), "assistant_conversation_p202403")
+        self.assertEqual(default_partition_name("assistant_conversation"), "assistant_conversation_default")
+        match = partitioning._PARTITION_SUFFIX.search(partition_name("t", date(2024, 3, 1)))
+        self.assertEqual(match.groups(), ("2024", "03"))
+        self.assertIsNone(partitioning._PARTITION_SUFFIX.search(default_partition_name("t")))
+
+class DetachCutoffTests(SimpleTestCase):
+    partitions = [(partition_name("t", date(2024, m, 1)), date(2024, m, 1)) for m in (1, 2, 3, 4)]
+
+    def test_only_months_ending_by_the_cutoff(self):
+        self.assertEqual(partitions_to_detach(self.partitions, datetime(2024, 3, 15, 12, 0)), ["t_p202401", "t_p202402"])
+
+    def test_cutoff_on_a_month_boundary(self):
+        self.assertEqual(partitions_to_detach(self.partitions, date(2024, 3, 1)), ["t_p202401", "t_p202402"])
+        self.assertEqual(partitions_to_detach(self.partitions, date(2024, 1, 31)), [])
+
+    def test_retired_before_matches_the_detached_months(self):
+        for cutoff in (datetime(2024, 3, 15, 12, 0), datetime(2024, 3, 1), date(2024, 4, 30)):
+            with self.subTest(cutoff=cutoff):
+                boundary = retired_before(cutoff)
+                detached = set(partitions_to_detach(self.partitions, cutoff))
+                for name, month in self.partitions:
+                    self.assertEqual(name in detached, _add_months(month, 1) <= boundary)
+
+class NonPostgresGatingTests(TestCase):
+    def test_everything_is_a_no_op_off_postgres(self):
+        self.assertFalse(partitioning.is_partitioned())
+        self.assertEqual(partitioning.ensure_partitions(), [])
+        self.assertEqual(partitioning.detach_partitions_before(datetime(2100, 1, 1), drop=True), [])
+
+    def test_enable_refuses_off_postgres(self):
+        with self.assertRaises(RuntimeError):
+            partitioning.enable_partitioning()
+
+    def test_models_match_migrations(self):
+        # The partitioned schema is applied outside migrations (see 0009); the model state must not drift
+        call_command("makemigrations", "assistant", "--check", "--dry-run", stdout=StringIO())
+
+class VehicleInterestDaysTests(TestCase):
+    def test_days_bounds_the_conversation_month(self):
+        recent = Conversation.objects.create(session_id="recent")
+        old = Conversation.objects.create(session_id="old", started_at=datetime(2000, 1, 1))
+        VehicleInterest.objects.create(conversation=recent, vehicle_name="Thar", conversation_started_at=recent.started_at)
+        VehicleInterest.objects.create(conversation=old, vehicle_name="Scorpio", conversation_started_at=old.started_at)
+
+        response = self.client.get("/api/vehicle-interests/?days=30")
+        self.assertEqual([v["vehicle_name"] for v in response.json()["vehicle_interests"]], ["Thar"])
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from assistant.prompts import PromptRegistry
+
+class PromptRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.base = Path(self._dir.name)
+        (self.base / "a.md").write_text("You are assistant A.", encoding="utf-8")
+        (self.base / "b.md").write_text("You are assistant B.", encoding="utf-8")
+        self.manifest = self.base / "prompt_bundles.json"
+        self._write_manifest([
+            {"name": "control", "version": "v1", "instructions": "a.md", "weight": 30},
+            {"name": "short", "version": "v2", "instructions": "b.md", "weight": 70, "temperature": 0.6,
+             "tools": ["generate_conversation_summary"]},
+        ])
+
+    def _write_manifest(self, bundles):
+        self.manifest.write_text(json.dumps({"bundles": bundles}), encoding="utf-8")
+
+    def _touch(self, path: Path, mtime: float):
+        os.utime(path, (mtime, mtime))
+
+    def test_selection_is_sticky_and_weighted(self):
+        registry = PromptRegistry(self.manifest)
+        self.assertEqual(registry.select("session-1").label, registry.select("session-1").label)
+        counts = Counter(registry.select(f"session-{i}").name for i in range(4000))
+        self.assertAlmostEqual(counts["short"] / 4000, 0.7, delta=0.04)
+
+    def test_payload_bytes_are_the_serialized_payload(self):
+        bundle = PromptRegistry(self.manifest).get("short")
+        self.assertEqual(json.loads(bundle.payload_bytes), bundle.payload)
+        self.assertEqual(bundle.payload["instructions"], "You are assistant B.")
+        self.assertEqual(bundle.payload["temperature"], 0.6)
+        self.assertEqual([tool["name"] for tool in bundle.payload["tools"]], ["generate_conversation_summary"])
+        self.assertTrue(bundle.version.startswith("v2+"))
+
+    def test_get_by_name_or_label(self):
+        registry = PromptRegistry(self.manifest)
+        bundle = registry.get("control")
+        self.assertIs(registry.get(bundle.label), bundle)
+        self.assertIsNone(registry.get("missing"))
+
+    def test_reloads_when_instructions_change(self):
+        registry = PromptRegistry(self.manifest, reload_interval=0)
+        before = registry.get("control")
+        (self.base / "a.md").write_text("You are assistant A, now shorter.", encoding="utf-8")
+        self._touch(self.base / "a.md", os.path.getmtime(self.base / "a.md") + 10)
+        after = registry.get("control")
+        self.assertNotEqual(after.version, before.version)
+        self.assertTrue(after.version.startswith("v1+"))
+        self.assertIn(b"now shorter", after.payload_bytes)
+
+    def test_keeps_serving_the_last_good_bundles(self):
+        registry = PromptRegistry(self.manifest, reload_interval=0)
+        good = registry.bundles()
+        self.manifest.write_text("{not json", encoding="utf-8")
+        self._touch(self.manifest, os.path.getmtime(self.manifest) + 10)
+        with self.assertLogs("assistant.prompts", "ERROR"):
+            self.assertEqual(registry.bundles(), good)
+
+    def test_rejects_unknown_tools_and_zero_weights(self):
+        self._write_manifest([{"name": "x", "instructions": "a.md", "weight": 100, "tools": ["no_such_tool"]}])
+        with self.assertRaises(ValueError):
+            PromptRegistry(self.manifest).bundles()
+        self._write_manifest([{"name": "x", "instructions": "a.md", "weight": 0}])
+        with self.assertRaises(ValueError):
+            PromptRegistry(self.manifest).bundles()
+
+    def test_missing_manifest_falls_back_to_the_default_prompt(self):
+        (self.base / "system_instructions.md").write_text("Default prompt.", encoding="utf-8")
+        bundles = PromptRegistry(self.base / "absent.json").bundles()
+        self.assertEqual([(b.name, b.weight) for b in bundles], [("default", 100)])
+        self.assertEqual(bundles[0].payload["instructions"], "Default prompt.")
+
+    def test_shipped_manifest_loads(self):
+        self.assertTrue(PromptRegistry(settings.PROMPT_BUNDLES_FILE).select("any-session").payload_bytes)
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from assistant.models import Conversation, UserPreference, VehicleInterest
+from assistant.testing import assert_endpoint_query_budget, assert_query_budget
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+EXPORT_AUTH = {"HTTP_AUTHORIZATION": "Bearer test-token"}
+
+# --- Query counts must stay flat as the number of rows grows (no N+1) ---
+
+@override_settings(EXPORT_API_TOKEN="test-token")
+class EndpointQueryBudgetTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(6):
+            conv = Conversation.objects.create(
+                session_id=f"budget-{i}",
+                total_messages=2,
+                summary_data={"summary": f"Customer {i} wants an SUV", "recommended_vehicles": ["XUV700"]},
+            )
+            for j in range(2):
+                UserPreference.objects.create(
+                    conversation=conv, data={"budget": f"{10 + j} lakh"},
+                    conversation_started_at=conv.started_at,
+                )
+                VehicleInterest.objects.create(
+                    conversation=conv, vehicle_name=f"Vehicle {j}",
+                    conversation_started_at=conv.started_at,
+                )
+
+    def test_vehicle_interest_list(self):
+        response = assert_endpoint_query_budget(self.client, "/api/vehicle-interests/", 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["vehicle_interests"]), 12)
+
+    def test_vehicle_interest_list_with_date_bound(self):
+        response = assert_endpoint_query_budget(self.client, "/api/vehicle-interests/?days=30", 1)
+        self.assertEqual(response.status_code, 200)
+
+    def test_summary(self):
+        response = assert_endpoint_query_budget(self.client, "/api/summary/budget-3/", 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"]["text"], "Customer 3 wants an SUV")
+
+    # Exports: the conversation chunk, two prefetches and the savepoint pair of the export transaction
+    def test_ndjson_export(self):
+        response = assert_endpoint_query_budget(self.client, "/api/export/conversations", 5, **EXPORT_AUTH)
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 6)
+
+    def test_csv_export(self):
+        response = assert_endpoint_query_budget(self.client, "/api/export/conversations?format=csv", 5, **EXPORT_AUTH)
+        self.assertEqual(response.status_code, 200)
+        rows = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(len(rows), 7)
+
+    def test_incremental_export(self):
+        path = "/api/export/conversations?since=2000-01-01T00:00:00"
+        response = assert_endpoint_query_budget(self.client, path, 5, **EXPORT_AUTH)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 6)
+
+class QueryBudgetTests(TestCase):
+    def _repeat(self, times):
+        with connection.cursor() as cursor:
+            for _ in range(times):
+                cursor.execute("SELECT 1")
+
+    def test_over_budget_fails(self):
+        with self.assertRaises(AssertionError):
+            with assert_query_budget(1):
+                self._repeat(2)
+
+    def test_zero_repeats_is_honoured(self):
+        with assert_query_budget(5, max_repeats=1):
+            self._repeat(1)
+        with self.assertRaises(AssertionError):
+            with assert_query_budget(5, max_repeats=0):
+                self._repeat(1)
@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase, override_settings
+
+from assistant import ratelimit
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+class ParseResetTests(SimpleTestCase):
+    def test_parses_openai_durations(self):
+        self.assertEqual(ratelimit.parse_reset_ms("1s"), 1000)
+        self.assertEqual(ratelimit.parse_reset_ms("6m0s"), 360_000)
+        self.assertEqual(ratelimit.parse_reset_ms("120ms"), 120)
+        self.assertEqual(ratelimit.parse_reset_ms("1h2m3.5s"), 3_723_500)
+
+    def test_plain_seconds_and_garbage(self):
+        self.assertEqual(ratelimit.parse_reset_ms("2.5"), 2500)
+        self.assertIsNone(ratelimit.parse_reset_ms("soon"))
+        self.assertIsNone(ratelimit.parse_reset_ms(None))
+
+@override_settings(OPENAI_MAX_CONCURRENCY=1, OPENAI_SLOT_LEASE_SECONDS=60, OPENAI_SLOT_TIMEOUT_SECONDS=0)
+class OpenAISlotTests(FakeRedisMixin, SimpleTestCase):
+    def test_limits_concurrent_slots(self):
+        with ratelimit.openai_slot():
+            self.assertEqual(self.redis.zcard(ratelimit.SLOTS_KEY), 1)
+            with self.assertRaises(ratelimit.OpenAIBudgetExhausted):
+                with ratelimit.openai_slot():
+                    pass
+        self.assertEqual(self.redis.zcard(ratelimit.SLOTS_KEY), 0)
+
+    def test_slot_is_released_when_the_call_fails(self):
+        with self.assertRaises(ValueError):
+            with ratelimit.openai_slot():
+                raise ValueError("upstream error")
+        self.assertEqual(self.redis.zcard(ratelimit.SLOTS_KEY), 0)
+
+    def test_expired_lease_is_reclaimed(self):
+        self.redis.zadd(ratelimit.SLOTS_KEY, {"crashed-worker": 0})
+        with ratelimit.openai_slot():
+            self.assertNotIn("crashed-worker", self.redis.zrange(ratelimit.SLOTS_KEY, 0, -1))
+
+    def test_pause_blocks_new_slots(self):
+        ratelimit.pause_openai(60_000)
+        with self.assertRaises(ratelimit.OpenAIBudgetExhausted):
+            with ratelimit.openai_slot():
+                pass
+
+    def test_pause_only_moves_forward(self):
+        ratelimit.pause_openai(60_000)
+        deadline = int(self.redis.get(ratelimit.PAUSE_KEY))
+        ratelimit.pause_openai(10)
+        self.assertEqual(int(self.redis.get(ratelimit.PAUSE_KEY)), deadline)
+
+    def test_rate_limit_headers_pause_on_exhausted_budget(self):
+        ratelimit.record_rate_limit_headers({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+        remaining = int(self.redis.get(ratelimit.PAUSE_KEY)) - ratelimit._now_ms()
+        self.assertTrue(0 < remaining <= 2000)
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.test import SimpleTestCase, TransactionTestCase
+
+from assistant import analyzer, metrics, replay, session_cache
+from assistant.export import export_queryset
+from assistant.models import Conversation, VehicleInterest
+from assistant.tests.redis_fixtures import FakeRedisMixin
+from voice_assistant.celery import app
+
+TRANSCRIPT = [
+    {"role": "assistant", "content": "Hi! What are you looking for?"},
+    {"role": "user", "content": "My name is Ravi, I want a Thar or XUV700 for family trips"},
+    {"role": "assistant", "content": "Great choices. What budget?"},
+    {"role": "user", "content": "Around 18 lakh, and I want to book a test drive"},
+]
+
+class FakeLLMTests(SimpleTestCase):
+    def test_extracts_schema_fields(self):
+        customer = [{"role": "user", "content": "Customer: I want an XUV700 under 15 lakh for city commute with sunroof"}]
+        result, usage = replay.fake_llm(customer, None, "analyze_customer_preferences", "m", 0.2)
+        self.assertEqual(result["vehicle_interest"], ["XUV700"])
+        self.assertEqual(result["budget"], "15 lakh")
+        self.assertEqual(result["usage"], "city")
+        self.assertEqual(result["priority_features"], ["sunroof"])
+        self.assertGreater(usage["prompt_tokens"], 0)
+
+    def test_diff_extractions(self):
+        baseline = {"a": {"preferences": {"budget": "10 lakh"}, "summary": {}, "vehicle_interests": ["Thar"]}}
+        current = {
+            "a": {"preferences": {"budget": "12 lakh"}, "summary": {}, "vehicle_interests": ["Thar"]},
+            "b": {"preferences": {}, "summary": {}, "vehicle_interests": []},
+        }
+        self.assertEqual(replay.diff_extractions(baseline, current), {
+            "a": ["preferences.budget: '10 lakh' -> '12 lakh'"],
+            "b": ["not in baseline"],
+        })
+
+class ReplayEnvironmentTests(SimpleTestCase):
+    def _state(self):
+        return (
+            getattr(settings, "ANALYZER_LLM_BACKEND", ""), metrics.FLUSH_ENABLED, session_cache.INVALIDATION_CHANNEL,
+            app.conf.task_always_eager, analyzer.ANALYSIS_MESSAGE_BATCH_SIZE, replay.FAKE_LLM_LATENCY_SECONDS,
+        )
+
+    def test_overrides_and_restores_process_state(self):
+        before = self._state()
+        with replay.replay_environment("assistant.replay.fake_llm", analysis_batch_size=7, llm_latency_ms=5):
+            self.assertEqual(self._state(), (
+                "assistant.replay.fake_llm", False, replay.REPLAY_INVALIDATION_CHANNEL, True, 7, 0.005,
+            ))
+        self.assertEqual(self._state(), before)
+
+    def test_restores_after_an_error(self):
+        before = self._state()
+        with self.assertRaises(RuntimeError):
+            with replay.replay_environment("assistant.replay.fake_llm", analysis_batch_size=7):
+                raise RuntimeError("replay failed")
+        self.assertEqual(self._state(), before)
+
+# Analysis is queued with transaction.on_commit, so these need real commits
+class ReplayRunTests(FakeRedisMixin, TransactionTestCase):
+    options = {"llm_backend": "assistant.replay.fake_llm"}
+
+    def test_replays_through_the_pipeline_and_cleans_up(self):
+        result = replay.replay_task((("src1", TRANSCRIPT, "run1", 1, False), self.options))
+        self.assertNotIn("error", result)
+        self.assertEqual(result["pipeline_errors"], [])
+        self.assertEqual(result["messages"], 4)
+        self.assertEqual(result["extraction"]["vehicle_interests"], ["Thar", "XUV700"])
+        self.assertEqual(result["extraction"]["summary"]["customer_name"], "Ravi")
+        self.assertFalse(Conversation.objects.filter(session_id__startswith=replay.REPLAY_PREFIX).exists())
+
+    def test_kept_replay_rows_stay_out_of_exports_and_listings(self):
+        replay.replay_task((("src1", TRANSCRIPT, "run2", 2, True), self.options))
+        self.assertTrue(VehicleInterest.objects.filter(conversation__session_id__startswith=replay.REPLAY_PREFIX).exists())
+        self.assertEqual(list(export_queryset()), [])
+        self.assertEqual(self.client.get("/api/vehicle-interests/").json()["vehicle_interests"], [])
+        self.assertEqual(replay.cleanup("run2"), 5)
+
+    def test_replay_counts_stay_local(self):
+        with replay.replay_environment(**self.options):
+            metrics.incr("replay.test")
+            metrics.flush()
+        self.assertIsNone(self.redis.hget(metrics.COUNTERS_KEY, "replay.test"))
@@ -0,0 +1,86 @@
+from datetime import datetime
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from assistant import retention
+from assistant.models import Conversation, UserPreference, VehicleInterest
+from assistant.retention import REDACTED, apply_retention, redact_text
+
+class RedactionTests(SimpleTestCase):
+    def test_redacts_contact_details(self):
+        cases = {
+            "call me on 98765 43210": f"call me on {REDACTED}",
+            "+91-98765-43210 please": f"{REDACTED} please",
+            "(022) 2345 6789": REDACTED,
+            "call (+91) 98765 43210": f"call {REDACTED}",
+            "+44 20 7946 0958": REDACTED,
+            "my number is 9876543210.": f"my number is {REDACTED}.",
+            "mail ravi.k@example.co.in": f"mail {REDACTED}",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(redact_text(text), expected)
+
+    def test_keeps_dates_prices_and_ids(self):
+        for text in (
+            "visit on 2024-05-01", "2024-05-01 10:30:00 booked", "on 01/05/2024 at 10", "budget 10-15 lakh",
+            "between 2019-2024", "price 1,250,000", "order ORD-12345678", "order #1234567890", "invoice 2024/05/0001",
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(redact_text(text), text)
+
+    def test_redacts_introduced_and_known_names(self):
+        self.assertEqual(redact_text("Hi, my name is Ravi Kumar"), f"Hi, my name is {REDACTED}")
+        self.assertEqual(redact_text("Thanks ravi, see you", names=["Ravi"]), f"Thanks {REDACTED}, see you")
+
+class ApplyRetentionTests(TestCase):
+    cutoff = datetime(2024, 1, 1)
+
+    def _conversation(self, session_id, started_at=datetime(2023, 6, 1)):
+        conv = Conversation.objects.create(
+            session_id=session_id, user_id="u1", started_at=started_at,
+            messages_json=[{"role": "user", "content": "I'm Ravi, call 9876543210 after 2023-06-02"}],
+            summary_data={"customer_name": "Ravi", "contact_info": "9876543210", "summary": "Ravi wants a Thar"},
+        )
+        UserPreference.objects.create(conversation=conv, data={"type": "usage", "value": "Ravi drives to work"})
+        VehicleInterest.objects.create(conversation=conv, vehicle_name="Thar")
+        return conv
+
+    def test_anonymize_redacts_transcript_summary_and_preferences(self):
+        conv = self._conversation("old")
+        recent = self._conversation("recent", started_at=datetime(2024, 6, 1))
+        report = apply_retention("anonymize", self.cutoff, pause_seconds=0)
+
+        conv.refresh_from_db()
+        self.assertEqual(report.conversations, 1)
+        self.assertEqual(conv.messages_json[0]["content"], f"I'm {REDACTED}, call {REDACTED} after 2023-06-02")
+        self.assertEqual(conv.summary_data["summary"], f"{REDACTED} wants a Thar")
+        self.assertIsNone(conv.summary_data["customer_name"])
+        self.assertIsNone(conv.user_id)
+        self.assertIsNotNone(conv.anonymized_at)
+        self.assertEqual(conv.preferences.get().data["value"], f"{REDACTED} drives to work")
+        recent.refresh_from_db()
+        self.assertIsNone(recent.anonymized_at)
+
+    def test_stopped_run_resumes_where_it_left_off(self):
+        for i in range(5):
+            self._conversation(f"old-{i}")
+        first = apply_retention("anonymize", self.cutoff, chunk_size=2, pause_seconds=0, max_seconds=1e-9)
+        self.assertEqual((first.conversations, first.chunks, first.finished), (2, 1, False))
+        self.assertEqual(retention.pending_queryset("anonymize", self.cutoff).count(), 3)
+
+        second = apply_retention("anonymize", self.cutoff, chunk_size=2, pause_seconds=0)
+        self.assertEqual((second.conversations, second.chunks, second.finished), (3, 2, True))
+        self.assertFalse(retention.pending_queryset("anonymize", self.cutoff).exists())
+
+    def test_delete_removes_children_and_invalidates_sessions(self):
+        self._conversation("old")
+        self._conversation("recent", started_at=datetime(2024, 6, 1))
+        with mock.patch("assistant.session_cache.invalidate_many") as invalidate:
+            report = apply_retention("delete", self.cutoff, pause_seconds=0)
+        self.assertEqual((report.conversations, report.related_rows), (1, 2))
+        self.assertEqual(list(invalidate.call_args[0][0]), ["old"])
+        self.assertEqual(list(Conversation.objects.values_list("session_id", flat=True)), ["recent"])
+        self.assertEqual(UserPreference.objects.count(), 1)
+        self.assertEqual(VehicleInterest.objects.count(), 1)
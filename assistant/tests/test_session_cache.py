@@ -0,0 +1,126 @@
+import os
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from assistant import analyzer, metrics, session_cache
+from assistant.models import Conversation
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+def _received(pubsub, count):
+    # get_message() returns None for the skipped subscribe confirmation
+    received = []
+    for _ in range(count + 1):
+        message = pubsub.get_message(timeout=1.0)
+        if message:
+            received.append(message["data"])
+    return received
+
+def _msg(content, role="user"):
+    return {"role": role, "content": content, "timestamp": "2024-05-01T10:00:00"}
+
+@override_settings(SESSION_CACHE_ENABLED=True, SESSION_CACHE_TTL_SECONDS=300, SESSION_CACHE_MAX_ENTRIES=100)
+class SessionCacheTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Stand in for a subscribed listener without starting its thread
+        for patcher in (
+            mock.patch.object(session_cache, "_enabled", return_value=True),
+            mock.patch.object(session_cache, "_origin", "this-process"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        session_cache._entries.clear()
+        self.addCleanup(session_cache._entries.clear)
+        msgs = [_msg("hi"), _msg("hello", "assistant")]
+        self.conv = Conversation.objects.create(
+            session_id="s1", messages_json=msgs, total_messages=2, analyzed_message_count=2
+        )
+        session_cache.put(session_cache.state_from(self.conv, preferences={}))
+
+    def _bypass_write(self, *msgs):
+        # A write from another process that has not reached this one's cache yet
+        conv = Conversation.objects.get(pk=self.conv.pk)
+        combined = conv.messages_json + list(msgs)
+        Conversation.objects.filter(pk=conv.pk).update(messages_json=combined, total_messages=len(combined))
+
+    def _delta(self, name, before):
+        return metrics.local_value(name) - before
+
+    def test_verified_load_detects_a_stale_transcript(self):
+        stale = metrics.local_value("session_cache.stale")
+        self._bypass_write(_msg("from another worker"))
+        self.assertEqual(session_cache.load("s1").total_messages, 2)
+        state = session_cache.load("s1", verify=True)
+        self.assertEqual(state.total_messages, 3)
+        self.assertEqual(state.messages[-1]["content"], "from another worker")
+        self.assertEqual(self._delta("session_cache.stale", stale), 1)
+        # The fresh row replaced the stale entry
+        self.assertEqual(session_cache.get("s1").total_messages, 3)
+
+    def test_verified_load_refreshes_the_small_columns(self):
+        Conversation.objects.filter(pk=self.conv.pk).update(analyzed_message_count=0, summary_message_count=2)
+        state = session_cache.load("s1", verify=True)
+        self.assertEqual((state.analyzed_message_count, state.summary_message_count), (0, 2))
+        self.assertEqual(len(state.messages), 2)
+
+    def test_invalidation_from_another_process_drops_the_entry(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(session_cache.INVALIDATION_CHANNEL)
+        session_cache.put(session_cache.get("s1"), written=True)
+        self.assertEqual(_received(pubsub, 1), ["this-process:s1"])
+
+        # Our own message is ignored; the same message from elsewhere evicts
+        session_cache._on_invalidation("this-process:s1")
+        self.assertIsNotNone(session_cache.get("s1"))
+        session_cache._on_invalidation("other-process:s1")
+        self.assertIsNone(session_cache.get("s1"))
+
+    def test_invalidate_many_publishes_every_session(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(session_cache.INVALIDATION_CHANNEL)
+        session_cache.invalidate_many(["s1", "s2"])
+        self.assertIsNone(session_cache.get("s1"))
+        self.assertEqual(_received(pubsub, 2), ["this-process:s1", "this-process:s2"])
+
+    def test_cached_append_writes_through(self):
+        with mock.patch.object(analyzer, "_enqueue_analysis"), self.captureOnCommitCallbacks(execute=True):
+            result = analyzer.save_message_batch([{"session_id": "s1", **_msg("price?")}])
+        self.assertEqual(result["sessions"]["s1"]["total_messages"], 3)
+        self.assertEqual(Conversation.objects.get(pk=self.conv.pk).total_messages, 3)
+        self.assertEqual(session_cache.get("s1").messages[-1]["content"], "price?")
+
+    def test_cached_append_never_overwrites_a_concurrent_write(self):
+        conflicts = metrics.local_value("session_cache.conflict")
+        self._bypass_write(_msg("from another worker"))
+        with mock.patch.object(analyzer, "_enqueue_analysis"), self.captureOnCommitCallbacks(execute=True):
+            result = analyzer.save_message_batch([{"session_id": "s1", **_msg("price?")}])
+        self.assertEqual(self._delta("session_cache.conflict", conflicts), 1)
+        self.assertEqual(result["sessions"]["s1"]["total_messages"], 4)
+        contents = [m["content"] for m in Conversation.objects.get(pk=self.conv.pk).messages_json]
+        self.assertEqual(contents, ["hi", "hello", "from another worker", "price?"])
+        # Re-cached from the row that was actually written
+        self.assertEqual(session_cache.get("s1").total_messages, 4)
+
+@unittest.skipUnless(hasattr(os, "fork"), "os.fork is not available")
+class ForkTests(SimpleTestCase):
+    def test_child_starts_with_an_empty_cache_and_fresh_lock(self):
+        state = session_cache.SessionState(1, "s1", [], 0, 0, "v1")
+        with session_cache._lock:
+            session_cache._entries["s1"] = state
+            # Fork while the lock is held, as a thread in the parent might
+            pid = os.fork()
+            if pid == 0:
+                ok = (
+                    not session_cache._entries
+                    and session_cache._listener_pid is None
+                    and not session_cache._subscribed.is_set()
+                    and session_cache._lock.acquire(timeout=1)
+                )
+                os._exit(0 if ok else 1)
+        try:
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        finally:
+            session_cache._entries.pop("s1", None)
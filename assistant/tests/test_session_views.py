@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from assistant import capacity
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+@override_settings(REALTIME_SESSION_CAPACITY=1, REALTIME_SESSION_LEASE_SECONDS=60, REALTIME_QUEUE_TTL_SECONDS=30)
+class SessionLeaseViewTests(FakeRedisMixin, TestCase):
+    def test_session_id_is_required(self):
+        response = self.client.post("/api/session")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.redis.zcard(capacity.ACTIVE_KEY), 0)
+
+    def test_failed_session_creation_releases_the_slot(self):
+        with mock.patch("assistant.prompts.PromptRegistry.select", side_effect=RuntimeError("bad manifest")):
+            response = self.client.post("/api/session?session_id=s1")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.redis.zcard(capacity.ACTIVE_KEY), 0)
+
+    def test_full_capacity_queues_the_caller(self):
+        capacity.acquire("other")
+        response = self.client.post("/api/session?session_id=s1")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()["position"], 1)
+        self.assertIn("Retry-After", response)
+
+    def test_heartbeat_renews_a_live_lease(self):
+        capacity.acquire("s1")
+        response = self.client.post("/api/session/heartbeat", {"session_id": "s1"}, content_type="application/json")
+        self.assertEqual(response.json()["status"], "ok")
+
+    def test_expired_heartbeat_with_a_queue_ends_the_session(self):
+        capacity.acquire("s1")
+        capacity.acquire("waiting")
+        self.redis.zadd(capacity.ACTIVE_KEY, {"s1": 0})
+        response = self.client.post("/api/session/heartbeat", {"session_id": "s1"}, content_type="application/json")
+        self.assertEqual(response.status_code, 410)
+        self.assertIsNone(self.redis.zscore(capacity.QUEUE_KEY, "s1"))
+        self.assertTrue(capacity.acquire("waiting").admitted)
+
+    def test_expired_heartbeat_without_a_queue_reacquires(self):
+        capacity.acquire("s1")
+        self.redis.zadd(capacity.ACTIVE_KEY, {"s1": 0})
+        response = self.client.post("/api/session/heartbeat", {"session_id": "s1"}, content_type="application/json")
+        self.assertEqual(response.json()["status"], "reacquired")
+
+    def test_release(self):
+        capacity.acquire("s1")
+        response = self.client.post("/api/session/release", {"session_id": "s1"}, content_type="application/json")
+        self.assertEqual(response.json()["status"], "released")
+        self.assertEqual(self.redis.zcard(capacity.ACTIVE_KEY), 0)
@@ -0,0 +1,132 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from assistant import analyzer, metrics
+from assistant.analyzer import generate_summary_task
+from assistant.models import Conversation
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+MESSAGES = [
+    {"role": "user", "content": "I want a family SUV", "timestamp": "2024-05-01T10:00:00"},
+    {"role": "assistant", "content": "The XUV700 seats seven.", "timestamp": "2024-05-01T10:00:05"},
+]
+SUMMARY = {"summary": "Looking for a family SUV.", "purchase_intent": "high", "engagement_score": 7}
+
+@override_settings(SESSION_CACHE_ENABLED=False, SUMMARY_INFLIGHT_TTL_SECONDS=60)
+class GenerateSummaryViewTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.conv = Conversation.objects.create(
+            session_id="s1", messages_json=MESSAGES, total_messages=len(MESSAGES),
+            summary_data=SUMMARY, summary_generated_at=timezone.now(),
+            summary_transcript_digest=analyzer.transcript_digest(MESSAGES), summary_message_count=len(MESSAGES),
+        )
+        patcher = mock.patch.object(generate_summary_task, "apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self, query="", **body):
+        response = self.client.post(
+            f"/api/generate-summary{query}", json.dumps({"session_id": "s1", **body}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def _append(self, content):
+        msgs = self.conv.messages_json + [{"role": "user", "content": content, "timestamp": "2024-05-01T10:01:00"}]
+        Conversation.objects.filter(pk=self.conv.pk).update(messages_json=msgs, total_messages=len(msgs))
+
+    def test_unchanged_transcript_reuses_the_stored_summary(self):
+        hits = metrics.local_value("summary.reuse.hit")
+        data = self._post()
+        self.assertTrue(data["reused"])
+        self.assertEqual(data["summary"]["text"], SUMMARY["summary"])
+        self.assertEqual(data["summary"]["purchase_intent"], "high")
+        self.assertIsNotNone(data["summary"]["generated_at"])
+        self.apply_async.assert_not_called()
+        self.assertEqual(metrics.local_value("summary.reuse.hit") - hits, 1)
+
+    def test_new_message_queues_a_fresh_summary(self):
+        self._append("What about mileage?")
+        data = self._post()
+        self.assertNotIn("reused", data)
+        self.assertEqual(data["status"], "processing")
+        self.assertFalse(data["deduplicated"])
+        self.apply_async.assert_called_once_with(args=["s1"], kwargs={"force": False}, task_id=data["task_id"])
+
+    def test_digest_mismatch_with_the_same_message_count(self):
+        # Same count, different transcript: the count check passes and the digest catches it
+        edited = [MESSAGES[0], {**MESSAGES[1], "content": "The Scorpio-N seats seven."}]
+        Conversation.objects.filter(pk=self.conv.pk).update(messages_json=edited)
+        self.assertEqual(self._post()["status"], "processing")
+        self.apply_async.assert_called_once()
+
+    def test_missing_stored_summary_is_not_reused(self):
+        Conversation.objects.filter(pk=self.conv.pk).update(summary_data={})
+        self.assertEqual(self._post()["status"], "processing")
+
+    def test_force_regenerates_an_unchanged_transcript(self):
+        for query, body in (("?force=true", {}), ("", {"force": True})):
+            with self.subTest(query=query, body=body):
+                self.apply_async.reset_mock()
+                self.redis.flushall()
+                data = self._post(query, **body)
+                self.assertEqual(data["status"], "processing")
+                self.assertNotIn("reused", data)
+                self.apply_async.assert_called_once_with(args=["s1"], kwargs={"force": True}, task_id=data["task_id"])
+
+    def test_repeat_request_joins_the_in_flight_summary(self):
+        self._append("What about mileage?")
+        first = self._post()
+        second = self._post()
+        self.assertTrue(second["deduplicated"])
+        self.assertEqual(second["task_id"], first["task_id"])
+        self.assertEqual(self.apply_async.call_count, 1)
+
+    def test_force_bypasses_the_in_flight_summary(self):
+        self._append("What about mileage?")
+        first = self._post()
+        forced = self._post("?force=true")
+        self.assertFalse(forced["deduplicated"])
+        self.assertNotEqual(forced["task_id"], first["task_id"])
+        self.assertEqual(self.apply_async.call_count, 2)
+        # Later requests join the forced task, and the first task's release leaves it alone
+        self.assertEqual(self._post()["task_id"], forced["task_id"])
+        analyzer.release_inflight(analyzer.SUMMARY_INFLIGHT_KEY.format("s1"), first["task_id"])
+        self.assertEqual(self._post()["task_id"], forced["task_id"])
+
+@override_settings(SESSION_CACHE_ENABLED=False, LLM_OUTPUT_REPAIR_ATTEMPTS=0)
+class GenerateSummaryTaskTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        Conversation.objects.create(session_id="s1", messages_json=MESSAGES, total_messages=len(MESSAGES))
+        self.backend = mock.Mock(return_value=(
+            {**SUMMARY, "customer_name": None, "contact_info": None, "budget_range": None, "vehicle_type": "SUV",
+             "use_case": "family", "priority_features": [], "recommended_vehicles": ["XUV700"], "next_actions": [],
+             "sentiment": "positive"},
+            {},
+        ))
+        patcher = mock.patch.object(analyzer, "get_llm_backend", return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_summary_records_its_transcript_and_is_reused(self):
+        analyzer.generate_conversation_summary("s1")
+        conv = Conversation.objects.get(session_id="s1")
+        self.assertEqual(conv.summary_transcript_digest, analyzer.transcript_digest(MESSAGES))
+        self.assertEqual(conv.summary_message_count, 2)
+
+        self.assertEqual(analyzer.generate_conversation_summary("s1")["summary"], SUMMARY["summary"])
+        self.assertEqual(self.backend.call_count, 1)
+        analyzer.generate_conversation_summary("s1", force=True)
+        self.assertEqual(self.backend.call_count, 2)
+
+    def test_failed_summary_records_no_digest(self):
+        self.backend.return_value = (None, {})
+        analyzer.generate_conversation_summary("s1")
+        self.assertEqual(Conversation.objects.get(session_id="s1").summary_transcript_digest, "")
+        analyzer.generate_conversation_summary("s1")
+        self.assertEqual(self.backend.call_count, 2)
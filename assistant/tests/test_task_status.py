@@ -0,0 +1,118 @@
+import json
+from unittest import mock
+
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
+from django.test import SimpleTestCase, override_settings
+
+from assistant import analyzer, task_status
+from assistant.analyzer import analyze_conversation_task, generate_summary_task
+from assistant.tasks import schedule_email
+from assistant.tests.redis_fixtures import FakeRedisMixin
+
+class InflightTests(FakeRedisMixin, SimpleTestCase):
+    key = "summary:inflight:s1"
+
+    def test_first_claim_wins_and_later_claims_see_the_holder(self):
+        self.assertIsNone(task_status.claim_inflight(self.key, "t1", 60))
+        self.assertEqual(task_status.claim_inflight(self.key, "t2", 60), "t1")
+        self.assertEqual(self.redis.get(self.key), "t1")
+        self.assertGreater(self.redis.ttl(self.key), 0)
+
+    def test_only_the_holder_releases(self):
+        task_status.claim_inflight(self.key, "t1", 60)
+        task_status.release_inflight(self.key, "t2")
+        self.assertEqual(self.redis.get(self.key), "t1")
+        task_status.release_inflight(self.key, "t1")
+        self.assertIsNone(task_status.claim_inflight(self.key, "t3", 60))
+
+    def test_hand_over_survives_the_previous_holders_release(self):
+        task_status.claim_inflight(self.key, "t1", 60)
+        task_status.take_inflight(self.key, "t2", 60)
+        task_status.release_inflight(self.key, "t1")
+        self.assertEqual(self.redis.get(self.key), "t2")
+
+    def test_claims_fail_open_without_redis(self):
+        broken = mock.Mock()
+        broken.eval.side_effect = ConnectionError("down")
+        with mock.patch.object(task_status, "get_redis", return_value=broken), self.assertLogs(task_status.logger, "WARNING"):
+            self.assertIsNone(task_status.claim_inflight(self.key, "t1", 60))
+
+@override_settings(SUMMARY_INFLIGHT_TTL_SECONDS=60)
+class EnqueueSummaryTests(FakeRedisMixin, SimpleTestCase):
+    def test_repeat_request_joins_the_running_task(self):
+        with mock.patch.object(generate_summary_task, "apply_async") as apply_async:
+            task_id, deduplicated = analyzer.enqueue_summary("s1")
+            again, joined = analyzer.enqueue_summary("s1")
+        self.assertFalse(deduplicated)
+        self.assertEqual((again, joined), (task_id, True))
+        apply_async.assert_called_once_with(args=["s1"], kwargs={"force": False}, task_id=task_id)
+
+    def test_finished_task_frees_the_session(self):
+        with mock.patch.object(generate_summary_task, "apply_async"):
+            first, _ = analyzer.enqueue_summary("s1")
+            task_status.release_inflight(analyzer.SUMMARY_INFLIGHT_KEY.format("s1"), first)
+            second, deduplicated = analyzer.enqueue_summary("s1")
+        self.assertNotEqual(first, second)
+        self.assertFalse(deduplicated)
+
+    def test_failed_publish_releases_the_claim(self):
+        with mock.patch.object(generate_summary_task, "apply_async", side_effect=ConnectionError("broker down")):
+            with self.assertRaises(ConnectionError):
+                analyzer.enqueue_summary("s1")
+        self.assertIsNone(self.redis.get(analyzer.SUMMARY_INFLIGHT_KEY.format("s1")))
+
+@override_settings(TASK_STATUS_TTL_SECONDS=600)
+class StatusRecordTests(FakeRedisMixin, SimpleTestCase):
+    def _publish(self, task, task_id, args="('s1',)"):
+        before_task_publish.send(sender=task.name, headers={"id": task_id, "argsrepr": args})
+
+    def test_success_lifecycle(self):
+        self._publish(generate_summary_task, "t1")
+        status = task_status.get_status("t1")
+        self.assertEqual((status["state"], status["name"], status["args"]), ("queued", generate_summary_task.name, "('s1',)"))
+        self.assertGreater(self.redis.ttl(task_status.STATUS_KEY.format("t1")), 0)
+
+        task_prerun.send(sender=generate_summary_task, task_id="t1", task=generate_summary_task)
+        self.assertEqual(task_status.get_status("t1")["state"], "running")
+
+        result = {"status": "success", "session_id": "s1"}
+        task_postrun.send(sender=generate_summary_task, task_id="t1", task=generate_summary_task, retval=result, state="SUCCESS")
+        status = task_status.get_status("t1")
+        self.assertEqual(status["state"], "success")
+        self.assertEqual(status["result"], result)
+        self.assertIsInstance(status["runtime_ms"], int)
+        self.assertTrue({"queued_at", "started_at", "finished_at"} <= status.keys())
+
+    def test_failure_records_the_error(self):
+        task_prerun.send(sender=analyze_conversation_task, task_id="t2", task=analyze_conversation_task)
+        task_failure.send(sender=analyze_conversation_task, task_id="t2", exception=ValueError("x" * 1000))
+        task_postrun.send(sender=analyze_conversation_task, task_id="t2", task=analyze_conversation_task, retval=None, state="FAILURE")
+        status = task_status.get_status("t2")
+        self.assertEqual(status["state"], "failure")
+        self.assertEqual(len(status["error"]), task_status.MAX_ERROR_CHARS)
+        self.assertTrue(status["error"].startswith("ValueError: x"))
+
+    def test_large_results_are_not_copied(self):
+        task_postrun.send(sender=generate_summary_task, task_id="t3", task=generate_summary_task,
+                          retval={"blob": "x" * 2000}, state="SUCCESS")
+        self.assertNotIn("result", task_status.get_status("t3"))
+
+    def test_untracked_tasks_write_nothing(self):
+        self._publish(schedule_email, "beat", args="()")
+        task_prerun.send(sender=schedule_email, task_id="beat", task=schedule_email)
+        task_postrun.send(sender=schedule_email, task_id="beat", task=schedule_email, retval=None, state="SUCCESS")
+        task_failure.send(sender=schedule_email, task_id="beat", exception=RuntimeError("x"))
+        self.assertEqual(self.redis.keys("task:status:*"), [])
+
+    def test_status_endpoint(self):
+        self._publish(generate_summary_task, "t4")
+        response = self.client.get("/api/tasks/t4")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["state"], "queued")
+        self.assertEqual(self.client.get("/api/tasks/missing").status_code, 404)
+
+class ResultStorageTests(SimpleTestCase):
+    def test_only_the_summary_task_keeps_its_result(self):
+        self.assertFalse(generate_summary_task.ignore_result)
+        self.assertTrue(analyze_conversation_task.ignore_result)
+        self.assertTrue(schedule_email.ignore_result)
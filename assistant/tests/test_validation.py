@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from assistant import analyzer, metrics, validation
+
+ANALYSIS = "analyze_customer_preferences"
+SUMMARY = "summarize_sales_conversation"
+
+def _summary(**fields):
+    return {
+        "summary": "Asked about the XUV700.", "customer_name": None, "contact_info": None,
+        "budget_range": "15-20 lakh", "vehicle_type": "SUV", "use_case": "family",
+        "priority_features": ["safety"], "recommended_vehicles": ["XUV700"], "next_actions": [],
+        "sentiment": "positive", "engagement_score": 7, "purchase_intent": "high", **fields,
+    }
+
+class ValidatorTests(SimpleTestCase):
+    def setUp(self):
+        self.summary = validation.get_validator(SUMMARY)
+        self.analysis = validation.get_validator(ANALYSIS)
+
+    def test_unknown_function_has_no_validator(self):
+        self.assertIsNone(validation.get_validator("nope"))
+        self.assertIsNone(validation.get_validator(None))
+
+    def test_clean_output_passes_untouched(self):
+        checked = self.summary.validate(_summary())
+        self.assertTrue(checked.ok)
+        self.assertEqual(checked.coerced, 0)
+        self.assertEqual(checked.value.as_dict(), _summary())
+
+    def test_near_misses_are_coerced(self):
+        checked = self.summary.validate(_summary(
+            engagement_score="8/10", purchase_intent="High", sentiment=" neutral ",
+            customer_name="N/A", priority_features="mileage",
+        ))
+        self.assertTrue(checked.ok)
+        self.assertEqual(checked.coerced, 5)
+        value = checked.value
+        self.assertEqual(
+            (value.engagement_score, value.purchase_intent, value.sentiment, value.customer_name, value.priority_features),
+            (8, "high", "neutral", None, ["mileage"]),
+        )
+
+    def test_scores_are_clamped_to_the_schema_range(self):
+        self.assertEqual(self.summary.validate(_summary(engagement_score=42)).value.engagement_score, 10)
+        self.assertEqual(self.summary.validate(_summary(engagement_score="0")).value.engagement_score, 1)
+
+    def test_missing_arrays_default_and_nullable_fields_default_to_none(self):
+        checked = self.analysis.validate({"budget": "10 lakh"})
+        self.assertTrue(checked.ok)
+        self.assertEqual(checked.value.as_dict(), {
+            "budget": "10 lakh", "usage": None, "priority_features": [], "vehicle_interest": [], "other_insights": None,
+        })
+
+    def test_invalid_output_reports_every_error(self):
+        data = _summary(purchase_intent="maybe", engagement_score="lots", sentiment=True)
+        del data["summary"]
+        checked = self.summary.validate(data)
+        self.assertFalse(checked.ok)
+        self.assertEqual(len(checked.errors), 4)
+        self.assertIn("summary: missing", checked.errors)
+        self.assertTrue(any(e.startswith("purchase_intent: 'maybe' is not one of") for e in checked.errors))
+
+    def test_non_object_output_is_invalid(self):
+        checked = self.analysis.validate(["XUV700"])
+        self.assertFalse(checked.ok)
+        self.assertIn("expected a JSON object", checked.errors[0])
+
+    def test_result_objects_have_fixed_slots(self):
+        value = self.analysis.validate({}).value
+        self.assertFalse(hasattr(value, "__dict__"))
+        with self.assertRaises(AttributeError):
+            value.extra = 1
+
+class _ScriptedBackend:
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.calls = []
+
+    def __call__(self, messages, functions, function_name, model, temperature):
+        self.calls.append(messages)
+        return self.outputs.pop(0), {"prompt_tokens": 10, "completion_tokens": 5}
+
+@override_settings(LLM_OUTPUT_REPAIR_ATTEMPTS=1)
+class RepairLoopTests(SimpleTestCase):
+    def _call(self, backend, function_name=ANALYSIS):
+        names = ("checked", "coerced", "invalid", "repaired", "failed")
+        before = {n: metrics.local_value(f"validation.{function_name}.{n}") for n in names}
+        with mock.patch.object(analyzer, "get_llm_backend", return_value=backend):
+            result = analyzer._call_openai([{"role": "user", "content": "hi"}], function_name=function_name)
+        counts = {n: metrics.local_value(f"validation.{function_name}.{n}") - before[n] for n in names}
+        return result, counts
+
+    def test_coerced_output_is_returned_without_a_retry(self):
+        backend = _ScriptedBackend({"budget": "10 lakh", "vehicle_interest": "Thar"})
+        result, counts = self._call(backend)
+        self.assertEqual(result["vehicle_interest"], ["Thar"])
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(counts, {"checked": 1, "coerced": 1, "invalid": 0, "repaired": 0, "failed": 0})
+
+    def test_invalid_output_is_repaired(self):
+        backend = _ScriptedBackend(_summary(purchase_intent="maybe"), _summary())
+        result, counts = self._call(backend, SUMMARY)
+        self.assertEqual(result, _summary())
+        self.assertEqual(counts, {"checked": 2, "coerced": 0, "invalid": 1, "repaired": 1, "failed": 0})
+        # The retry shows the model its own output and the errors
+        repair = backend.calls[1]
+        self.assertEqual(repair[1]["role"], "assistant")
+        self.assertIn('"purchase_intent": "maybe"', repair[1]["content"])
+        self.assertIn("purchase_intent: 'maybe' is not one of", repair[2]["content"])
+
+    def test_gives_up_after_the_repair_attempts(self):
+        backend = _ScriptedBackend("not json", ["still", "not"])
+        result, counts = self._call(backend)
+        self.assertIsNone(result)
+        self.assertEqual(len(backend.calls), 2)
+        self.assertEqual(counts, {"checked": 2, "coerced": 0, "invalid": 2, "repaired": 0, "failed": 1})
+
+    def test_failed_call_is_not_repaired(self):
+        backend = _ScriptedBackend(None)
+        result, counts = self._call(backend)
+        self.assertIsNone(result)
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(counts["checked"], 0)
+
+    def test_no_validator_passes_output_through(self):
+        backend = _ScriptedBackend({"anything": 1})
+        with mock.patch.object(analyzer, "get_llm_backend", return_value=backend):
+            self.assertEqual(analyzer._call_openai([], function_name=None), {"anything": 1})
@@ -3,10 +3,16 @@ from . import views
 
 urlpatterns = [
     path('', views.read_root),
+    path('assets/<path:name>', views.serve_asset, name='serve_asset'),
     path('api/session', views.create_realtime_session, name='create_realtime_session'),
+    path('api/session/heartbeat', views.session_heartbeat, name='session_heartbeat'),
+    path('api/session/release', views.release_session, name='release_session'),
     path('api/conversation', views.save_conversation, name='save_conversation'),
     path('api/conversation/batch', views.save_conversation_batch, name='save_conversation_batch'),
     path('api/generate-summary', views.generate_summary, name='generate_summary'),
+    path('api/tasks/<str:task_id>', views.get_task_status, name='get_task_status'),
     path('api/summary/<str:session_id>/', views.get_summary , name='get_summary'), 
     path('api/vehicle-interests/', views.list_vehicle_interests, name='list_vehicle_interests'),
+    path('api/metrics', views.get_metrics, name='get_metrics'),
+    path('api/export/conversations', views.export_conversations, name='export_conversations'),
 ]
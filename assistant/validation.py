@@ -0,0 +1,185 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from assistant.tools import conversation_analysis_schema, conversation_summary_schema
+
+# --- Tool schemas compiled once into coercing validators with __slots__ result objects ---
+# Covers the JSON Schema subset used in assistant/tools.py: type (incl. ["x", "null"]),
+# enum, minimum/maximum, items, properties and required.
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_NULL_STRINGS = frozenset({"", "null", "none", "n/a", "na", "unknown"})
+_MISSING = object()
+
+class SchemaError(ValueError):
+    pass
+
+class ValidatedOutput:
+    __slots__ = ()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+@dataclass(frozen=True)
+class Validation:
+    value: Optional[ValidatedOutput]
+    errors: Tuple[str, ...] = ()
+    # Fields that only passed after coercion (e.g. "7" -> 7 for an integer)
+    coerced: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.value is not None
+
+Coercer = Callable[[Any, str], Any]
+
+def _string(enum: Optional[List[str]]) -> Coercer:
+    allowed = {str(v).lower(): v for v in enum} if enum else None
+
+    def coerce(value, path):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise SchemaError(f"{path}: expected a string, got {type(value).__name__}")
+        text = value.strip() if isinstance(value, str) else str(value)
+        if allowed is None:
+            return text
+        match = allowed.get(text.lower())
+        if match is None:
+            raise SchemaError(f"{path}: {text!r} is not one of {', '.join(map(str, enum))}")
+        return match
+    return coerce
+
+def _number(cast: type, minimum: Optional[float], maximum: Optional[float]) -> Coercer:
+    def coerce(value, path):
+        if isinstance(value, bool):
+            raise SchemaError(f"{path}: expected a number, got a boolean")
+        if isinstance(value, str):
+            # "7", "7/10", "score: 8" -> first number
+            found = _NUMBER_RE.search(value)
+            if not found:
+                raise SchemaError(f"{path}: expected a number, got {value!r}")
+            value = float(found.group(0))
+        if not isinstance(value, (int, float)):
+            raise SchemaError(f"{path}: expected a number, got {type(value).__name__}")
+        number = cast(round(value)) if cast is int else cast(value)
+        if minimum is not None and number < minimum:
+            number = cast(minimum)
+        if maximum is not None and number > maximum:
+            number = cast(maximum)
+        return number
+    return coerce
+
+def _boolean(value, path):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "yes", "false", "no"):
+        return value.strip().lower() in ("true", "yes")
+    raise SchemaError(f"{path}: expected a boolean, got {value!r}")
+
+def _array(item: Coercer) -> Coercer:
+    def coerce(value, path):
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            # A lone value where a list was expected
+            value = [value]
+        return [item(v, f"{path}[{i}]") for i, v in enumerate(value) if v is not None]
+    return coerce
+
+def _nullable(inner: Coercer) -> Coercer:
+    def coerce(value, path):
+        if value is None or (isinstance(value, str) and value.strip().lower() in _NULL_STRINGS):
+            return None
+        return inner(value, path)
+    return coerce
+
+def _any(value, path):
+    return value
+
+def _compile_property(spec: Dict[str, Any]) -> Tuple[Coercer, Any]:
+    # Returns (coercer, default or default factory for a missing field; _MISSING if that is an error)
+    types = spec.get("type", [])
+    types = [types] if isinstance(types, str) else list(types)
+    nullable = "null" in types
+    kind = next((t for t in types if t != "null"), None)
+
+    if kind == "string":
+        coercer = _string(spec.get("enum"))
+    elif kind in ("integer", "number"):
+        coercer = _number(int if kind == "integer" else float, spec.get("minimum"), spec.get("maximum"))
+    elif kind == "boolean":
+        coercer = _boolean
+    elif kind == "array":
+        coercer = _array(_compile_property(spec.get("items", {}))[0])
+    elif kind == "object":
+        nested = CompiledSchema(spec.get("title", "object"), spec)
+        def coercer(value, path, nested=nested):
+            return nested.coerce(value, path)
+    else:
+        coercer = _any
+
+    if nullable:
+        return _nullable(coercer), None
+    if kind == "array":
+        return coercer, list
+    return coercer, _MISSING
+
+def _class_name(name: str) -> str:
+    return "".join(part.capitalize() for part in re.split(r"[^a-zA-Z0-9]+", name) if part)
+
+class CompiledSchema:
+    __slots__ = ("name", "fields", "result_type")
+
+    def __init__(self, name: str, parameters: Dict[str, Any]):
+        self.name = name
+        required = set(parameters.get("required", []))
+        self.fields = tuple(
+            (key, *_compile_property(spec), key in required)
+            for key, spec in parameters.get("properties", {}).items()
+        )
+        self.result_type = type(_class_name(name), (ValidatedOutput,), {"__slots__": tuple(f[0] for f in self.fields)})
+
+    def coerce(self, data: Any, path: str = "") -> Dict[str, Any]:
+        # Nested objects: raise on the first problem
+        result = self.validate(data, path)
+        if not result.ok:
+            raise SchemaError("; ".join(result.errors))
+        return result.value.as_dict()
+
+    def validate(self, data: Any, path: str = "") -> Validation:
+        if not isinstance(data, dict):
+            return Validation(None, (f"{path or self.name}: expected a JSON object, got {type(data).__name__}",))
+        out = self.result_type()
+        errors = []
+        coerced = 0
+        for key, coercer, default, required in self.fields:
+            field_path = f"{path}.{key}" if path else key
+            value = data.get(key, _MISSING)
+            if value is _MISSING:
+                if default is _MISSING and required:
+                    errors.append(f"{field_path}: missing")
+                    continue
+                setattr(out, key, None if default is _MISSING else default() if callable(default) else default)
+                continue
+            try:
+                clean = coercer(value, field_path)
+            except SchemaError as e:
+                errors.append(str(e))
+                continue
+            if clean != value:
+                coerced += 1
+            setattr(out, key, clean)
+        if errors:
+            return Validation(None, tuple(errors), coerced)
+        return Validation(out, (), coerced)
+
+_VALIDATORS: Dict[str, CompiledSchema] = {
+    schema["name"]: CompiledSchema(schema["name"], schema["parameters"])
+    for schema in (conversation_summary_schema, conversation_analysis_schema)
+}
+
+def get_validator(function_name: Optional[str]) -> Optional[CompiledSchema]:
+    return _VALIDATORS.get(function_name) if function_name else None
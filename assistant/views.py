@@ -1,32 +1,19 @@
-from pathlib import Path
-import os
+import hmac
 import json
 import logging
+from datetime import timedelta
 from typing import Any, Dict, Optional
-import httpx
-from dotenv import load_dotenv
-from django.http import JsonResponse, FileResponse, HttpRequest
+from django.conf import settings
+from django.http import JsonResponse, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 import constants as C
-from assistant.analyzer import save_message, analyze_conversation, generate_summary_task
+from assistant.analyzer import save_message, analyze_conversation, current_summary, enqueue_summary
 from assistant.models import Conversation
-from assistant.serializers import (
-    VehicleInterestSerializer,
-    ConversationShortSerializer,
-    SummarySerializer,
-)
-load_dotenv()
+from assistant import capacity, session_cache
+from assistant.routers import mark_session_written, replica_reads
 logger = logging.getLogger(__name__)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY not set in .env file")
-
-OPENAI_MODEL = os.getenv("OPENAI_REALTIME_MODEL", C.DEFAULT_REALTIME_MODEL)
-OPENAI_VOICE = os.getenv("OPENAI_REALTIME_VOICE", C.DEFAULT_VOICE)
-OPENAI_TRANSCRIBE = os.getenv("TRANSCRIBE_MODEL", C.DEFAULT_TRANSCRIBE_MODEL)
-STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
-
 def _json_response(payload: Dict[str, Any], status: int = 200) -> JsonResponse:
     return JsonResponse(payload, status=status, safe=False)
 
@@ -50,42 +37,112 @@ def _get_session_id(request: HttpRequest) -> Optional[str]:
     return data.get("session_id")
 
 def _openai_headers() -> Dict[str, str]:
-    return {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-        "OpenAI-Beta": C.OPENAI_BETA_HEADER_VALUE,
-    }
-
-def read_root(request: HttpRequest) -> JsonResponse | FileResponse:
-    html_file = STATIC_DIR / "index_new.html"
-    if html_file.exists():
-        return FileResponse(open(html_file, "rb"))
-    return _json_error("HTML not found", 404)
+    # Key is checked per request so a missing key fails /api/session, not every import
+    return C.get_openai_headers()
+
+def _cached_file_response(request: HttpRequest, cached) -> HttpResponse:
+    from django.utils.cache import get_conditional_response, patch_vary_headers
+    from assistant.assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, http_date
+
+    last_modified = http_date(cached.last_modified)
+    cache_control = IMMUTABLE_CACHE_CONTROL if cached.immutable else REVALIDATE_CACHE_CONTROL
+    body, encoding = cached.pick(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    etag = cached.etag_for(encoding)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(cached.last_modified))
+    if not_modified is not None:
+        not_modified["Cache-Control"] = cache_control
+        patch_vary_headers(not_modified, ("Accept-Encoding",))
+        return not_modified
+
+    response = HttpResponse(body, content_type=cached.content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    response["Cache-Control"] = cache_control
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+def read_root(request: HttpRequest) -> HttpResponse:
+    from assistant.assets import get_page
+
+    page = get_page("index_new.html")
+    if page is None:
+        return _json_error("HTML not found", 404)
+    return _cached_file_response(request, page)
+
+def serve_asset(request: HttpRequest, name: str) -> HttpResponse:
+    from assistant.assets import get_asset
+
+    asset = get_asset(name)
+    if asset is None:
+        return _json_error("Asset not found", 404)
+    return _cached_file_response(request, asset)
 
 @csrf_exempt
-def create_realtime_session(request: HttpRequest) -> JsonResponse:
-    payload = C.get_session_payload()
-    payload.update({
-        "model": OPENAI_MODEL,
-        "voice": OPENAI_VOICE,
-        "input_audio_transcription": {"model": OPENAI_TRANSCRIBE},
-    })
-    logger.info("Creating realtime session", extra={"model": OPENAI_MODEL, "voice": OPENAI_VOICE})
+def create_realtime_session(request: HttpRequest) -> HttpResponse:
+    import httpx  # local import keeps module import light
+    from assistant.prompts import get_registry
 
+    session_id = _get_session_id(request)
+    # The session id is the lease id: without it the slot could not be released or renewed
+    if not session_id:
+        return _json_error("session_id required", 400)
+    admission = capacity.acquire(session_id)
+    if not admission.admitted:
+        response = _json_response({
+            "status": "queued",
+            "position": admission.position,
+            "estimated_wait_seconds": admission.estimated_wait_seconds,
+            "retry_after": admission.retry_after_seconds,
+        }, status=429)
+        response["Retry-After"] = str(admission.retry_after_seconds)
+        return response
+
+    # Everything after acquire() sits in the try so a failure gives the slot back
     try:
+        bundle = get_registry().select(session_id)
+        logger.info("Creating realtime session", extra={"model": bundle.payload["model"], "prompt": bundle.label})
         with httpx.Client(timeout=20.0) as client:
-            response = client.post(C.get_realtime_session_url(), headers=_openai_headers(), json=payload)
+            # Pre-serialized bundle payload: no per-request dict building or JSON encoding
+            response = client.post(C.get_realtime_session_url(), headers=_openai_headers(), content=bundle.payload_bytes)
             response.raise_for_status()
-            data = response.json()
-            logger.info("Session created", extra={"session_id": data.get("id")})
-            return _json_response(data)
+        Conversation.objects.update_or_create(session_id=session_id, defaults={"prompt_version": bundle.label})
+        mark_session_written(session_id)
+        session_cache.invalidate(session_id)
+        logger.info("Session created", extra={"session_id": session_id, "prompt": bundle.label})
+        result = HttpResponse(response.content, content_type="application/json")
+        result["X-Prompt-Version"] = bundle.label
+        return result
     except httpx.HTTPStatusError as e:
         logger.error("OpenAI returned non-200 response", exc_info=True)
+        capacity.release(session_id)
         return _json_error(f"Session error: {e.response.text}", status=e.response.status_code)
     except Exception as e:
         logger.exception("Session creation failed")
+        capacity.release(session_id)
         return _json_error(str(e), 500)
 
+@csrf_exempt
+def session_heartbeat(request: HttpRequest) -> JsonResponse:
+    session_id = _get_session_id(request)
+    if not session_id:
+        return _json_error("session_id required", 400)
+    if capacity.heartbeat(session_id):
+        return _json_response({"status": "ok"})
+    # Lease timed out (e.g. a sleeping laptop): take a free slot again if there is one
+    if capacity.acquire(session_id).admitted:
+        return _json_response({"status": "reacquired"})
+    capacity.release(session_id)  # leave the queue acquire() just put us in
+    return _json_response({"status": "expired", "message": "Session lease timed out."}, status=410)
+
+@csrf_exempt
+def release_session(request: HttpRequest) -> JsonResponse:
+    session_id = _get_session_id(request)
+    if not session_id:
+        return _json_error("session_id required", 400)
+    return _json_response({"status": "released" if capacity.release(session_id) else "not_found"})
+
 @csrf_exempt
 def save_conversation(request: HttpRequest) -> JsonResponse:
     data = _parse_body(request)
@@ -139,14 +196,47 @@ def generate_summary(request: HttpRequest) -> JsonResponse:
     if not session_id:
         return _json_error("session_id required", 400)
 
+    # ?force=true (or "force": true in the body) re-summarizes even if the transcript is unchanged
+    force = str(request.GET.get("force") or _parse_body(request).get("force") or "").lower() in ("1", "true", "yes")
     try:
-        task = generate_summary_task.delay(session_id)
-        return _json_response({"status": "processing", "task_id": task.id, "message": "Summary generation started."})
+        summary = None if force else current_summary(session_id)
+        if summary is not None:
+            from assistant.serializers import SummarySerializer
+
+            return _json_response({
+                "status": "success",
+                "reused": True,
+                "summary": SummarySerializer(summary).data,
+                "message": "No new messages since the last summary.",
+            })
+        task_id, deduplicated = enqueue_summary(session_id, force=force)
+        message = "Summary generation already in progress." if deduplicated else "Summary generation started."
+        return _json_response({
+            "status": "processing",
+            "task_id": task_id,
+            "status_url": f"/api/tasks/{task_id}",
+            "deduplicated": deduplicated,
+            "message": message,
+        })
     except Exception as e:
         logger.exception("generate_summary error")
         return _json_error(str(e), 500)
 
 @csrf_exempt
+def get_task_status(request: HttpRequest, task_id: str) -> JsonResponse:
+    from assistant.task_status import get_status
+
+    try:
+        status = get_status(task_id)
+    except Exception as e:
+        logger.exception("get_task_status error")
+        return _json_error(f"Task status unavailable: {e}", 503)
+    if status is None:
+        return _json_response({"task_id": task_id, "state": "unknown", "message": "No such task or its status has expired."}, status=404)
+    return _json_response({"task_id": task_id, **status})
+
+@csrf_exempt
+@replica_reads
 def get_summary(request: HttpRequest, session_id: str) -> JsonResponse:
     try:
         conv = Conversation.objects.get(session_id=session_id)
@@ -155,6 +245,8 @@ def get_summary(request: HttpRequest, session_id: str) -> JsonResponse:
             return _json_response({"status": "not_found", "message": "Summary not generated yet. Call /api/generate-summary/ first."}, status=404)
 
         # enrich summary with generated timestamp
+        from assistant.serializers import ConversationShortSerializer, SummarySerializer
+
         summary_data = {**summary, "generated_at": conv.summary_generated_at}
         summary_serialized = SummarySerializer(summary_data).data
         conversation_serialized = ConversationShortSerializer(conv).data
@@ -167,13 +259,70 @@ def get_summary(request: HttpRequest, session_id: str) -> JsonResponse:
         return _json_error(str(e), 500)
 
 @csrf_exempt
+@replica_reads
 def list_vehicle_interests(request: HttpRequest) -> JsonResponse:
-    from assistant.models import VehicleInterest  # local import keeps module import light
+    from assistant.models import REPLAY_PREFIX, VehicleInterest  # local import keeps module import light
+    from assistant.serializers import VehicleInterestSerializer
 
     try:
-        interests = VehicleInterest.objects.select_related("conversation").all().order_by("-timestamp")
+        interests = (
+            VehicleInterest.objects.select_related("conversation")
+            .exclude(conversation__session_id__startswith=REPLAY_PREFIX)
+            .order_by("-timestamp")
+        )
+        # Optional date bound (?days=30): interests from conversations started in that window.
+        # conversation_started_at is the partition key, so only the matching months are scanned.
+        days = request.GET.get("days")
+        if days:
+            if not days.isdigit():
+                return _json_error("days must be a positive integer", 400)
+            cutoff = timezone.now() - timedelta(days=int(days))
+            interests = interests.filter(conversation_started_at__gte=cutoff, timestamp__gte=cutoff)
         serializer = VehicleInterestSerializer(interests, many=True)
         return _json_response({"vehicle_interests": serializer.data})
     except Exception as e:
         logger.exception("list_vehicle_interests error")
         return _json_error(str(e), 500)
+
+def _export_authorized(request: HttpRequest) -> bool:
+    token = settings.EXPORT_API_TOKEN
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+@csrf_exempt
+def export_conversations(request: HttpRequest) -> JsonResponse | StreamingHttpResponse:
+    from assistant.export import EXPORT_FORMATS, iter_export, parse_since
+
+    if not settings.EXPORT_API_TOKEN:
+        return _json_error("Export API is disabled; use python manage.py export_conversations", 403)
+    if not _export_authorized(request):
+        return _json_error("Valid export token required", 401)
+
+    fmt = request.GET.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return _json_error(f"format must be one of: {', '.join(EXPORT_FORMATS)}", 400)
+
+    since = None
+    raw_since = request.GET.get("since")
+    if raw_since:
+        since = parse_since(raw_since)
+        if since is None:
+            return _json_error("since must be an ISO 8601 timestamp", 400)
+
+    compress = request.GET.get("gzip", "").lower() in ("1", "true", "yes")
+    include_messages = request.GET.get("include_messages", "").lower() in ("1", "true", "yes")
+    chunks = iter_export(fmt, since=since, include_messages=include_messages, compress=compress)
+
+    content_type = "application/x-ndjson" if fmt == "ndjson" else "text/csv; charset=utf-8"
+    filename = f"conversations.{fmt}"
+    if compress:
+        content_type, filename = "application/gzip", f"{filename}.gz"
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+@csrf_exempt
+def get_metrics(request: HttpRequest) -> JsonResponse:
+    from assistant import metrics
+
+    return _json_response({"metrics": metrics.snapshot(), "capacity": capacity.status()})
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import Tuple, List, Dict, Any
 import os
+import threading
 from pathlib import Path
 
 __all__ = [
@@ -16,6 +17,7 @@ __all__ = [
     "VAD_CONFIG",
     "MODEL_TEMPERATURE",
     "TOOL_DEFINITIONS",
+    "get_system_instructions",
     "get_realtime_session_url",
     "get_session_payload",
     "get_openai_headers",
@@ -44,7 +46,23 @@ def _load_system_instructions(path: str | None = None) -> str:
         # Fallback short instruction if file missing
         return f"You are {AI_AGENT_NAME}, a Mahindra sales consultant. (Detailed instructions file not found.)"
 
-SYSTEM_INSTRUCTIONS = _load_system_instructions()
+_system_instructions: str | None = None
+_system_instructions_lock = threading.Lock()
+
+def get_system_instructions() -> str:
+    # --- Read system_instructions.md on first use instead of at import ---
+    global _system_instructions
+    if _system_instructions is None:
+        with _system_instructions_lock:
+            if _system_instructions is None:
+                _system_instructions = _load_system_instructions()
+    return _system_instructions
+
+def __getattr__(name: str) -> Any:
+    # Keeps `constants.SYSTEM_INSTRUCTIONS` working while deferring the file read
+    if name == "SYSTEM_INSTRUCTIONS":
+        return get_system_instructions()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- VAD + Temperature config ---
 VAD_CONFIG: Dict[str, Any] = {
@@ -98,7 +116,7 @@ def get_session_payload(
         "model": model or DEFAULT_REALTIME_MODEL,
         "modalities": list(modalities or DEFAULT_MODALITIES),
         "voice": voice or DEFAULT_VOICE,
-        "instructions": instructions or SYSTEM_INSTRUCTIONS,
+        "instructions": instructions or get_system_instructions(),
         "turn_detection": vad or VAD_CONFIG,
         "input_audio_transcription": {"model": transcribe_model or DEFAULT_TRANSCRIBE_MODEL},
         "temperature": MODEL_TEMPERATURE if temperature is None else temperature,
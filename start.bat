@@ -26,12 +26,17 @@ if not exist ".env" (
     exit /b 1
 )
 
-REM Start Celery Worker in the background
-start "Celery Worker" cmd /k "call venv\Scripts\activate.bat && celery -A voice_assistant worker -l info --pool=solo"
+REM Start one Celery Worker per queue so summaries, analysis and email never wait on each other
+start "Celery Summaries" cmd /k "call venv\Scripts\activate.bat && celery -A voice_assistant worker -Q summaries -n summaries@%%h -l info --pool=solo"
+start "Celery Analysis" cmd /k "call venv\Scripts\activate.bat && celery -A voice_assistant worker -Q analysis,default -n analysis@%%h -l info --pool=solo"
+start "Celery Email" cmd /k "call venv\Scripts\activate.bat && celery -A voice_assistant worker -Q email -n email@%%h -l info --pool=solo"
 
 REM Start Celery Beat in the background
 start "Celery Beat" cmd /k "call venv\Scripts\activate.bat && celery -A voice_assistant beat --loglevel=info"
 
+echo [*] Building hashed, precompressed static assets ...
+python manage.py build_static_assets >nul
+
 REM Start Django server in the main window
 echo [*] Starting Django development server...
 python manage.py runserver 127.0.0.1:8000
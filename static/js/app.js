@@ -28,6 +28,10 @@
       pendingRaf: null,
       messageQueue: [],
       flushTimer: null,
+      sessionLeased: false,
+      sessionQueued: false,
+      heartbeatTimer: null,
+      admissionCancelled: false,
     };
 
     // -------------- Utility Helpers --------------
@@ -217,6 +221,77 @@
         updateStatus('Unable to save conversation messages. Will retry...', 'warning');
       }
     }
+    // -------------- Session Admission (queue when at capacity) --------------
+    const HEARTBEAT_INTERVAL = 30000; // Keep our server-side session slot alive
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+    async function requestSessionSlot() {
+      const sessionId = state.sessionId;
+      while (state.sessionId === sessionId && !state.admissionCancelled) {
+        const resp = await fetch(`/api/session?session_id=${encodeURIComponent(sessionId)}`); // session call to get ephemeral key
+        if (resp.status === 429) {
+          state.sessionQueued = true;
+          const info = await resp.json().catch(() => ({}));
+          const wait = info.estimated_wait_seconds ? ` (about ${Math.ceil(info.estimated_wait_seconds / 60)} min)` : '';
+          updateStatus(`All consultants are busy. You are #${info.position || '?'} in line${wait}...`, 'warning');
+          stopBtn.disabled = false; // allow leaving the queue
+          await sleep((info.retry_after || 5) * 1000);
+          continue;
+        }
+        state.sessionQueued = false;
+        if (!resp.ok) throw new Error(`Failed to get session: ${resp.status}`);
+        state.sessionLeased = true;
+        if (state.admissionCancelled || state.sessionId !== sessionId) {
+          // Stopped while this request was in flight: give the slot straight back
+          releaseSessionSlot(sessionId);
+          return null;
+        }
+        startHeartbeat();
+        return resp.json();
+      }
+      // Left the queue; a 429 that arrived after stopConversation() re-queued us
+      if (state.sessionQueued) releaseSessionSlot(sessionId);
+      return null;
+    }
+
+    function startHeartbeat() {
+      stopHeartbeat();
+      const sessionId = state.sessionId;
+      state.heartbeatTimer = setInterval(() => {
+        fetch('/api/session/heartbeat', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ session_id: sessionId })
+        }).then(res => {
+          if (res.status !== 410 || state.sessionId !== sessionId) return;
+          // The server could not re-acquire our slot: end the call rather than run over capacity
+          warn('Session slot expired on the server');
+          state.sessionLeased = false;
+          stopConversation();
+          updateStatus('Your session timed out. Please start a new consultation.', 'warning');
+        }).catch(e => warn('Session heartbeat failed:', e));
+      }, HEARTBEAT_INTERVAL);
+    }
+
+    function stopHeartbeat() {
+      if (state.heartbeatTimer) {
+        clearInterval(state.heartbeatTimer);
+        state.heartbeatTimer = null;
+      }
+    }
+
+    function releaseSessionSlot(sessionId = state.sessionId) {
+      stopHeartbeat();
+      // Also drops our place in the queue when we stop while waiting
+      if (!(state.sessionLeased || state.sessionQueued) || !sessionId) return;
+      state.sessionLeased = false;
+      state.sessionQueued = false;
+      const body = JSON.stringify({ session_id: sessionId });
+      // sendBeacon survives page unload
+      if (navigator.sendBeacon && navigator.sendBeacon('/api/session/release', body)) return;
+      fetch('/api/session/release', { method: 'POST', body, keepalive: true }).catch(() => {});
+    }
+
     // -------------- My Toast functionality --------------    
     function showToast(message, timeout = 3500) {
         const toast = document.getElementById('toast-message');
@@ -380,12 +455,17 @@
       }
       try {
         startBtn.disabled = true;
+        state.admissionCancelled = false;
         state.sessionId = generateSessionId();
         log('Session ID:', state.sessionId);
         updateStatus('Connecting to Mahindra assistant...', 'info');
-        const sessionResp = await fetch('/api/session'); // session call to get ephemeral key
-        if (!sessionResp.ok) throw new Error(`Failed to get session: ${sessionResp.status}`);
-        const sessionData = await sessionResp.json();
+        const sessionData = await requestSessionSlot();
+        if (!sessionData) {
+          log('Left the queue before a session slot was free');
+          return;
+        }
+        stopBtn.disabled = true;
+        updateStatus('Connecting to Mahindra assistant...', 'info');
         const EPHEMERAL_KEY = sessionData?.client_secret?.value;
         if (!EPHEMERAL_KEY) throw new Error('No ephemeral key returned from backend');
         updateStatus('Preparing consultation session...', 'info');
@@ -488,6 +568,8 @@
     }
     // our conversation stop and cleanup
     function stopConversation(isAuto = false) {
+      state.admissionCancelled = true;
+      releaseSessionSlot();
       // Flush any pending messages before stopping
       if (state.messageQueue.length > 0) {
         log('Flushing remaining messages before stopping conversation');
@@ -1,8 +1,23 @@
 import os
 from celery import Celery
+from celery.signals import celeryd_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'voice_assistant.settings')
 
 app = Celery('voice_assistant')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+@celeryd_init.connect
+def apply_queue_concurrency(sender=None, conf=None, options=None, **kwargs):
+    # --- `celery worker -Q summaries` picks up WORKER_QUEUE_CONCURRENCY unless -c is given ---
+    options = options or {}
+    queues = options.get('queues') or []
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    if options.get('concurrency') or len(queues) != 1:
+        return
+    from django.conf import settings
+    concurrency = settings.WORKER_QUEUE_CONCURRENCY.get(queues[0].strip())
+    if concurrency:
+        conf.worker_concurrency = concurrency
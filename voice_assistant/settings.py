@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from celery.schedules import crontab
+from kombu import Queue
 
 load_dotenv()
 
@@ -10,12 +11,71 @@ SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'dev-secret-key-change-in-production
 DEBUG = True
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
 
+# Redis (Celery broker/results + cross-worker coordination)
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2'))
+
 # Celery Configuration
-CELERY_BROKER_URL = 'redis://localhost:6379/0'  
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+# Tasks whose return value nobody reads set ignore_result=True themselves; stored results expire.
+# Summary/analysis progress lives in compact status records instead (see assistant/task_status.py)
+CELERY_RESULT_EXPIRES = int(os.getenv('CELERY_RESULT_EXPIRES', '3600'))
+TASK_STATUS_TTL_SECONDS = int(os.getenv('TASK_STATUS_TTL_SECONDS', '86400'))
+# A repeated summary request for the same session joins the in-flight task for up to this long
+SUMMARY_INFLIGHT_TTL_SECONDS = int(os.getenv('SUMMARY_INFLIGHT_TTL_SECONDS', '300'))
+# autodiscover only finds assistant.tasks; the summary/analysis tasks live in the analyzer
+CELERY_IMPORTS = ('assistant.analyzer',)
+
+# --- Celery queues: interactive summaries, background analysis and email never block each other ---
+CELERY_TASK_QUEUES = (
+    Queue('summaries'),
+    Queue('analysis'),
+    Queue('email'),
+    Queue('default'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+# Redis transport: 0 is the highest priority, 9 the lowest
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_TASK_ROUTES = {
+    'assistant.analyzer.generate_summary_task': {'queue': 'summaries', 'priority': 0},
+    'assistant.analyzer.analyze_conversation_task': {'queue': 'analysis', 'priority': 5},
+    'assistant.tasks.email_conversation_summary': {'queue': 'email', 'priority': 6},
+    'assistant.tasks.schedule_email': {'queue': 'email', 'priority': 9},
+    'assistant.tasks.send_summary_digest': {'queue': 'email', 'priority': 9},
+}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+# Long OpenAI calls: do not let one worker hoard queued tasks
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Default concurrency for a worker started with a single `-Q <queue>` and no `-c`
+WORKER_QUEUE_CONCURRENCY = {
+    'summaries': int(os.getenv('CELERY_SUMMARIES_CONCURRENCY', '4')),
+    'analysis': int(os.getenv('CELERY_ANALYSIS_CONCURRENCY', '2')),
+    'email': int(os.getenv('CELERY_EMAIL_CONCURRENCY', '1')),
+}
+
+# --- Global OpenAI budget shared by every web/Celery process (see assistant/ratelimit.py) ---
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '4'))
+# Bounds on one SDK call; the SDK retries internally while still holding the slot
+OPENAI_REQUEST_TIMEOUT_SECONDS = float(os.getenv('OPENAI_REQUEST_TIMEOUT_SECONDS', '30'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+# A lease must outlive the slowest call (timeout x attempts), so it is never set shorter than that
+OPENAI_SLOT_LEASE_SECONDS = max(
+    float(os.getenv('OPENAI_SLOT_LEASE_SECONDS', '0')),
+    OPENAI_REQUEST_TIMEOUT_SECONDS * (OPENAI_MAX_RETRIES + 1) + 10,
+)
+OPENAI_SLOT_TIMEOUT_SECONDS = float(os.getenv('OPENAI_SLOT_TIMEOUT_SECONDS', '30'))
+# Dotted path to the analyzer's LLM callable; empty means OpenAI (`replay_conversations` swaps in a fake)
+ANALYZER_LLM_BACKEND = os.getenv('ANALYZER_LLM_BACKEND', '')
+# Extra LLM calls allowed to fix output that fails the tool schema (see assistant/validation.py)
+LLM_OUTPUT_REPAIR_ATTEMPTS = int(os.getenv('LLM_OUTPUT_REPAIR_ATTEMPTS', '1'))
 
 # Email Configuration for sending conversation summaries
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
@@ -25,13 +85,73 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True") == "True"
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# 'per_conversation': one email per summary (default); 'digest': one HTML digest per recipient per window
+SUMMARY_EMAIL_MODE = os.getenv('SUMMARY_EMAIL_MODE', 'per_conversation')
+# Comma-separated; each recipient gets their own digest message
+SUMMARY_EMAIL_RECIPIENTS = [
+    address.strip() for address in os.getenv('SUMMARY_EMAIL_RECIPIENTS', os.getenv('MAIN_EMAIL', '')).split(',')
+    if address.strip()
+]
+SUMMARY_DIGEST_WINDOW_MINUTES = int(os.getenv('SUMMARY_DIGEST_WINDOW_MINUTES', '60'))
+# Larger backlogs roll over to the next digest
+SUMMARY_DIGEST_MAX_CONVERSATIONS = int(os.getenv('SUMMARY_DIGEST_MAX_CONVERSATIONS', '500'))
+# A recipient whose sends keep failing is retried every window for this long, then the
+# conversation is closed out (logged as undelivered) so it cannot block the backlog forever
+SUMMARY_DIGEST_RETRY_HOURS = int(os.getenv('SUMMARY_DIGEST_RETRY_HOURS', '24'))
+
+# --- Realtime session admission control (see assistant/capacity.py) ---
+# Concurrent OpenAI realtime sessions allowed across all web processes
+REALTIME_SESSION_CAPACITY = int(os.getenv('REALTIME_SESSION_CAPACITY', '50'))
+# A session without a heartbeat for this long gives its slot back
+REALTIME_SESSION_LEASE_SECONDS = float(os.getenv('REALTIME_SESSION_LEASE_SECONDS', '90'))
+# Queued callers poll at most this far apart; entries not polled for QUEUE_TTL are dropped
+REALTIME_QUEUE_POLL_SECONDS = int(os.getenv('REALTIME_QUEUE_POLL_SECONDS', '5'))
+REALTIME_QUEUE_TTL_SECONDS = float(os.getenv('REALTIME_QUEUE_TTL_SECONDS', '20'))
+# Initial guess for the average session length used in wait estimates
+REALTIME_DEFAULT_SESSION_SECONDS = float(os.getenv('REALTIME_DEFAULT_SESSION_SECONDS', '300'))
+
+# Versioned realtime prompt/tool bundles, reloaded when the files change (see assistant/prompts.py)
+PROMPT_BUNDLES_FILE = Path(os.getenv('PROMPT_BUNDLES_FILE', BASE_DIR / 'prompt_bundles.json'))
+PROMPT_RELOAD_INTERVAL_SECONDS = float(os.getenv('PROMPT_RELOAD_INTERVAL_SECONDS', '2'))
+
+# --- Optional monthly partitioning (run `manage.py conversation_partitions enable` once) ---
+CONVERSATION_PARTITIONING = os.getenv('CONVERSATION_PARTITIONING', 'False') == 'True'
+CONVERSATION_PARTITIONS_AHEAD = int(os.getenv('CONVERSATION_PARTITIONS_AHEAD', '3'))
+
+# Only conversations started within this window are considered for summary emails; the date
+# bound lets Postgres prune old partitions, so it defaults to 7 days only when partitioned
+# (None = no lookback)
+SUMMARY_EMAIL_LOOKBACK_DAYS = os.getenv('SUMMARY_EMAIL_LOOKBACK_DAYS') or ('7' if CONVERSATION_PARTITIONING else None)
+SUMMARY_EMAIL_LOOKBACK_DAYS = int(SUMMARY_EMAIL_LOOKBACK_DAYS) if SUMMARY_EMAIL_LOOKBACK_DAYS else None
+
+# --- Retention (see assistant/retention.py and `manage.py apply_retention`) ---
+# Conversations older than this are purged or anonymized every night; 0 disables the job
+CONVERSATION_RETENTION_DAYS = int(os.getenv('CONVERSATION_RETENTION_DAYS', '0'))
+CONVERSATION_RETENTION_MODE = os.getenv('CONVERSATION_RETENTION_MODE', 'anonymize')  # or 'delete'
+# Each chunk is its own short transaction, followed by a pause so other writers get the locks
+RETENTION_CHUNK_SIZE = int(os.getenv('RETENTION_CHUNK_SIZE', '500'))
+RETENTION_PAUSE_SECONDS = float(os.getenv('RETENTION_PAUSE_SECONDS', '0.5'))
+# The nightly run stops after this long and resumes where it left off the next night
+RETENTION_MAX_SECONDS = float(os.getenv('RETENTION_MAX_SECONDS', '1800'))
 
 # Celery Beat Schedule configuration
 CELERY_BEAT_SCHEDULE = {
     'send_summaries_for_all_conversations': {
         'task': 'assistant.tasks.schedule_email',
             'schedule': 20.0,  
-    }
+    },
+    'create_conversation_partitions_ahead': {
+        'task': 'assistant.tasks.maintain_conversation_partitions',
+        'schedule': crontab(minute=0, hour=3),
+    },
+    'send_summary_digest': {
+        'task': 'assistant.tasks.send_summary_digest',
+        'schedule': SUMMARY_DIGEST_WINDOW_MINUTES * 60.0,
+    },
+    'apply_conversation_retention': {
+        'task': 'assistant.tasks.apply_conversation_retention',
+        'schedule': crontab(minute=30, hour=3),
+    },
 }
 
 INSTALLED_APPS = [
@@ -54,22 +174,72 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Email templates (assistant/templates/); pages are served as static files
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {},
+    },
+]
+
+# --- Opt-in per-request query profiling in RequestLoggingMiddleware (see assistant/queryprofile.py) ---
+QUERY_PROFILING = os.getenv('QUERY_PROFILING', 'False') == 'True'
+QUERY_PROFILE_SAMPLE_RATE = float(os.getenv('QUERY_PROFILE_SAMPLE_RATE', '1.0'))
+# The same query shape this many times in one request is reported as a likely N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '5'))
+# Profiled requests slower than this log their top queries, for SLOW_REQUEST_REPORT_RATE of them
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '500'))
+SLOW_REQUEST_REPORT_RATE = float(os.getenv('SLOW_REQUEST_REPORT_RATE', '0.1'))
+
+# --- Per-process cache of live sessions (see assistant/session_cache.py) ---
+# Only serves while subscribed to Redis invalidations; without Redis every read goes to the database
+SESSION_CACHE_ENABLED = os.getenv('SESSION_CACHE_ENABLED', 'True') == 'True'
+SESSION_CACHE_TTL_SECONDS = int(os.getenv('SESSION_CACHE_TTL_SECONDS', '300'))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', '1000'))
+
 ROOT_URLCONF = 'voice_assistant.urls'
 WSGI_APPLICATION = 'voice_assistant.wsgi.application'
 
 # --- Database Definition to use Postgres ---
 
-DATABASES = {
-    'default': {
+# Persistent, health-checked connections. Keep DB_CONN_MAX_AGE=0 only if pgbouncer
+# already pools for you and you want Django to hand connections back per request.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+
+def _database(host, port):
+    return {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', '5432'),
+        'HOST': host,
+        'PORT': port,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
+
+DATABASES = {
+    'default': _database(os.getenv('DB_HOST', 'localhost'), os.getenv('DB_PORT', '5432')),
 }
 
+# /api/export/conversations streams contact details and transcripts: it answers only requests carrying
+# "Authorization: Bearer <EXPORT_API_TOKEN>", and is disabled while the token is unset
+# (python manage.py export_conversations always works)
+EXPORT_API_TOKEN = os.getenv('EXPORT_API_TOKEN', '')
+
+# Optional read replica for pure-read endpoints and exports (see assistant/routers.py)
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **_database(os.getenv('DB_REPLICA_HOST'), os.getenv('DB_REPLICA_PORT', os.getenv('DB_PORT', '5432'))),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['assistant.routers.ReadReplicaRouter']
+# How long a session's reads stay on the primary after a write (read-your-writes)
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '15'))
+
 # CORS
 CORS_ALLOW_ALL_ORIGINS = True
 